@@ -5,7 +5,39 @@ from django.db import models
 from django.contrib.auth.models import User
 import json
 
+# Parsed rows and summary for one distinct CSV file (keyed by its SHA-256),
+# shared by every EquipmentDataset uploaded from identical bytes
+class DatasetContent(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    total_count = models.IntegerField()
+    avg_flowrate = models.FloatField()
+    avg_pressure = models.FloatField()
+    avg_temperature = models.FloatField()
+    type_distribution = models.JSONField()
+    # Measurement cells that were not numbers (stored as nulls), and the first
+    # of them as {'row', 'column', 'value'}
+    invalid_cells = models.IntegerField(default=0)
+    validation_errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+    
+    SUMMARY_FIELDS = ['total_count', 'avg_flowrate', 'avg_pressure', 'avg_temperature', 'type_distribution']
+    
+    def summary(self):
+        return {field: getattr(self, field) for field in self.SUMMARY_FIELDS}
+    
+    def __str__(self):
+        return f"{self.sha256 or 'content'} ({self.total_count} rows)"
+
+
 class EquipmentDataset(models.Model):
+    STORAGE_JSON = 'json'
+    STORAGE_COLUMNAR = 'columnar'
+    STORAGE_CHOICES = [
+        (STORAGE_JSON, 'JSON records in raw_data'),
+        (STORAGE_COLUMNAR, 'Columnar chunks'),
+    ]
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     filename = models.CharField(max_length=255)
@@ -14,238 +46,7898 @@ class EquipmentDataset(models.Model):
     avg_pressure = models.FloatField()
     avg_temperature = models.FloatField()
     type_distribution = models.JSONField()
-    raw_data = models.TextField()
+    raw_data = models.TextField(blank=True, default='')
+    storage_format = models.CharField(max_length=16, choices=STORAGE_CHOICES, default=STORAGE_JSON)
+    # PROTECT: shared content can only go once no dataset points at it
+    content = models.ForeignKey(DatasetContent, on_delete=models.PROTECT, null=True, blank=True,
+                                related_name='datasets')
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Serves the per-user history list and retention
+            models.Index(fields=['user', '-uploaded_at'], name='equipment_user_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.filename} - {self.uploaded_at}"
 
 
+# Statistics for one numeric column of a content row, over all rows
+# (group '') or the rows of one Type. sketch holds the mergeable state the
+# figures came from (see stats.RunningStats.to_state).
+class ColumnStatistics(models.Model):
+    content = models.ForeignKey(DatasetContent, on_delete=models.CASCADE, related_name='statistics')
+    column = models.CharField(max_length=64)
+    group = models.CharField(max_length=255, blank=True, default='')
+    count = models.BigIntegerField()
+    mean = models.FloatField(null=True)
+    std = models.FloatField(null=True)
+    min = models.FloatField(null=True)
+    max = models.FloatField(null=True)
+    p50 = models.FloatField(null=True)
+    p95 = models.FloatField(null=True)
+    p99 = models.FloatField(null=True)
+    histogram = models.JSONField(default=dict)
+    sketch = models.JSONField(default=dict)
+    
+    FIGURES = ['count', 'mean', 'std', 'min', 'max', 'p50', 'p95', 'p99', 'histogram']
+    
+    class Meta:
+        ordering = ['column', 'group']
+        unique_together = [('content', 'column', 'group')]
+    
+    def figures(self):
+        return {field: getattr(self, field) for field in self.FIGURES}
+    
+    def __str__(self):
+        return f"{self.content_id} {self.column} {self.group or '(all)'}"
+
+
+# Summary of one upload kept for trend queries (see trends.py). Not tied to
+# EquipmentDataset, so points outlive the pruned history. recorded_ts is
+# recorded_at in epoch seconds: rollups bucket it with integer arithmetic
+# instead of per-row datetime functions.
+class TrendPoint(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    recorded_at = models.DateTimeField()
+    recorded_ts = models.BigIntegerField()
+    dataset_id = models.IntegerField(null=True, blank=True)
+    total_count = models.IntegerField()
+    avg_flowrate = models.FloatField()
+    avg_pressure = models.FloatField()
+    avg_temperature = models.FloatField()
+    
+    class Meta:
+        ordering = ['recorded_at']
+        indexes = [
+            models.Index(fields=['user', 'recorded_ts'], name='equipment_trend_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.recorded_at}"
+
+
+# An upload accepted with ?async=1, processed later by a worker (see
+# jobs.py). The file waits in file_path until a worker claims the job.
+# Resumable uploads are jobs too: their file arrives in pieces (status
+# receiving) and parsing starts with the first piece; finalized is set once
+# the client says every byte of bytes_total was sent. A running job's worker
+# refreshes heartbeat_at while it works (see jobs.Heartbeat).
+class IngestJob(models.Model):
+    RECEIVING = 'receiving'
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (RECEIVING, 'Receiving'),
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    FINISHED = [DONE, FAILED]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    sha256 = models.CharField(max_length=64)
+    file_path = models.CharField(max_length=1024, blank=True, default='')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    worker = models.CharField(max_length=255, blank=True, default='')
+    bytes_total = models.BigIntegerField(default=0)
+    bytes_done = models.BigIntegerField(default=0)
+    rows_done = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    resumable = models.BooleanField(default=False)
+    finalized = models.BooleanField(default=True)
+    dataset = models.ForeignKey(EquipmentDataset, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='equipment_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+
+class DatasetChunk(models.Model):
+    content = models.ForeignKey(DatasetContent, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    row_start = models.BigIntegerField()
+    row_count = models.IntegerField()
+    payload = models.BinaryField()
+    
+    class Meta:
+        ordering = ['index']
+        unique_together = [('content', 'index')]
+    
+    def __str__(self):
+        return f"{self.content_id} chunk {self.index}"
+
+
 # ============================================
 # backend/equipment/serializers.py
 # ============================================
+import hashlib
+import json
 from rest_framework import serializers
-from .models import EquipmentDataset
+from .jobs import job_progress
+from .models import EquipmentDataset, IngestJob
+from .storage import records_json
+
+
+# Summary block of upload and job responses, averages rounded for display
+def upload_summary(dataset):
+    summary = {
+        'total_count': dataset.total_count,
+        'avg_flowrate': round(dataset.avg_flowrate, 2),
+        'avg_pressure': round(dataset.avg_pressure, 2),
+        'avg_temperature': round(dataset.avg_temperature, 2),
+        'type_distribution': dataset.type_distribution
+    }
+    # Only uploads with bad measurement cells say so
+    content = dataset.content if dataset.content_id is not None else None
+    if content is not None and content.invalid_cells:
+        summary['validation'] = {'invalid_cells': content.invalid_cells, 'errors': content.validation_errors}
+    return summary
+
+
+# Changes whenever anything a dataset response shows could change: new
+# content (its rows), the summary, or a conversion out of raw_data
+def dataset_etag(dataset, summary=False):
+    inputs = [dataset.id, dataset.content_id, dataset.storage_format, dataset.filename,
+              dataset.uploaded_at.isoformat(), dataset.total_count, dataset.avg_flowrate,
+              dataset.avg_pressure, dataset.avg_temperature, dataset.type_distribution, summary]
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def history_etag(datasets):
+    joined = ','.join(dataset_etag(dataset, summary=True) for dataset in datasets)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()
 
 class EquipmentDatasetSerializer(serializers.ModelSerializer):
+    # Kept as a JSON string so existing clients can still json.loads() it
+    raw_data = serializers.SerializerMethodField()
+    
     class Meta:
         model = EquipmentDataset
         fields = '__all__'
         read_only_fields = ['user', 'uploaded_at']
+    
+    def get_raw_data(self, obj):
+        return records_json(obj)
 
 
-# ============================================
-# backend/equipment/views.py
-# ============================================
-from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser
-from django.http import HttpResponse
-from django.contrib.auth import authenticate
-from rest_framework.authtoken.models import Token
-import pandas as pd
-import json
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from .models import EquipmentDataset
-from .serializers import EquipmentDatasetSerializer
+# History listings and ?summary=1 detail: everything except the rows
+class EquipmentDatasetListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EquipmentDataset
+        exclude = ['raw_data']
+        read_only_fields = ['user', 'uploaded_at']
 
-class EquipmentDatasetViewSet(viewsets.ModelViewSet):
-    serializer_class = EquipmentDatasetSerializer
-    permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser]
-    
-    def get_queryset(self):
-        return EquipmentDataset.objects.filter(user=self.request.user)[:5]
+
+# Job status; while the job runs, progress comes from jobs.job_progress
+class IngestJobSerializer(serializers.ModelSerializer):
+    summary = serializers.SerializerMethodField()
     
-    @action(detail=False, methods=['post'])
-    def upload(self, request):
-        if 'file' not in request.FILES:
-            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        csv_file = request.FILES['file']
-        
-        try:
-            df = pd.read_csv(csv_file)
-            
-            required_cols = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-            if not all(col in df.columns for col in required_cols):
-                return Response({'error': 'CSV missing required columns'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Calculate statistics
-            total_count = len(df)
-            avg_flowrate = df['Flowrate'].mean()
-            avg_pressure = df['Pressure'].mean()
-            avg_temperature = df['Temperature'].mean()
-            type_distribution = df['Type'].value_counts().to_dict()
-            
-            # Create dataset
-            dataset = EquipmentDataset.objects.create(
-                user=request.user,
-                filename=csv_file.name,
-                total_count=total_count,
-                avg_flowrate=avg_flowrate,
-                avg_pressure=avg_pressure,
-                avg_temperature=avg_temperature,
-                type_distribution=type_distribution,
-                raw_data=df.to_json(orient='records')
-            )
-            
-            # Keep only last 5
-            old_datasets = EquipmentDataset.objects.filter(user=request.user)[5:]
-            for ds in old_datasets:
-                ds.delete()
-            
-            return Response({
-                'id': dataset.id,
-                'data': json.loads(dataset.raw_data),
-                'summary': {
-                    'total_count': total_count,
-                    'avg_flowrate': round(avg_flowrate, 2),
-                    'avg_pressure': round(avg_pressure, 2),
-                    'avg_temperature': round(avg_temperature, 2),
-                    'type_distribution': type_distribution
-                }
-            })
-            
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    class Meta:
+        model = IngestJob
+        fields = ['id', 'filename', 'status', 'bytes_total', 'bytes_done', 'rows_done', 'error',
+                  'dataset', 'summary', 'created_at', 'started_at', 'finished_at']
     
-    @action(detail=True, methods=['get'])
-    def download_pdf(self, request, pk=None):
-        dataset = self.get_object()
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Title
-        title = Paragraph(f"Equipment Report - {dataset.filename}", styles['Heading1'])
-        elements.append(title)
-        elements.append(Spacer(1, 12))
-        
-        # Summary
-        summary_text = f"""
-        <b>Summary Statistics</b><br/>
-        Total Equipment: {dataset.total_count}<br/>
-        Average Flowrate: {dataset.avg_flowrate:.2f}<br/>
-        Average Pressure: {dataset.avg_pressure:.2f}<br/>
-        Average Temperature: {dataset.avg_temperature:.2f}<br/>
-        """
-        elements.append(Paragraph(summary_text, styles['Normal']))
-        elements.append(Spacer(1, 12))
-        
-        # Type Distribution
-        dist_data = [['Equipment Type', 'Count']]
-        for eq_type, count in dataset.type_distribution.items():
-            dist_data.append([eq_type, str(count)])
-        
-        table = Table(dist_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(table)
-        
-        doc.build(elements)
-        buffer.seek(0)
-        
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="equipment_report_{dataset.id}.pdf"'
-        return response
-
-
-@api_view(['POST'])
-def login_view(request):
-    username = request.data.get('username')
-    password = request.data.get('password')
-    user = authenticate(username=username, password=password)
+    def to_representation(self, obj):
+        data = super().to_representation(obj)
+        data.update(job_progress(obj))
+        return data
     
-    if user:
-        token, _ = Token.objects.get_or_create(user=user)
-        return Response({'token': token.key, 'user': username})
-    return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+    def get_summary(self, obj):
+        if obj.status != IngestJob.DONE or obj.dataset is None:
+            return None
+        return upload_summary(obj.dataset)
 
 
 # ============================================
-# backend/equipment/urls.py
+# backend/equipment/stats.py
 # ============================================
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
-from .views import EquipmentDatasetViewSet, login_view
+import math
+import numpy as np
+import pandas as pd
 
-router = DefaultRouter()
-router.register(r'datasets', EquipmentDatasetViewSet, basename='dataset')
+RELATIVE_ACCURACY = 0.01
+QUANTILES = {'p50': 0.50, 'p95': 0.95, 'p99': 0.99}
+HISTOGRAM_BINS = 20
 
-urlpatterns = [
-    path('', include(router.urls)),
-    path('login/', login_view, name='login'),
-]
 
+# Log-bucketed quantile sketch (DDSketch). A value v > 0 lands in bucket
+# ceil(log_gamma(v)), so every quantile comes back within RELATIVE_ACCURACY
+# of the true value, and two sketches merge by adding bucket counts.
+class QuantileSketch:
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0
 
-# ============================================
-# backend/equipment_api/settings.py (Add to existing)
-# ============================================
-"""
-Add these to your settings.py:
+    def keys(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
 
-INSTALLED_APPS = [
-    ...
-    'rest_framework',
-    'rest_framework.authtoken',
-    'corsheaders',
-    'equipment',
-]
+    def value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
 
-MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware',
-    ...
-]
+    def add_keys(self, store, keys, counts):
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
 
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-    ],
-}
+    def merge(self, other):
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero += other.zero
 
-CORS_ALLOW_ALL_ORIGINS = True  # For development only
+    @property
+    def count(self):
+        return sum(self.positive.values()) + sum(self.negative.values()) + self.zero
 
-"""
+    # (value, count) for every bucket, in ascending value order
+    def buckets(self):
+        for key in sorted(self.negative, reverse=True):
+            yield -self.value(key), self.negative[key]
+        if self.zero:
+            yield 0.0, self.zero
+        for key in sorted(self.positive):
+            yield self.value(key), self.positive[key]
+
+    def quantile(self, q):
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for value, count in self.buckets():
+            seen += count
+            if seen > rank:
+                return value
+        return value
+
+    def to_state(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'positive': {str(key): count for key, count in self.positive.items()},
+            'negative': {str(key): count for key, count in self.negative.items()},
+            'zero': self.zero,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['relative_accuracy'])
+        sketch.positive = {int(key): count for key, count in state['positive'].items()}
+        sketch.negative = {int(key): count for key, count in state['negative'].items()}
+        sketch.zero = state['zero']
+        return sketch
+
+
+# Count, mean and sum of squared deviations (Welford/Chan), min, max and a
+# quantile sketch for one column; merge() combines two partial results
+# exactly, so chunks can be summarised independently.
+class RunningStats:
+    def __init__(self, sketch=None):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = sketch if sketch is not None else QuantileSketch()
+
+    def add_moments(self, count, mean, m2, minimum, maximum):
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def merge(self, other):
+        self.add_moments(other.count, other.mean, other.m2, other.min, other.max)
+        self.sketch.merge(other.sketch)
+
+    def std(self):
+        # Sample standard deviation, as Series.std() reports it
+        if self.count < 2:
+            return None
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def histogram(self, bins=HISTOGRAM_BINS):
+        if not self.count:
+            return {'edges': [], 'counts': []}
+        if self.min == self.max:
+            return {'edges': [self.min, self.max], 'counts': [self.count]}
+        values, counts = zip(*self.sketch.buckets())
+        # Bucket values can sit just outside [min, max]; clip them back in
+        values = np.clip(values, self.min, self.max)
+        hist, edges = np.histogram(values, bins=bins, range=(self.min, self.max), weights=counts)
+        return {'edges': edges.tolist(), 'counts': hist.astype(np.int64).tolist()}
+
+    def summary(self, histogram=True):
+        empty = not self.count
+        result = {
+            'count': self.count,
+            'mean': None if empty else self.mean,
+            'std': self.std(),
+            'min': None if empty else self.min,
+            'max': None if empty else self.max,
+        }
+        for name, q in QUANTILES.items():
+            value = self.sketch.quantile(q)
+            result[name] = None if value is None else min(max(value, self.min), self.max)
+        if histogram:
+            result['histogram'] = self.histogram()
+        return result
+
+    def to_state(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': None if not self.count else self.min,
+            'max': None if not self.count else self.max,
+            'sketch': self.sketch.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls(QuantileSketch.from_state(state['sketch']))
+        if state['count']:
+            stats.add_moments(state['count'], state['mean'], state['m2'], state['min'], state['max'])
+        return stats
+
+
+# Update stats[i] with the values whose group code is i, using one bincount
+# per moment and one np.unique for the sketch buckets of every group at once
+def update_grouped(stats, codes, values):
+    valid = ~np.isnan(values) & (codes >= 0)
+    codes = codes[valid]
+    values = values[valid]
+    if not len(values):
+        return
+    groups = len(stats)
+    counts = np.bincount(codes, minlength=groups)
+    sums = np.bincount(codes, weights=values, minlength=groups)
+    present = counts > 0
+    means = np.zeros(groups)
+    means[present] = sums[present] / counts[present]
+    m2s = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=groups)
+    mins = np.full(groups, np.inf)
+    maxs = np.full(groups, -np.inf)
+    np.minimum.at(mins, codes, values)
+    np.maximum.at(maxs, codes, values)
+    for i in np.flatnonzero(present).tolist():
+        stats[i].add_moments(int(counts[i]), float(means[i]), float(m2s[i]), float(mins[i]), float(maxs[i]))
+
+    sketch = stats[0].sketch
+    zeros = np.bincount(codes[values == 0], minlength=groups)
+    for i in np.flatnonzero(zeros).tolist():
+        stats[i].sketch.zero += int(zeros[i])
+    for sign, store in ((1, 'positive'), (-1, 'negative')):
+        mask = values * sign > 0
+        if not mask.any():
+            continue
+        keys = sketch.keys(values[mask] * sign)
+        low = keys.min()
+        span = int(keys.max() - low) + 1
+        pairs, pair_counts = np.unique(codes[mask].astype(np.int64) * span + (keys - low), return_counts=True)
+        pair_groups = pairs // span
+        pair_keys = pairs % span + low
+        bounds = np.flatnonzero(np.diff(pair_groups)) + 1
+        for group_keys, group_counts, start in zip(np.split(pair_keys, bounds), np.split(pair_counts, bounds),
+                                                   np.concatenate([[0], bounds])):
+            group = stats[int(pair_groups[start])].sketch
+            group.add_keys(getattr(group, store), group_keys, group_counts)
+
+
+# Everything the stats endpoint reports for a dataset: per-column stats over
+# all rows and per value of group_col, plus the stored summary fields. One
+# update() call per chunk; merge() combines partial results.
+class DatasetStats:
+    def __init__(self, columns, group_col):
+        self.columns = list(columns)
+        self.group_col = group_col
+        self.total_count = 0
+        self.overall = {col: RunningStats() for col in self.columns}
+        self.groups = {}
+        self.group_counts = {}
+
+    def group_stats(self, name):
+        if name not in self.groups:
+            self.groups[name] = {col: RunningStats() for col in self.columns}
+        return self.groups[name]
+
+    def update(self, chunk):
+        self.total_count += len(chunk)
+        codes, names = pd.factorize(chunk[self.group_col], sort=False)
+        codes = codes.astype(np.int64)
+        everything = np.zeros(len(chunk), dtype=np.int64)
+        names = names.tolist()
+        grouped = [self.group_stats(name) for name in names]
+        for name, count in zip(names, np.bincount(codes[codes >= 0], minlength=len(names)).tolist()):
+            self.group_counts[name] = self.group_counts.get(name, 0) + count
+        for col in self.columns:
+            values = pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64)
+            update_grouped([self.overall[col]], everything, values)
+            update_grouped([stats[col] for stats in grouped], codes, values)
+
+    def merge(self, other):
+        self.total_count += other.total_count
+        for col in self.columns:
+            self.overall[col].merge(other.overall[col])
+        for name, stats in other.groups.items():
+            mine = self.group_stats(name)
+            for col in self.columns:
+                mine[col].merge(stats[col])
+        for name, count in other.group_counts.items():
+            self.group_counts[name] = self.group_counts.get(name, 0) + count
+
+    def mean(self, col):
+        stats = self.overall[col]
+        return stats.mean if stats.count else float('nan')
+
+    def group_distribution(self):
+        # Match value_counts() ordering: most frequent first
+        return dict(sorted(self.group_counts.items(), key=lambda item: item[1], reverse=True))
 
 
 # ============================================
-# backend/equipment_api/urls.py
+# backend/equipment/ingest.py
 # ============================================
-from django.contrib import admin
-from django.urls import path, include
+import mmap
+import struct
+import csv
+import tempfile
+import numpy as np
+import pandas as pd
+from .columnar import encode_frame
+from .stats import DatasetStats
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/', include('equipment.urls')),
-]
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.csv
+except ImportError:  # pyarrow is optional; the pandas C parser is used instead
+    pyarrow = None
+
+REQUIRED_COLS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+NUMERIC_COLS = ['Flowrate', 'Pressure', 'Temperature']
+DEFAULT_CHUNKSIZE = 50000
+SCAN_BLOCK = 16 * 1024 * 1024
+READ_BLOCK = 1024 * 1024
+ARROW_BLOCK = 4 * 1024 * 1024
+MAX_REPORTED_ERRORS = 100
+# What pandas accepts as a number, once surrounding spaces are trimmed
+NUMBER_PATTERN = r'^[+-]?((\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?|inf|infinity|nan)$'
+
+# Pinned dtypes of the required columns: names stay strings ("007" is not
+# 7), Type is categorical and the measurements are float64 in every chunk,
+# whatever the cells look like. Other columns are inferred chunk by chunk.
+MEASUREMENT_DTYPE = 'float64'
+SCHEMA = {'Equipment Name': str, 'Type': 'category', **{col: MEASUREMENT_DTYPE for col in NUMERIC_COLS}}
+
+
+# report, when given, is the ValidationReport of the rows parsed so far
+class IngestError(ValueError):
+    def __init__(self, message, report=None):
+        super().__init__(message)
+        self.report = report
+
+
+def default_engine():
+    return 'pyarrow' if pyarrow is not None else 'c'
+
+
+# Measurement cells that are not numbers. They are stored as nulls and
+# counted; the first MAX_REPORTED_ERRORS are kept with their row (1-based,
+# header excluded) and the offending text.
+class ValidationReport:
+    def __init__(self):
+        self.count = 0
+        self.errors = []
+
+    def add(self, row_offset, column, positions, values):
+        self.count += len(positions)
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        for position, value in zip(positions[:room].tolist(), values[:room].tolist()):
+            self.errors.append({'row': row_offset + position + 1, 'column': column, 'value': str(value)})
+
+    # other covers the rows after the row_offset this report has seen
+    def merge(self, other, row_offset):
+        self.count += other.count
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        self.errors.extend({**error, 'row': error['row'] + row_offset} for error in other.errors[:room])
+
+
+# Stored summary fields, plus the full per-column statistics of stats.py,
+# built up one chunk at a time in a single pass
+class RunningSummary(DatasetStats):
+    def __init__(self):
+        super().__init__(NUMERIC_COLS, 'Type')
+        self.validation = ValidationReport()
+
+    def merge(self, other):
+        self.validation.merge(other.validation, self.total_count)
+        super().merge(other)
+
+    # Every stored average needs at least one number to come from
+    def check(self):
+        if not self.total_count:
+            raise IngestError('CSV has no data rows', self.validation)
+        for col in NUMERIC_COLS:
+            if not self.overall[col].count:
+                raise IngestError(f'Column {col} has no numeric values', self.validation)
+
+    def as_dict(self):
+        self.check()
+        return {
+            'total_count': self.total_count,
+            'avg_flowrate': self.mean('Flowrate'),
+            'avg_pressure': self.mean('Pressure'),
+            'avg_temperature': self.mean('Temperature'),
+            'type_distribution': self.group_distribution(),
+            'invalid_cells': self.validation.count,
+            'validation_errors': self.validation.errors,
+        }
+
+
+# Cast a measurement column to MEASUREMENT_DTYPE. Clean chunks are numeric
+# already; in the others, cells that are not numbers become NaN, in one
+# vectorized pass, and go into report.
+def pin_measurement(chunk, col, row_offset, report):
+    values = chunk[col]
+    if not pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+        numbers = pd.to_numeric(values, errors='coerce')
+        bad = np.flatnonzero(numbers.isna().to_numpy() & values.notna().to_numpy())
+        if len(bad) and report is not None:
+            report.add(row_offset, col, bad, values.to_numpy()[bad])
+        values = numbers
+    chunk[col] = values.astype(MEASUREMENT_DTYPE)
+
+
+def pandas_chunks(csv_file, chunksize):
+    # Measurements are left to the C parser's own number conversion, which
+    # only gives up (object dtype) on chunks with bad cells
+    dtype = {col: kind for col, kind in SCHEMA.items() if col not in NUMERIC_COLS}
+    yield from pd.read_csv(csv_file, chunksize=chunksize, dtype=dtype)
+
+
+# File-like view of a path or any object with read() for pyarrow, which also
+# wants `closed`. The header line is read up front to pin the column types.
+class ArrowInput:
+    def __init__(self, csv_file):
+        self.file = open(csv_file, 'rb') if isinstance(csv_file, str) else csv_file
+        self.owned = isinstance(csv_file, str)
+        self.closed = False
+        self.head = b''
+        while not self.head.endswith(b'\n'):
+            block = self.file.read(READ_BLOCK if self.head else 64 * 1024)
+            if not block:
+                break
+            self.head += block
+            if b'\n' in block:
+                break
+        line = self.head.split(b'\n', 1)[0].decode('utf-8-sig', errors='replace')
+        self.names = next(csv.reader([line]), []) if line.strip() else []
+
+    def read(self, size=-1):
+        if self.head:
+            if size is None or size < 0:
+                data, self.head = self.head + self.file.read(), b''
+                return data
+            data, self.head = self.head[:size], self.head[size:]
+            return data
+        return self.file.read(size)
+
+    def close(self):
+        self.closed = True
+        if self.owned:
+            self.file.close()
+
+
+# Per-chunk inference for columns outside SCHEMA, as pandas does it: whole
+# numbers, then any numbers, else strings
+def infer_arrow(column):
+    for kind in (pyarrow.int64(), pyarrow.float64()):
+        try:
+            return column.cast(kind)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError):
+            pass
+    return column
+
+
+# The arrow counterpart of pin_measurement, without leaving Arrow: a chunk
+# with bad cells is matched against NUMBER_PATTERN, and only the bad cells
+# are turned into Python objects, for the report
+def pin_arrow(column, name, row_offset, report):
+    try:
+        return column.cast(pyarrow.float64())
+    except pyarrow.ArrowInvalid:
+        pass
+    trimmed = pyarrow.compute.utf8_trim_whitespace(column)
+    numeric = pyarrow.compute.match_substring_regex(trimmed, NUMBER_PATTERN, ignore_case=True)
+    bad = np.flatnonzero(pyarrow.compute.invert(numeric.fill_null(True)).to_numpy())
+    if len(bad) and report is not None:
+        values = column.take(pyarrow.array(bad[:MAX_REPORTED_ERRORS])).to_numpy()
+        report.add(row_offset, name, bad, values)
+    return pyarrow.compute.if_else(numeric, trimmed, None).cast(pyarrow.float64())
+
+
+def arrow_frame(table, row_offset, report):
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        if name in NUMERIC_COLS:
+            column = pin_arrow(column, name, row_offset, report)
+        elif name not in SCHEMA:
+            column = infer_arrow(column)
+        columns.append(column)
+    return pyarrow.Table.from_arrays(columns, names=table.column_names).to_pandas()
+
+
+# pyarrow's multithreaded streaming reader. Every column is read as strings
+# (Type as a dictionary), so no block can disagree with the types inferred
+# from the first, then cast per chunk; batches are regrouped into chunks of
+# chunksize rows.
+def arrow_chunks(csv_file, chunksize, report):
+    stream = ArrowInput(csv_file)
+    try:
+        if not stream.names:
+            raise IngestError('CSV is empty')
+        types = {name: pyarrow.string() for name in stream.names}
+        types['Type'] = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        reader = pyarrow.csv.open_csv(
+            stream,
+            read_options=pyarrow.csv.ReadOptions(block_size=ARROW_BLOCK),
+            convert_options=pyarrow.csv.ConvertOptions(column_types=types, strings_can_be_null=True),
+        )
+        pending, rows, row_offset = [], 0, 0
+        for batch in reader:
+            pending.append(batch)
+            rows += batch.num_rows
+            while rows >= chunksize:
+                table = pyarrow.Table.from_batches(pending)
+                yield arrow_frame(table.slice(0, chunksize), row_offset, report)
+                row_offset += chunksize
+                rest = table.slice(chunksize)
+                pending, rows = rest.to_batches(), rest.num_rows
+        if rows or not row_offset:
+            yield arrow_frame(pyarrow.Table.from_batches(pending, schema=reader.schema), row_offset, report)
+    finally:
+        stream.close()
+
+
+# Chunks of at most chunksize rows with SCHEMA's dtypes. Bad measurement
+# cells go into report (a ValidationReport) rather than failing the parse;
+# a malformed file (wrong field counts, no header) raises IngestError.
+def iter_csv_chunks(csv_file, chunksize=DEFAULT_CHUNKSIZE, report=None, engine=None):
+    engine = engine or default_engine()
+    if engine == 'pyarrow' and pyarrow is None:
+        engine = 'c'
+    chunks = arrow_chunks(csv_file, chunksize, report) if engine == 'pyarrow' else pandas_chunks(csv_file, chunksize)
+    row_offset = 0
+    # Closed here rather than whenever it is collected, by which time the
+    # caller may have closed the file under the reader
+    try:
+        while True:
+            try:
+                chunk = next(chunks, None)
+            except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+                raise IngestError(f'CSV could not be parsed: {e}')
+            except Exception as e:
+                if pyarrow is not None and isinstance(e, pyarrow.ArrowInvalid):
+                    raise IngestError(f'CSV could not be parsed: {e}')
+                raise
+            if chunk is None:
+                return
+            if not row_offset and not all(col in chunk.columns for col in REQUIRED_COLS):
+                raise IngestError('CSV missing required columns')
+            for col in NUMERIC_COLS:
+                pin_measurement(chunk, col, row_offset, report)
+            row_offset += len(chunk)
+            yield chunk
+    finally:
+        chunks.close()
+
+
+# The whole CSV as one frame, typed and validated the same way
+def read_csv(csv_file, report=None, engine=None):
+    chunks = list(iter_csv_chunks(csv_file, report=report, engine=engine))
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+
+# Parse csv_file in bounded chunks; only one chunk is held in memory at a time
+def ingest_csv(csv_file, chunksize=DEFAULT_CHUNKSIZE, on_chunk=None, engine=None):
+    summary = RunningSummary()
+    for chunk in iter_csv_chunks(csv_file, chunksize, summary.validation, engine):
+        summary.update(chunk)
+        if on_chunk is not None:
+            on_chunk(chunk)
+    return summary
+
+
+# Parse a CSV (a path or file object) into encoded chunk payloads. Batch
+# uploads run this in worker processes, so it touches neither Django nor
+# the database. Returns (summary, chunks): chunks is a list of (row_count,
+# payload), or whatever list-like was passed in to collect them.
+def parse_file(path, chunksize=DEFAULT_CHUNKSIZE, compress=True, engine=None, chunks=None, on_chunk=None):
+    chunks = [] if chunks is None else chunks
+    
+    def encode(chunk):
+        # Empty chunks are skipped, except the first so the column list survives
+        if len(chunk) or not len(chunks):
+            chunks.append((len(chunk), encode_frame(chunk.reset_index(drop=True), compress=compress)))
+        if on_chunk is not None:
+            on_chunk(chunk)
+    
+    summary = ingest_csv(path, chunksize, on_chunk=encode, engine=engine)
+    return summary, chunks
+
+
+# Encoded chunk payloads parked on disk until the whole upload is parsed, so
+# a large file's chunks are never all in memory. Iterating reads them back.
+# A spool opened on a path outlives the object, for another process to read
+# with read_payloads().
+class PayloadSpool:
+    HEADER = struct.Struct('<qq')
+
+    def __init__(self, directory=None, path=None):
+        self.file = tempfile.TemporaryFile(dir=directory) if path is None else open(path, 'w+b')
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, chunk):
+        row_count, payload = chunk
+        self.file.write(self.HEADER.pack(row_count, len(payload)))
+        self.file.write(payload)
+        self.count += 1
+
+    def __iter__(self):
+        yield from read_payloads(self.file)
+        self.file.seek(0, 2)
+
+    def close(self):
+        self.file.close()
+
+
+def read_payloads(f):
+    f.seek(0)
+    while True:
+        header = f.read(PayloadSpool.HEADER.size)
+        if not header:
+            break
+        row_count, length = PayloadSpool.HEADER.unpack(header)
+        yield row_count, f.read(length)
+
+
+def count_quotes(mm, start, end):
+    return sum(mm[offset:min(offset + SCAN_BLOCK, end)].count(b'"') for offset in range(start, end, SCAN_BLOCK))
+
+
+# Split the CSV at path into at most shards byte ranges of about equal size.
+# Every range starts on a line of its own: a newline inside a quoted field
+# (an odd number of quotes before it) is never a boundary. Returns the
+# header line and [(start, end), ...]; a file with no body is one range.
+def shard_bounds(path, shards):
+    with open(path, 'rb') as f:
+        if not f.seek(0, 2):
+            return b'', [(0, 0)]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            body = mm.find(b'\n') + 1
+            if not body or body == size:
+                return b'', [(0, size)]
+            header = mm[:body]
+            starts = [body]
+            position, quotes = body, 0
+            for i in range(1, shards):
+                target = max(body + (size - body) * i // shards, position)
+                quotes += count_quotes(mm, position, target)
+                position = target
+                while position < size:
+                    newline = mm.find(b'\n', position)
+                    end = size if newline < 0 else newline + 1
+                    quotes += count_quotes(mm, position, end)
+                    position = end
+                    if quotes % 2 == 0:
+                        break
+                if position >= size:
+                    break
+                starts.append(position)
+    return header, list(zip(starts, starts[1:] + [size]))
+
+
+# File-like view of header + bytes [start, end) of a memory-mapped CSV, so a
+# shard parses as a CSV of its own without being copied out first
+class ShardReader:
+    def __init__(self, path, header, start, end):
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.head = header
+        self.position = start
+        self.end = end
+
+    # pandas only treats objects with __iter__ as files
+    def __iter__(self):
+        return iter(lambda: self.read(READ_BLOCK), b'')
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self.head) + self.end - self.position
+        head, self.head = self.head[:size], self.head[size:]
+        take = min(size - len(head), self.end - self.position)
+        block = self.mm[self.position:self.position + take]
+        self.position += take
+        return head + block if head else block
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+# parse_file for a pool worker: the chunk payloads go to a spool file at
+# out, and only the summary is returned to pickle back
+def parse_to_spool(path, out, chunksize=DEFAULT_CHUNKSIZE, compress=True, engine=None):
+    spool = PayloadSpool(path=out)
+    try:
+        summary, _ = parse_file(path, chunksize, compress, engine, chunks=spool)
+    finally:
+        spool.close()
+    return summary
+
+
+# One shard of a parallel parse (see parallel.parse_sharded)
+def parse_shard(path, header, start, end, out, chunksize=DEFAULT_CHUNKSIZE, compress=True, engine=None):
+    reader = ShardReader(path, header, start, end)
+    try:
+        return parse_to_spool(reader, out, chunksize, compress, engine)
+    finally:
+        reader.close()
 
 
 # ============================================
-# backend/requirements.txt
+# backend/equipment/columnar.py
 # ============================================
-"""
-Django==4.2.7
-djangorestframework==3.14.0
-pandas==2.1.3
-reportlab==4.0.7
-django-cors-headers==4.3.1
-"""
\ No newline at end of file
+import io
+import json
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+
+# How each column is laid out inside a chunk payload
+KIND_NUMERIC = 'numeric'
+KIND_DICTIONARY = 'dictionary'
+KIND_STRING = 'string'
+
+DICTIONARY_COLS = ['Type']
+
+
+def _encode_strings(values):
+    # Arrow-style variable width strings: one utf-8 buffer plus int64 offsets
+    valid = pd.notna(values)
+    encoded = [str(v).encode('utf-8') if ok else b'' for v, ok in zip(values, valid)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return offsets, data, np.asarray(valid, dtype=bool)
+
+
+def _decode_strings(offsets, data, valid=None):
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    text = raw.decode('utf-8')
+    if len(text) == len(raw):
+        # Pure ASCII: byte offsets are character offsets, slice the str directly
+        values = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+    else:
+        values = [raw[start:end].decode('utf-8') for start, end in zip(bounds, bounds[1:])]
+    out = np.empty(len(values), dtype=object)
+    out[:] = values
+    if valid is not None and not valid.all():
+        out[~valid] = None
+    return out
+
+
+def _smallest_code_dtype(n):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+# A chunk payload is an .npz archive: one member per buffer, keyed c<N>, plus a
+# JSON "meta" member listing column names and kinds. np.load reads members
+# lazily, so projecting a few columns never touches the others.
+def encode_frame(df, compress=True):
+    arrays = {}
+    meta = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        key = f'c{i}'
+        if col not in DICTIONARY_COLS and pd.api.types.is_numeric_dtype(series.dtype) \
+                and not pd.api.types.is_bool_dtype(series.dtype):
+            arrays[key] = series.to_numpy()
+            kind = KIND_NUMERIC
+        elif col in DICTIONARY_COLS or series.nunique(dropna=True) * 2 <= len(series):
+            categorical = pd.Categorical(series.astype(object).where(series.notna(), None))
+            categories = np.asarray(categorical.categories.astype(str), dtype=object)
+            arrays[key + '.codes'] = categorical.codes.astype(_smallest_code_dtype(len(categories)))
+            offsets, data, _ = _encode_strings(categories)
+            arrays[key + '.dict_offsets'] = offsets
+            arrays[key + '.dict_data'] = data
+            kind = KIND_DICTIONARY
+        else:
+            offsets, data, valid = _encode_strings(series.to_numpy(dtype=object))
+            arrays[key + '.offsets'] = offsets
+            arrays[key + '.data'] = data
+            arrays[key + '.valid'] = valid
+            kind = KIND_STRING
+        meta.append({'name': str(col), 'key': key, 'kind': kind})
+    header = json.dumps({'version': FORMAT_VERSION, 'rows': len(df), 'columns': meta})
+    arrays['meta'] = np.frombuffer(header.encode('utf-8'), dtype=np.uint8)
+    buffer = io.BytesIO()
+    (np.savez_compressed if compress else np.savez)(buffer, **arrays)
+    return buffer.getvalue()
+
+
+# Column names of a chunk payload, read from its meta member alone
+def payload_columns(payload):
+    with np.load(io.BytesIO(payload)) as npz:
+        meta = json.loads(npz['meta'].tobytes().decode('utf-8'))
+    return [col['name'] for col in meta['columns']]
+
+
+# Decode a chunk payload; only the members for the requested columns are read
+def decode_frame(payload, columns=None):
+    with np.load(io.BytesIO(payload)) as npz:
+        meta = json.loads(npz['meta'].tobytes().decode('utf-8'))
+        data = {}
+        for col in meta['columns']:
+            if columns is not None and col['name'] not in columns:
+                continue
+            key = col['key']
+            if col['kind'] == KIND_NUMERIC:
+                data[col['name']] = npz[key]
+            elif col['kind'] == KIND_DICTIONARY:
+                categories = _decode_strings(npz[key + '.dict_offsets'], npz[key + '.dict_data'])
+                data[col['name']] = pd.Categorical.from_codes(npz[key + '.codes'], categories)
+            else:
+                data[col['name']] = _decode_strings(npz[key + '.offsets'], npz[key + '.data'], npz[key + '.valid'])
+    frame = pd.DataFrame(data, index=pd.RangeIndex(meta['rows']))
+    if columns is not None:
+        frame = frame[[col for col in columns if col in frame.columns]]
+    return frame
+
+
+# ============================================
+# backend/equipment/storage.py
+# ============================================
+import json
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from .columnar import decode_frame, encode_frame, payload_columns
+from .content import create_content, own_content, statistics_rows, store_statistics
+from .ingest import DEFAULT_CHUNKSIZE, IngestError, RunningSummary, default_engine, ingest_csv, iter_csv_chunks
+from .models import ColumnStatistics, DatasetChunk, DatasetContent, EquipmentDataset
+from .reports import discard_reports, schedule_report
+from .stats import RunningStats
+from .trends import record_append, trends_enabled
+
+
+TOP_UP_DIVISOR = 8
+
+
+def chunk_rows():
+    return getattr(settings, 'EQUIPMENT_INGEST_CHUNKSIZE', DEFAULT_CHUNKSIZE)
+
+
+def csv_engine():
+    return getattr(settings, 'EQUIPMENT_CSV_ENGINE', None) or default_engine()
+
+
+# Appends parsed DataFrame chunks to a DatasetContent as DatasetChunk rows,
+# from chunk index and row row_start on
+class ChunkWriter:
+    def __init__(self, content, index=0, row_start=0):
+        self.content = content
+        self.index = index
+        self.row_start = row_start
+        self.compress = getattr(settings, 'EQUIPMENT_COLUMNAR_COMPRESS', True)
+
+    def write(self, df):
+        # Empty chunks are skipped, except the first so the column list survives
+        if not len(df) and self.index:
+            return
+        DatasetChunk.objects.create(
+            content=self.content,
+            index=self.index,
+            row_start=self.row_start,
+            row_count=len(df),
+            payload=encode_frame(df.reset_index(drop=True), compress=self.compress)
+        )
+        self.index += 1
+        self.row_start += len(df)
+
+    def write_frame(self, df, chunksize=None):
+        chunksize = chunksize or chunk_rows()
+        for start in range(0, max(len(df), 1), chunksize):
+            self.write(df.iloc[start:start + chunksize])
+
+
+def _project(frame, columns):
+    if columns is None:
+        return frame
+    return frame[[col for col in columns if col in frame.columns]]
+
+
+# Yield a dataset's rows one stored chunk at a time, optionally projected
+def iter_frames(dataset, columns=None):
+    if dataset.storage_format == EquipmentDataset.STORAGE_JSON:
+        yield _project(pd.DataFrame(json.loads(dataset.raw_data or '[]')), columns)
+        return
+    payloads = DatasetChunk.objects.filter(content_id=dataset.content_id).order_by('index').values_list('payload', flat=True)
+    for payload in payloads.iterator(chunk_size=1):
+        yield decode_frame(bytes(payload), columns)
+
+
+def _concat(frames, columns=None):
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_frame(dataset, columns=None):
+    return _concat(list(iter_frames(dataset, columns)), columns)
+
+
+# Rows [start, stop), decoding only the chunks that overlap that range
+def read_rows(dataset, start, stop, columns=None):
+    if dataset.storage_format == EquipmentDataset.STORAGE_JSON:
+        return load_frame(dataset, columns).iloc[start:stop].reset_index(drop=True)
+    chunks = (DatasetChunk.objects
+              .filter(content_id=dataset.content_id, row_start__lt=stop)
+              .annotate(row_end=F('row_start') + F('row_count'))
+              .filter(row_end__gt=start)
+              .order_by('index')
+              .values_list('row_start', 'payload'))
+    frames = []
+    for row_start, payload in chunks:
+        frame = decode_frame(bytes(payload), columns)
+        frames.append(frame.iloc[max(start - row_start, 0):stop - row_start])
+    return _concat(frames, columns).reset_index(drop=True)
+
+
+# Rows at arbitrary positions (e.g. a sorted page), in the order given
+def take_rows(dataset, positions, columns=None):
+    positions = np.asarray(positions, dtype=np.int64)
+    if dataset.storage_format == EquipmentDataset.STORAGE_JSON:
+        return load_frame(dataset, columns).iloc[positions].reset_index(drop=True)
+    bounds = list(DatasetChunk.objects.filter(content_id=dataset.content_id).order_by('index')
+                  .values_list('index', 'row_start'))
+    if not len(positions) or not bounds:
+        return _concat([], columns)
+    starts = np.array([row_start for _, row_start in bounds], dtype=np.int64)
+    owner = np.searchsorted(starts, positions, side='right') - 1
+    frames = []
+    order = []
+    for chunk_pos in np.unique(owner):
+        selected = np.flatnonzero(owner == chunk_pos)
+        index, row_start = bounds[chunk_pos]
+        payload = (DatasetChunk.objects.filter(content_id=dataset.content_id, index=index)
+                   .values_list('payload', flat=True).get())
+        frames.append(decode_frame(bytes(payload), columns).iloc[positions[selected] - row_start])
+        order.append(selected)
+    frame = _concat(frames, columns).reset_index(drop=True)
+    # Undo the grouping by chunk so rows come back in the requested order
+    return frame.iloc[np.argsort(np.concatenate(order), kind='stable')].reset_index(drop=True)
+
+
+# One JSON array of records, written a frame at a time
+def records_json_parts(frames):
+    yield '['
+    first = True
+    for frame in frames:
+        records = frame.to_json(orient='records')
+        if records != '[]':
+            if not first:
+                yield ','
+            yield records[1:-1]
+            first = False
+    yield ']'
+
+
+def frame_slices(df, chunksize=None):
+    chunksize = chunksize or chunk_rows()
+    return (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+
+
+# The JSON text raw_data used to hold, from whichever storage is in use,
+# one stored chunk at a time
+def iter_records_json(dataset):
+    if dataset.storage_format == EquipmentDataset.STORAGE_JSON:
+        yield dataset.raw_data or '[]'
+        return
+    yield from records_json_parts(iter_frames(dataset))
+
+
+def records_json(dataset):
+    return ''.join(iter_records_json(dataset))
+
+
+def convert_to_columnar(dataset, chunksize=None):
+    frame = pd.DataFrame(json.loads(dataset.raw_data or '[]'))
+    with transaction.atomic():
+        # The original file bytes are gone, so converted content has no hash
+        # and is never a dedup candidate
+        content = DatasetContent.objects.create(
+            **{field: getattr(dataset, field) for field in DatasetContent.SUMMARY_FIELDS}
+        )
+        ChunkWriter(content).write_frame(frame, chunksize)
+        summary = RunningSummary()
+        summary.update(frame)
+        store_statistics(content, summary)
+        dataset.content = content
+        dataset.raw_data = ''
+        dataset.storage_format = EquipmentDataset.STORAGE_COLUMNAR
+        dataset.save(update_fields=['content', 'raw_data', 'storage_format'])
+
+
+# Parse csv_file chunk by chunk straight into new content (see
+# create_content); on_chunk(chunk) runs after each chunk is stored
+def ingest_content(csv_file, digest, on_chunk=None):
+    def build(content):
+        writer = ChunkWriter(content)
+        
+        def write(chunk):
+            writer.write(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+        
+        summary = ingest_csv(csv_file, chunksize=chunk_rows(), on_chunk=write, engine=csv_engine())
+        for field, value in summary.as_dict().items():
+            setattr(content, field, value)
+        store_statistics(content, summary)
+    
+    return create_content(digest, build)
+
+
+# One vectorized pass over a dataset's rows; content keeps the result
+def compute_statistics(dataset):
+    summary = RunningSummary()
+    for frame in iter_frames(dataset):
+        summary.update(frame)
+    if dataset.content_id is not None:
+        store_statistics(dataset.content, summary)
+    return summary
+
+
+# The RunningSummary a dataset's rows were summarised into, rebuilt from the
+# stats table's sketches and the content's counts without reading a row
+# (content stored before statistics existed gets one pass instead)
+def stored_summary(dataset):
+    content = dataset.content
+    rows = list(ColumnStatistics.objects.filter(content=content).only('column', 'group', 'sketch'))
+    if not rows:
+        summary = compute_statistics(dataset)
+    else:
+        summary = RunningSummary()
+        summary.total_count = content.total_count
+        summary.group_counts = dict(content.type_distribution)
+        for row in rows:
+            if row.column in summary.columns:
+                columns = summary.overall if row.group == '' else summary.group_stats(row.group)
+                columns[row.column] = RunningStats.from_state(row.sketch)
+    summary.validation.count = content.invalid_cells
+    summary.validation.errors = list(content.validation_errors)
+    return summary
+
+
+# Store chunks after content's last one. A last chunk under 1/TOP_UP_DIVISOR
+# of chunksize is decoded and rewritten with the new rows in front, rather
+# than followed by another tiny one: repeated small appends then cost at most
+# that many rows to re-encode, and chunks stay at least that big. Chunks
+# must have the stored columns, in any order.
+def append_chunks(content, chunks, chunksize=None):
+    chunksize = chunksize or chunk_rows()
+    last = DatasetChunk.objects.filter(content=content).order_by('-index').first()
+    writer = ChunkWriter(content)
+    columns = None
+    pending = []
+    if last is not None:
+        payload = bytes(last.payload)
+        columns = payload_columns(payload)
+        writer = ChunkWriter(content, last.index + 1, last.row_start + last.row_count)
+        if last.row_count < chunksize // TOP_UP_DIVISOR:
+            pending.append(decode_frame(payload))
+            writer = ChunkWriter(content, last.index, last.row_start)
+            last.delete()
+    buffered = sum(len(frame) for frame in pending)
+    for chunk in chunks:
+        if columns is None:
+            columns = [str(col) for col in chunk.columns]
+        if sorted(map(str, chunk.columns)) != sorted(columns):
+            raise IngestError(f'Appended CSV must have the columns {columns}')
+        pending.append(chunk[columns])
+        buffered += len(chunk)
+        if buffered >= chunksize:
+            frame = pd.concat(pending, ignore_index=True)
+            while len(frame) >= chunksize:
+                writer.write(frame.iloc[:chunksize])
+                frame = frame.iloc[chunksize:]
+            pending, buffered = [frame], len(frame)
+    if pending:
+        writer.write(_concat(pending))
+
+
+# Add csv_file's rows to the end of dataset in O(new rows): only they are
+# parsed and stored, and the summary and stats table come from merging their
+# statistics into the stored ones (see stored_summary). Content other
+# datasets share is copied first (see content.own_content). Returns the
+# dataset and the summary of the appended rows alone.
+def append_rows(dataset, csv_file):
+    if dataset.storage_format == EquipmentDataset.STORAGE_JSON:
+        convert_to_columnar(dataset)
+    added = RunningSummary()
+    
+    def parsed():
+        for chunk in iter_csv_chunks(csv_file, chunk_rows(), added.validation, csv_engine()):
+            added.update(chunk)
+            yield chunk
+    
+    with transaction.atomic():
+        # Appends to one dataset queue up here rather than merging into the
+        # same stored summary
+        dataset = EquipmentDataset.objects.select_for_update().defer('raw_data').get(pk=dataset.pk)
+        summary = stored_summary(dataset)
+        content = own_content(dataset)
+        append_chunks(content, parsed())
+        summary.merge(added)
+        for field, value in summary.as_dict().items():
+            setattr(content, field, value)
+        content.save()
+        store_statistics(content, summary)
+        for field in DatasetContent.SUMMARY_FIELDS:
+            setattr(dataset, field, getattr(content, field))
+        dataset.save(update_fields=DatasetContent.SUMMARY_FIELDS + ['content'])
+        if trends_enabled() and added.total_count:
+            record_append(dataset, added)
+        # New summary, new report and chart keys; the old PDFs go now
+        transaction.on_commit(lambda: discard_reports([dataset.id]))
+        if getattr(settings, 'EQUIPMENT_REPORT_PRERENDER', False):
+            transaction.on_commit(lambda: schedule_report(dataset))
+    return dataset, added
+
+
+# Figures from the stats table, laid out as the stats endpoint returns them.
+# Content stored before statistics existed, and datasets still in raw_data,
+# get one pass over their rows; the former keep the result.
+def dataset_statistics(dataset, by_type=True):
+    rows = []
+    if dataset.content_id is not None:
+        rows = list(ColumnStatistics.objects.filter(content_id=dataset.content_id).defer('sketch'))
+    if not rows:
+        rows = statistics_rows(dataset.content, compute_statistics(dataset))
+    
+    result = {'columns': {}}
+    if by_type:
+        result['by_type'] = {}
+    for row in sorted(rows, key=lambda row: (row.group, row.column)):
+        if not row.group:
+            result['columns'][row.column] = row.figures()
+        elif by_type:
+            result['by_type'].setdefault(row.group, {})[row.column] = row.figures()
+    return result
+
+
+# ============================================
+# backend/equipment/uploadhandlers.py
+# ============================================
+import hashlib
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+# Spools uploads to disk like the stock handler, hashing each block as it
+# arrives so deduplication needs no second pass over the file
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+    
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+    
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.sha256 = self.sha256.hexdigest()
+        return upload
+
+
+# ============================================
+# backend/equipment/authentication.py
+# ============================================
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_init, post_save
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 5 * 60
+TOKEN_LOCAL_TTL = 5
+QUERY_PARAM = None
+# Changing any of these changes what a request with the user's token may do
+AUTH_FIELDS = ('password', 'is_active', 'is_staff', 'is_superuser')
+
+
+# Least recently used entries of this process, each good for its own ttl
+class LocalTokenCache:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+    
+    def set(self, key, value, ttl, size):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+    
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_local = LocalTokenCache()
+
+
+def shared_cache():
+    alias = getattr(settings, 'EQUIPMENT_TOKEN_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def token_ttl():
+    return getattr(settings, 'EQUIPMENT_TOKEN_CACHE_TTL', TOKEN_CACHE_TTL)
+
+
+# Other processes cannot drop entries from this one's LRU, so with a shared
+# cache the LRU only spares repeat lookups within a few seconds
+def local_ttl():
+    if shared_cache() is None:
+        return token_ttl()
+    return min(token_ttl(), getattr(settings, 'EQUIPMENT_TOKEN_LOCAL_TTL', TOKEN_LOCAL_TTL))
+
+
+# Tokens are credentials: only a hash of one is ever used as a cache key
+def cache_key(key):
+    return 'equipment-token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def forget_token(key):
+    name = cache_key(key)
+    _local.discard(name)
+    shared = shared_cache()
+    if shared is not None:
+        shared.delete(name)
+
+
+# TokenAuthentication with the Token -> User join cached, in an LRU of
+# EQUIPMENT_TOKEN_CACHE_SIZE entries per process and, when
+# EQUIPMENT_TOKEN_CACHE names a CACHES alias, in a cache all processes
+# share. Entries live EQUIPMENT_TOKEN_CACHE_TTL seconds at most and are
+# dropped as soon as the token is deleted or replaced or its user's
+# AUTH_FIELDS change. Naming a query parameter in EQUIPMENT_TOKEN_QUERY_PARAM
+# (off by default) also accepts the token there, for links that cannot carry
+# a header; both take the same cached path.
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+        param = getattr(settings, 'EQUIPMENT_TOKEN_QUERY_PARAM', QUERY_PARAM)
+        key = request.GET.get(param) if param else None
+        return self.authenticate_credentials(key) if key else None
+    
+    def authenticate_credentials(self, key):
+        name = cache_key(key)
+        user = _local.get(name)
+        if user is None:
+            shared = shared_cache()
+            user = shared.get(name) if shared is not None else None
+            if user is None:
+                # Raises AuthenticationFailed for unknown keys and inactive users
+                user, _ = super().authenticate_credentials(key)
+                if shared is not None:
+                    shared.set(name, user, token_ttl())
+            _local.set(name, user, local_ttl(), getattr(settings, 'EQUIPMENT_TOKEN_CACHE_SIZE', TOKEN_CACHE_SIZE))
+        # The cached instance is shared between threads; each request gets its own
+        user = copy.copy(user)
+        return user, Token(key=key, user=user)
+
+
+def _token_changed(sender, instance, **kwargs):
+    forget_token(instance.key)
+
+
+# The user fields a cached token answers for, as last loaded or saved.
+# Deferred fields count as unknown (and so as changed once they are saved).
+def auth_state(user):
+    return tuple(user.__dict__.get(field) for field in AUTH_FIELDS)
+
+
+def _user_loaded(sender, instance, **kwargs):
+    instance._token_auth_state = auth_state(instance)
+
+
+# Saves that leave AUTH_FIELDS alone, like the last_login update on every
+# login, keep the cached tokens and cost no query
+def _user_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(AUTH_FIELDS):
+        return
+    state = auth_state(instance)
+    previous = getattr(instance, '_token_auth_state', None)
+    instance._token_auth_state = state
+    if created or state == previous:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        forget_token(key)
+
+
+post_save.connect(_token_changed, sender=Token)
+post_delete.connect(_token_changed, sender=Token)
+post_init.connect(_user_loaded, sender=settings.AUTH_USER_MODEL)
+post_save.connect(_user_changed, sender=settings.AUTH_USER_MODEL)
+
+
+# ============================================
+# backend/equipment/instrumentation.py
+# ============================================
+import contextlib
+import contextvars
+import cProfile
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.db import connection
+from rest_framework.exceptions import AuthenticationFailed
+from .authentication import CachedTokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket bounds, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROFILE_HEADER = 'X-Profile'
+
+_timings = contextvars.ContextVar('equipment_timings', default=None)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+    
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            yield f'{name}_bucket', {**labels, 'le': repr(bound)}, cumulative
+        yield f'{name}_bucket', {**labels, 'le': '+Inf'}, self.count
+        yield f'{name}_sum', labels, self.sum
+        yield f'{name}_count', labels, self.count
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# In-process counters and histograms, served in the Prometheus text format
+# by GET /api/metrics/. Each server process keeps its own.
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.request_seconds = {}
+            self.span_seconds = {}
+            self.db_queries = {}
+            self.db_seconds = {}
+    
+    def observe_request(self, view, method, status, seconds, queries, db_seconds):
+        with self.lock:
+            key = (view, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.request_seconds.setdefault(view, Histogram()).observe(seconds)
+            self.db_queries[view] = self.db_queries.get(view, 0) + queries
+            self.db_seconds[view] = self.db_seconds.get(view, 0.0) + db_seconds
+    
+    def observe_span(self, name, seconds):
+        with self.lock:
+            self.span_seconds.setdefault(name, Histogram()).observe(seconds)
+    
+    def render(self):
+        families = [
+            ('equipment_requests_total', 'counter', 'Requests handled, by view, method and status.',
+             [('equipment_requests_total', {'view': view, 'method': method, 'status': status}, count)
+              for (view, method, status), count in sorted(self.requests.items())]),
+            ('equipment_request_duration_seconds', 'histogram', 'Request handling time, by view.',
+             [sample for view, histogram in sorted(self.request_seconds.items())
+              for sample in histogram.samples('equipment_request_duration_seconds', {'view': view})]),
+            ('equipment_span_duration_seconds', 'histogram', 'Time spent in each instrumented stage.',
+             [sample for span, histogram in sorted(self.span_seconds.items())
+              for sample in histogram.samples('equipment_span_duration_seconds', {'span': span})]),
+            ('equipment_db_queries_total', 'counter', 'Database queries run while handling requests, by view.',
+             [('equipment_db_queries_total', {'view': view}, count) for view, count in sorted(self.db_queries.items())]),
+            ('equipment_db_duration_seconds_total', 'counter', 'Time spent in database queries, by view.',
+             [('equipment_db_duration_seconds_total', {'view': view}, seconds)
+              for view, seconds in sorted(self.db_seconds.items())]),
+        ]
+        lines = []
+        with self.lock:
+            for name, kind, help_text, samples in families:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for sample, labels, value in samples:
+                    label_text = ','.join(f'{key}="{_label_value(val)}"' for key, val in labels.items())
+                    lines.append(f'{sample}{{{label_text}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def record_span(name, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+    metrics.observe_span(name, seconds)
+
+
+# Time a stage of request handling: it shows up in the request's
+# Server-Timing header and in the span histogram of /api/metrics/. Outside
+# a request (e.g. on a worker thread) only the histogram is updated.
+@contextlib.contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def server_timing(timings, queries, db_seconds, total):
+    merged = {}
+    for name, seconds in timings:
+        merged[name] = merged.get(name, 0.0) + seconds
+    entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in merged.items()]
+    entries.append(f'db;dur={db_seconds * 1000:.1f};desc="{queries} queries"')
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def profile_dir():
+    directory = getattr(settings, 'EQUIPMENT_PROFILE_DIR', None)
+    if directory is None:
+        directory = os.path.join(tempfile.gettempdir(), 'equipment_profiles')
+    return str(directory)
+
+
+# Only staff may profile. DRF authenticates inside the view, after the
+# profiler has to start, so the token is checked here as well.
+def may_profile(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            authenticated = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        user = authenticated[0] if authenticated else None
+    return bool(user and user.is_active and user.is_staff)
+
+
+# X-Profile: cprofile (or 1) writes a .prof file for pstats/snakeviz;
+# X-Profile: pyinstrument writes an HTML report if pyinstrument is installed
+class RequestProfiler:
+    def __init__(self, kind):
+        self.kind = 'cprofile'
+        if kind == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logger.warning('pyinstrument is not installed; using cProfile')
+            else:
+                self.kind = kind
+                self.profiler = Profiler()
+        if self.kind == 'cprofile':
+            self.profiler = cProfile.Profile()
+    
+    def start(self):
+        if self.kind == 'cprofile':
+            self.profiler.enable()
+        else:
+            self.profiler.start()
+    
+    def stop(self):
+        if self.kind == 'cprofile':
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+    
+    def save(self, label):
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '-', label).strip('-')
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:8]}"
+        if self.kind == 'cprofile':
+            path = os.path.join(directory, f'{name}.prof')
+            self.profiler.dump_stats(path)
+        else:
+            path = os.path.join(directory, f'{name}.html')
+            with open(path, 'w') as f:
+                f.write(self.profiler.output_html())
+        return path
+
+
+# Times every request and its database queries, adds a Server-Timing header
+# (the spans above, "db" and "total"), feeds /api/metrics/, and profiles
+# requests from staff that send an X-Profile header
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        timings = []
+        db = {'queries': 0, 'seconds': 0.0}
+        
+        def timed_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db['queries'] += 1
+                db['seconds'] += time.perf_counter() - start
+        
+        profiler = None
+        kind = request.headers.get(PROFILE_HEADER)
+        if kind and may_profile(request):
+            profiler = RequestProfiler(kind.lower())
+        
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timed_query):
+                if profiler is not None:
+                    profiler.start()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.stop()
+        finally:
+            _timings.reset(token)
+        total = time.perf_counter() - start
+        
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        metrics.observe_request(view, request.method, response.status_code, total, db['queries'], db['seconds'])
+        response['Server-Timing'] = server_timing(timings, db['queries'], db['seconds'], total)
+        if profiler is not None:
+            path = profiler.save(view)
+            logger.info('Profiled %s %s to %s', request.method, request.path, path)
+            response['X-Profile-File'] = os.path.basename(path)
+        return response
+    
+    # DRF responses render after the view returns; time that as "render"
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+        response.add_post_render_callback(lambda rendered: record_span('render', time.perf_counter() - start))
+        return response
+
+
+# ============================================
+# backend/equipment/content.py
+# ============================================
+import hashlib
+from datetime import timedelta
+from itertools import islice
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, ProtectedError, Q, Subquery
+from django.utils import timezone
+from .models import ColumnStatistics, DatasetChunk, DatasetContent, EquipmentDataset
+from .instrumentation import span
+from .reports import discard_reports, schedule_report
+from .trends import record_trend, record_trends, trends_enabled
+
+CONTENT_CACHE_SIZE = 20
+CHUNK_INSERT_BATCH = 50
+CONTENT_CACHE_TTL = 24 * 60 * 60
+HISTORY_LIMIT = 5
+
+
+def history_limit():
+    return getattr(settings, 'EQUIPMENT_HISTORY_LIMIT', HISTORY_LIMIT)
+
+
+def upload_digest(upload):
+    digest = getattr(upload, 'sha256', None)
+    if digest:
+        return digest
+    # HashingTemporaryFileUploadHandler not installed: hash here and rewind
+    sha256 = hashlib.sha256()
+    for block in upload.chunks():
+        sha256.update(block)
+    upload.seek(0)
+    return sha256.hexdigest()
+
+
+def find_content(digest):
+    content = DatasetContent.objects.filter(sha256=digest).first()
+    if content is not None:
+        DatasetContent.objects.filter(pk=content.pk).update(last_used_at=timezone.now())
+    return content
+
+
+# build(content) must write the chunks and set the summary fields. If an
+# identical upload committed first, its content is returned instead.
+def create_content(digest, build):
+    try:
+        with transaction.atomic():
+            # Placeholder summary until build() has seen every row
+            content = DatasetContent.objects.create(
+                sha256=digest,
+                total_count=0,
+                avg_flowrate=0.0,
+                avg_pressure=0.0,
+                avg_temperature=0.0,
+                type_distribution={}
+            )
+            build(content)
+            content.save()
+        return content
+    except IntegrityError:
+        existing = find_content(digest)
+        if existing is None:
+            raise
+        return existing
+
+
+# Unsaved ColumnStatistics rows for a stats.DatasetStats: one per column
+# over all rows (group '') and one per column and Type
+def statistics_rows(content, stats):
+    groups = [('', stats.overall)] + [(str(name), columns) for name, columns in stats.groups.items()]
+    rows = []
+    for group, columns in groups:
+        for column, column_stats in columns.items():
+            rows.append(ColumnStatistics(content=content, column=column, group=group,
+                                         sketch=column_stats.to_state(), **column_stats.summary()))
+    return rows
+
+
+def store_statistics(content, stats):
+    ColumnStatistics.objects.filter(content=content).delete()
+    ColumnStatistics.objects.bulk_create(statistics_rows(content, stats), batch_size=500)
+
+
+# The content dataset may change in place (append): its own, or a private
+# copy when other datasets share it. The copy moves chunk payloads as
+# stored, without decoding them. Either way the content gives up its hash,
+# as its rows are about to stop matching the uploaded file.
+def own_content(dataset):
+    content = DatasetContent.objects.select_for_update().get(pk=dataset.content_id)
+    if not content.datasets.exclude(pk=dataset.pk).exists():
+        if content.sha256 is not None:
+            content.sha256 = None
+            content.save(update_fields=['sha256'])
+        dataset.content = content
+        return content
+    
+    original = content
+    content = DatasetContent.objects.create(
+        invalid_cells=original.invalid_cells,
+        validation_errors=original.validation_errors,
+        **original.summary()
+    )
+    chunks = (DatasetChunk(content=content, index=index, row_start=row_start, row_count=row_count,
+                           payload=payload)
+              for index, row_start, row_count, payload in
+              DatasetChunk.objects.filter(content=original).order_by('index')
+              .values_list('index', 'row_start', 'row_count', 'payload').iterator(chunk_size=CHUNK_INSERT_BATCH))
+    while True:
+        batch = list(islice(chunks, CHUNK_INSERT_BATCH))
+        if not batch:
+            break
+        DatasetChunk.objects.bulk_create(batch)
+    dataset.content = content
+    return content
+
+
+def dataset_for_content(user, filename, content):
+    return EquipmentDataset.objects.create(
+        user=user,
+        filename=filename,
+        content=content,
+        storage_format=EquipmentDataset.STORAGE_COLUMNAR,
+        **content.summary()
+    )
+
+
+# Delete all but the user's newest history_limit() datasets without loading
+# their rows. Returns the ids removed.
+def prune_history(user):
+    recent = EquipmentDataset.objects.filter(user=user).order_by('-uploaded_at', '-pk')
+    # The newest surplus dataset, as scalar subqueries off the user/uploaded_at
+    # index (MySQL refuses a LIMIT subquery inside IN); it and everything
+    # older go. Callers need the ids to drop per-dataset caches.
+    first = recent[history_limit():history_limit() + 1]
+    cutoff = Subquery(first.values('uploaded_at'))
+    surplus = recent.filter(Q(uploaded_at__lt=cutoff) | Q(uploaded_at=cutoff, pk__lte=Subquery(first.values('pk'))))
+    doomed = list(surplus.values_list('pk', flat=True))
+    if doomed:
+        # A plain delete(), so delete signals and on_delete still apply:
+        # IngestJob.dataset is cleared in one UPDATE, and only the ids are
+        # fetched for the collector
+        EquipmentDataset.objects.filter(pk__in=doomed).only('pk').delete()
+    return doomed
+
+
+# Add a dataset for content to the user's history, applying retention
+def record_upload(user, filename, content):
+    # The new dataset and the retention DELETE commit together, so a
+    # concurrent upload never sees the history over the limit
+    with transaction.atomic():
+        dataset = dataset_for_content(user, filename, content)
+        if trends_enabled():
+            record_trend(dataset)
+        with span('retention'):
+            pruned = prune_history(user)
+        transaction.on_commit(lambda: discard_reports(pruned))
+        if getattr(settings, 'EQUIPMENT_REPORT_PRERENDER', False):
+            transaction.on_commit(lambda: schedule_report(dataset))
+    release_orphaned_content()
+    return dataset
+
+
+# bulk_create, for rows whose primary keys are needed afterwards. Backends
+# that cannot return them from a bulk INSERT save one row at a time.
+def insert_all(model, objects):
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objects)
+    for obj in objects:
+        obj.save(force_insert=True)
+    return objects
+
+
+def chunk_objects(content, payloads):
+    row_start = 0
+    for index, (row_count, payload) in enumerate(payloads):
+        yield DatasetChunk(content=content, index=index, row_start=row_start, row_count=row_count,
+                           payload=payload)
+        row_start += row_count
+
+
+def _record_uploads(user, items, parsed, parse):
+    digests = {digest for _, digest in items}
+    contents = {content.sha256: content for content in DatasetContent.objects.filter(sha256__in=digests)}
+    if contents:
+        DatasetContent.objects.filter(pk__in=[c.pk for c in contents.values()]).update(last_used_at=timezone.now())
+    
+    # Content released since the caller looked for it is parsed after all
+    fresh = {}
+    for digest in digests - contents.keys():
+        fresh[digest] = parsed[digest] if digest in parsed else parse(digest)
+    created = insert_all(DatasetContent, [DatasetContent(sha256=digest, **summary.as_dict())
+                                          for digest, (summary, _) in fresh.items()])
+    contents.update((content.sha256, content) for content in created)
+    
+    statistics = []
+    for digest, (summary, payloads) in fresh.items():
+        statistics.extend(statistics_rows(contents[digest], summary))
+        # payloads may be read back from disk (jobs.PayloadSpool), so only a
+        # few are held at a time
+        chunks = chunk_objects(contents[digest], payloads)
+        while True:
+            batch = list(islice(chunks, CHUNK_INSERT_BATCH))
+            if not batch:
+                break
+            DatasetChunk.objects.bulk_create(batch)
+    ColumnStatistics.objects.bulk_create(statistics, batch_size=500)
+    
+    datasets = insert_all(EquipmentDataset, [
+        EquipmentDataset(user=user, filename=filename, content=contents[digest],
+                         storage_format=EquipmentDataset.STORAGE_COLUMNAR, **contents[digest].summary())
+        for filename, digest in items
+    ])
+    if trends_enabled():
+        record_trends(datasets)
+    with span('retention'):
+        pruned = prune_history(user)
+    transaction.on_commit(lambda: discard_reports(pruned))
+    if getattr(settings, 'EQUIPMENT_REPORT_PRERENDER', False):
+        for dataset in datasets:
+            if dataset.id not in pruned:
+                transaction.on_commit(lambda dataset=dataset: schedule_report(dataset))
+    return datasets, pruned
+
+
+# Batch counterpart of create_content plus record_upload. items are
+# (filename, digest) pairs; parsed maps digests without stored content to
+# (summary, [(row_count, payload), ...]) from ingest.parse_file, and
+# parse(digest) fills any gap. Content, chunks, statistics and datasets
+# are each one bulk INSERT, and retention runs once, in one transaction.
+# Returns the datasets in item order and the ids retention removed.
+def record_uploads(user, items, parsed, parse):
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                datasets, pruned = _record_uploads(user, items, parsed, parse)
+            break
+        except IntegrityError:
+            # An identical file was stored concurrently; the retry reuses it
+            if attempt:
+                raise
+    release_orphaned_content()
+    return datasets, pruned
+
+
+# Reference counting is the set of datasets pointing at a content row. Content
+# nobody references is kept as a small LRU cache (EQUIPMENT_CONTENT_CACHE_SIZE
+# entries, at most EQUIPMENT_CONTENT_CACHE_TTL seconds old) so a re-upload can
+# still hit; everything else is deleted along with its chunks.
+def release_orphaned_content():
+    size = getattr(settings, 'EQUIPMENT_CONTENT_CACHE_SIZE', CONTENT_CACHE_SIZE)
+    ttl = getattr(settings, 'EQUIPMENT_CONTENT_CACHE_TTL', CONTENT_CACHE_TTL)
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    
+    orphans = (DatasetContent.objects
+               .annotate(refs=Count('datasets'))
+               .filter(refs=0)
+               .order_by('-last_used_at'))
+    doomed = set(orphans.filter(last_used_at__lt=cutoff).values_list('pk', flat=True))
+    doomed.update(orphans.values_list('pk', flat=True)[size:])
+    if not doomed:
+        return 0
+    try:
+        # datasets__isnull re-checks at delete time; a dataset created since
+        # the scan makes PROTECT refuse rather than lose its rows
+        deleted, _ = DatasetContent.objects.filter(pk__in=doomed, datasets__isnull=True).delete()
+    except ProtectedError:
+        return 0
+    return deleted
+
+
+# ============================================
+# backend/equipment/reports.py
+# ============================================
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from .instrumentation import span
+from .models import EquipmentDataset
+
+logger = logging.getLogger(__name__)
+
+# Bump when render_report's layout changes so cached PDFs are not reused
+REPORT_VERSION = 1
+REPORT_WORKERS = 2
+
+
+# The report only depends on these values, so their hash is both the cache
+# key and the ETag: any change to the dataset yields a new key, and stale
+# renders are simply never looked up again.
+def report_etag(dataset):
+    inputs = [REPORT_VERSION, dataset.id, dataset.filename, dataset.total_count,
+              dataset.avg_flowrate, dataset.avg_pressure, dataset.avg_temperature,
+              dataset.type_distribution]
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def render_report(dataset):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+    styles = getSampleStyleSheet()
+    
+    # Title
+    title = Paragraph(f"Equipment Report - {dataset.filename}", styles['Heading1'])
+    elements.append(title)
+    elements.append(Spacer(1, 12))
+    
+    # Summary
+    summary_text = f"""
+    <b>Summary Statistics</b><br/>
+    Total Equipment: {dataset.total_count}<br/>
+    Average Flowrate: {dataset.avg_flowrate:.2f}<br/>
+    Average Pressure: {dataset.avg_pressure:.2f}<br/>
+    Average Temperature: {dataset.avg_temperature:.2f}<br/>
+    """
+    elements.append(Paragraph(summary_text, styles['Normal']))
+    elements.append(Spacer(1, 12))
+    
+    # Type Distribution
+    dist_data = [['Equipment Type', 'Count']]
+    for eq_type, count in dataset.type_distribution.items():
+        dist_data.append([eq_type, str(count)])
+    
+    table = Table(dist_data)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(table)
+    
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+# Rendered PDFs as files under EQUIPMENT_REPORT_DIR, named
+# <dataset id>-<etag>.pdf so one dataset's older renders are easy to drop
+class FileReportStore:
+    def __init__(self, directory):
+        self.directory = directory
+    
+    def path(self, dataset_id, etag):
+        return os.path.join(self.directory, f'{dataset_id}-{etag}.pdf')
+    
+    def open(self, dataset_id, etag):
+        try:
+            return open(self.path(dataset_id, etag), 'rb')
+        except FileNotFoundError:
+            return None
+    
+    def save(self, dataset_id, etag, pdf):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write then rename, so a concurrent reader never sees half a PDF
+        fd, partial = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pdf)
+        os.replace(partial, self.path(dataset_id, etag))
+        self.discard(dataset_id, keep=etag)
+    
+    def discard(self, dataset_id, keep=None):
+        prefix = f'{dataset_id}-'
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.startswith(prefix) and name.endswith('.pdf') and name != f'{prefix}{keep}.pdf':
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+
+# Rendered PDFs in a Django cache backend (e.g. Redis or memcached shared by
+# several app servers). Old versions expire with the backend's own timeout.
+class CacheReportStore:
+    def __init__(self, alias):
+        self.cache = caches[alias]
+    
+    def key(self, dataset_id, etag):
+        return f'equipment-report:{dataset_id}:{etag}'
+    
+    def open(self, dataset_id, etag):
+        pdf = self.cache.get(self.key(dataset_id, etag))
+        return BytesIO(pdf) if pdf is not None else None
+    
+    def save(self, dataset_id, etag, pdf):
+        self.cache.set(self.key(dataset_id, etag), pdf)
+    
+    def discard(self, dataset_id, keep=None):
+        pass
+
+
+def report_store():
+    alias = getattr(settings, 'EQUIPMENT_REPORT_CACHE', None)
+    if alias:
+        return CacheReportStore(alias)
+    directory = getattr(settings, 'EQUIPMENT_REPORT_DIR', None)
+    if directory is None:
+        directory = os.path.join(tempfile.gettempdir(), 'equipment_reports')
+    return FileReportStore(str(directory))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_rendering = set()
+
+
+def report_workers():
+    return getattr(settings, 'EQUIPMENT_REPORT_WORKERS', REPORT_WORKERS)
+
+
+def _render_and_store(dataset_id, etag):
+    try:
+        dataset = EquipmentDataset.objects.defer('raw_data').filter(pk=dataset_id).first()
+        # Skip datasets deleted or changed since the render was queued
+        if dataset is not None and report_etag(dataset) == etag:
+            with span('render_report'):
+                pdf = render_report(dataset)
+            report_store().save(dataset_id, etag, pdf)
+    except Exception:
+        logger.exception('Rendering report for dataset %s failed', dataset_id)
+    finally:
+        with _executor_lock:
+            _rendering.discard(etag)
+        close_old_connections()
+
+
+# Queue a background render unless one for this version is already running.
+# With EQUIPMENT_REPORT_WORKERS = 0 the render happens inline instead.
+def schedule_report(dataset):
+    global _executor
+    etag = report_etag(dataset)
+    workers = report_workers()
+    if workers <= 0:
+        with span('render_report'):
+            pdf = render_report(dataset)
+        report_store().save(dataset.id, etag, pdf)
+        return etag
+    with _executor_lock:
+        if etag in _rendering:
+            return etag
+        _rendering.add(etag)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='equipment-report')
+    _executor.submit(_render_and_store, dataset.id, etag)
+    return etag
+
+
+def discard_reports(dataset_ids):
+    store = report_store()
+    for dataset_id in dataset_ids:
+        store.discard(dataset_id)
+
+
+# ============================================
+# backend/equipment/parallel.py
+# ============================================
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from .content import record_uploads
+from .ingest import parse_file, parse_shard, read_payloads, shard_bounds
+from .instrumentation import span
+from .storage import chunk_rows, csv_engine
+
+PARSE_WORKERS = 4
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+BEAT_WAIT = 1
+
+
+# EQUIPMENT_BATCH_WORKERS is the setting's name from before single files
+# were sharded too
+def parse_workers():
+    default = getattr(settings, 'EQUIPMENT_BATCH_WORKERS', min(PARSE_WORKERS, os.cpu_count() or 1))
+    return getattr(settings, 'EQUIPMENT_PARSE_WORKERS', default)
+
+
+def parse_options():
+    return chunk_rows(), getattr(settings, 'EQUIPMENT_COLUMNAR_COMPRESS', True), csv_engine()
+
+
+_executor = None
+_lock = threading.Lock()
+
+
+# Parsing is CPU bound, so it runs on a pool of EQUIPMENT_PARSE_WORKERS
+# processes. They are spawned rather than forked: a fork would copy this
+# server's threads and open database connections mid-use.
+def executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=parse_workers(),
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def reset_executor(broken):
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+
+
+# Whether a file of size bytes is worth splitting across the pool
+def shardable(size):
+    return parse_workers() > 1 and size >= getattr(settings, 'EQUIPMENT_PARALLEL_MIN_BYTES', PARALLEL_MIN_BYTES)
+
+
+# The chunk payloads of every shard, in file order, read back from the
+# spool files the workers wrote
+class ShardPayloads:
+    def __init__(self, paths):
+        self.paths = paths
+
+    def __iter__(self):
+        for path in self.paths:
+            with open(path, 'rb') as f:
+                yield from read_payloads(f)
+
+    def close(self):
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# parse_file for a CSV on disk, split across the process pool. Workers map
+# the file and parse their own line-aligned range of it (ingest.shard_bounds),
+# so no rows cross a process boundary in either direction: payloads go to a
+# spool file per shard and only the summaries come back, merged in file
+# order so counts, sums and the Type distribution match a serial parse.
+# on_shard(rows, bytes) runs as each shard is merged, and beat() about every
+# second while one is awaited. Returns (summary, ShardPayloads); the caller
+# closes the latter.
+def parse_sharded(path, directory, on_shard=None, pool=None, shards=None, beat=None):
+    chunksize, compress, engine = parse_options()
+    pool = pool or executor()
+    header, bounds = shard_bounds(path, shards or parse_workers())
+    paths = []
+    for _ in bounds:
+        fd, spool = tempfile.mkstemp(dir=directory, suffix='.chunks')
+        os.close(fd)
+        paths.append(spool)
+    payloads = ShardPayloads(paths)
+    futures = [pool.submit(parse_shard, path, header, start, end, spool, chunksize, compress, engine)
+               for (start, end), spool in zip(bounds, paths)]
+    summary = None
+    try:
+        for future, (start, end) in zip(futures, bounds):
+            while beat is not None and not future.done():
+                beat()
+                wait([future], timeout=BEAT_WAIT)
+            part = future.result()
+            if summary is None:
+                summary = part
+            else:
+                summary.merge(part)
+            if on_shard is not None:
+                on_shard(part.total_count, end - start)
+    except BaseException as e:
+        if isinstance(e, BrokenProcessPool):
+            reset_executor(pool)
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        payloads.close()
+        raise
+    return summary, payloads
+
+
+# Store the CSV at path as a dataset of user through parse_sharded, the way
+# a batch stores one file (see content.record_uploads)
+def ingest_sharded(user, filename, path, digest, directory, on_shard=None, beat=None):
+    os.makedirs(directory, exist_ok=True)
+    with span('parse'):
+        summary, payloads = parse_sharded(path, directory, on_shard, beat=beat)
+    try:
+        if beat is not None:
+            beat(force=True)
+        with span('record'):
+            datasets, _ = record_uploads(user, [(filename, digest)], {digest: (summary, payloads)},
+                                         lambda digest: parse_file(path, *parse_options()))
+    finally:
+        payloads.close()
+    return datasets[0]
+
+
+# ============================================
+# backend/equipment/jobs.py
+# ============================================
+import hashlib
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .content import find_content, record_upload, record_uploads
+from .ingest import IngestError, PayloadSpool, parse_file
+from .models import IngestJob
+from .parallel import ingest_sharded, parse_options, shardable
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = 2
+JOB_TIMEOUT = 10 * 60
+HEARTBEAT_INTERVAL = 15
+MAX_WAIT = 30
+PROGRESS_TIMEOUT = 24 * 60 * 60
+UPLOAD_IDLE_TIMEOUT = 60
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+POLL_INTERVAL = 0.5
+BLOCK_SIZE = 1024 * 1024
+
+
+def spool_dir():
+    directory = getattr(settings, 'EQUIPMENT_INGEST_SPOOL_DIR', None)
+    if directory is None:
+        directory = os.path.join(tempfile.gettempdir(), 'equipment_ingest')
+    return str(directory)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def progress_key(job_id):
+    return f'equipment-ingest-job:{job_id}'
+
+
+# A running job's progress moves with every chunk, so it goes to the cache
+# instead of the job row (which only takes the occasional heartbeat).
+# Workers in another process need a shared CACHES backend for pollers to
+# see it before the job finishes.
+def job_progress(job):
+    if job.status == IngestJob.RUNNING:
+        progress = cache.get(progress_key(job.id))
+        if progress:
+            return progress
+    return {'rows_done': job.rows_done, 'bytes_done': job.bytes_done}
+
+
+# Spool the upload and queue it. A file parsed before needs no worker: the
+# job is created already done.
+def enqueue_upload(user, upload, digest):
+    content = find_content(digest)
+    if content is not None:
+        dataset = record_upload(user, upload.name, content)
+        now = timezone.now()
+        return IngestJob.objects.create(
+            user=user,
+            filename=upload.name,
+            sha256=digest,
+            status=IngestJob.DONE,
+            bytes_total=upload.size,
+            bytes_done=upload.size,
+            rows_done=dataset.total_count,
+            dataset=dataset,
+            started_at=now,
+            finished_at=now
+        )
+    
+    directory = spool_dir()
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.csv')
+    with os.fdopen(fd, 'wb') as f:
+        for block in upload.chunks():
+            f.write(block)
+    job = IngestJob.objects.create(user=user, filename=upload.name, sha256=digest, file_path=path,
+                                   bytes_total=upload.size)
+    transaction.on_commit(start_local_workers)
+    return job
+
+
+# Take the oldest queued job. The UPDATE only matches while the job is still
+# queued, so of several workers racing for it exactly one wins.
+def claim_job(worker):
+    while True:
+        candidate = (IngestJob.objects.filter(status=IngestJob.QUEUED)
+                     .order_by('created_at').values_list('pk', flat=True).first())
+        if candidate is None:
+            return None
+        now = timezone.now()
+        claimed = (IngestJob.objects.filter(pk=candidate, status=IngestJob.QUEUED)
+                   .update(status=IngestJob.RUNNING, worker=worker, started_at=now, heartbeat_at=now))
+        if claimed:
+            return IngestJob.objects.select_related('user').get(pk=candidate)
+
+
+def remove_spool(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def finish_job(job, status, **fields):
+    IngestJob.objects.filter(pk=job.pk).update(status=status, finished_at=timezone.now(), file_path='', **fields)
+
+
+def job_timeout():
+    return getattr(settings, 'EQUIPMENT_INGEST_JOB_TIMEOUT', JOB_TIMEOUT)
+
+
+class JobLost(Exception):
+    pass
+
+
+# Calling it marks the job alive (heartbeat_at): the first time, then at
+# most every HEARTBEAT_INTERVAL seconds unless forced. Jobs only beat outside a
+# transaction, so other processes see it straight away. Raises JobLost once
+# the job was requeued to another worker (see requeue_stale_jobs).
+class Heartbeat:
+    def __init__(self, job):
+        self.job = job
+        self.interval = min(HEARTBEAT_INTERVAL, job_timeout() / 4)
+        self.last = None
+    
+    def __call__(self, force=False):
+        now = time.monotonic()
+        if not force and self.last is not None and now - self.last < self.interval:
+            return
+        self.last = now
+        alive = (IngestJob.objects.filter(pk=self.job.pk, status=IngestJob.RUNNING, worker=self.job.worker)
+                 .update(heartbeat_at=timezone.now()))
+        if not alive:
+            raise JobLost(f'Job {self.job.pk} was taken over by another worker')
+
+
+# The file is parsed to a PayloadSpool with no transaction open, then stored
+# like one file of a batch, in one short transaction at the end
+def ingest_spooled(job, progress, beat):
+    payloads = PayloadSpool(spool_dir())
+    try:
+        with open(job.file_path, 'rb') as f:
+            def on_chunk(chunk):
+                progress['rows_done'] += len(chunk)
+                progress['bytes_done'] = min(f.tell(), job.bytes_total)
+                cache.set(progress_key(job.id), progress, PROGRESS_TIMEOUT)
+                beat()
+            
+            summary, _ = parse_file(f, *parse_options(), chunks=payloads, on_chunk=on_chunk)
+        beat(force=True)
+        datasets, _ = record_uploads(job.user, [(job.filename, job.sha256)], {job.sha256: (summary, payloads)},
+                                     None)
+    finally:
+        payloads.close()
+    return datasets[0]
+
+
+def run_job(job):
+    if job.resumable:
+        return run_session(job)
+    progress = {'rows_done': 0, 'bytes_done': 0}
+    beat = Heartbeat(job)
+    try:
+        if shardable(job.bytes_total):
+            def on_shard(rows, size):
+                progress['rows_done'] += rows
+                progress['bytes_done'] += size
+                cache.set(progress_key(job.id), progress, PROGRESS_TIMEOUT)
+                beat()
+            
+            dataset = ingest_sharded(job.user, job.filename, job.file_path, job.sha256, spool_dir(), on_shard,
+                                     beat)
+        else:
+            dataset = ingest_spooled(job, progress, beat)
+    except JobLost:
+        # Its new worker has the spool file and reports progress now
+        logger.warning('Ingest job %s was requeued while running; dropping this run', job.pk)
+        return
+    except Exception as e:
+        if not isinstance(e, IngestError):
+            logger.exception('Ingest job %s failed', job.pk)
+        finish_job(job, IngestJob.FAILED, error=str(e), **progress)
+    else:
+        finish_job(job, IngestJob.DONE, dataset=dataset, rows_done=dataset.total_count,
+                   bytes_done=job.bytes_total)
+    cache.delete(progress_key(job.id))
+    remove_spool(job.file_path)
+
+
+# Resumable uploads. POST /api/uploads/ opens a session (a job in status
+# receiving with an empty spool file), PUTs write byte ranges into the spool
+# file, and finalize confirms every byte arrived. The first PUT queues the
+# job, so a worker parses the file while the rest of it is still arriving.
+
+
+class UploadStalled(Exception):
+    pass
+
+
+def spooled_bytes(job):
+    try:
+        return os.path.getsize(job.file_path)
+    except (OSError, ValueError):
+        return job.bytes_total if job.status == IngestJob.DONE else 0
+
+
+def create_session(user, filename, size):
+    expire_sessions()
+    directory = spool_dir()
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.csv')
+    os.close(fd)
+    return IngestJob.objects.create(user=user, filename=filename, sha256='', file_path=path,
+                                    bytes_total=size, status=IngestJob.RECEIVING, resumable=True,
+                                    finalized=False)
+
+
+# A receiving job has no worker parsing it (none yet, or its worker gave up
+# waiting for bytes); queue it so one starts
+def resume_parsing(job):
+    if IngestJob.objects.filter(pk=job.pk, status=IngestJob.RECEIVING).update(status=IngestJob.QUEUED):
+        start_local_workers()
+
+
+# Copy length bytes of stream into the spool file at offset. Writes go to
+# explicit offsets, so a retried or duplicated PUT rewrites the same bytes.
+# Returns how many bytes the spool file now holds.
+def write_chunk(job, offset, stream, length):
+    with open(job.file_path, 'r+b') as f:
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            block = stream.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            f.write(block)
+            remaining -= len(block)
+    resume_parsing(job)
+    return spooled_bytes(job)
+
+
+def finalize_session(job, sha256=''):
+    IngestJob.objects.filter(pk=job.pk).update(finalized=True, sha256=sha256)
+    resume_parsing(job)
+    job.refresh_from_db()
+    return job
+
+
+def cancel_session(job):
+    finish_job(job, IngestJob.FAILED, error='Upload cancelled')
+    remove_spool(job.file_path)
+
+
+# Sessions nobody has sent a byte to for EQUIPMENT_UPLOAD_SESSION_TTL seconds
+def expire_sessions():
+    ttl = getattr(settings, 'EQUIPMENT_UPLOAD_SESSION_TTL', UPLOAD_SESSION_TTL)
+    for job in IngestJob.objects.filter(resumable=True, status=IngestJob.RECEIVING):
+        try:
+            idle = time.time() - os.path.getmtime(job.file_path)
+        except OSError:
+            idle = ttl + 1
+        if idle > ttl:
+            finish_job(job, IngestJob.FAILED, error='Upload expired')
+            remove_spool(job.file_path)
+
+
+# File-like view of a session's spool file while it is still being written.
+# Reads wait for more bytes up to bytes_total, then for finalize, and raise
+# UploadStalled after EQUIPMENT_UPLOAD_IDLE_TIMEOUT seconds without either.
+# Everything read is hashed, so sha256 is known once pandas reaches the end.
+# beat (a Heartbeat) keeps the job alive while it waits on the client.
+class SpoolReader:
+    def __init__(self, job, on_read=None, beat=None):
+        self.job = job
+        self.file = open(job.file_path, 'rb')
+        self.hash = hashlib.sha256()
+        self.position = 0
+        self.sha256 = None
+        self.on_read = on_read
+        self.beat = beat
+        self.idle_timeout = getattr(settings, 'EQUIPMENT_UPLOAD_IDLE_TIMEOUT', UPLOAD_IDLE_TIMEOUT)
+
+    # pandas only treats objects with __iter__ as files
+    def __iter__(self):
+        return iter(lambda: self.read(BLOCK_SIZE), b'')
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = BLOCK_SIZE
+        idle_since = time.monotonic()
+        while True:
+            wanted = min(size, self.job.bytes_total - self.position)
+            if wanted <= 0:
+                self.finish(idle_since)
+                return b''
+            block = self.file.read(wanted)
+            if block:
+                self.hash.update(block)
+                self.position += len(block)
+                if self.on_read is not None:
+                    self.on_read(self.position)
+                return block
+            self.wait(idle_since)
+
+    def wait(self, idle_since):
+        status = IngestJob.objects.filter(pk=self.job.pk).values_list('status', flat=True).first()
+        if status != IngestJob.RUNNING:
+            raise UploadStalled('Upload cancelled')
+        if time.monotonic() - idle_since > self.idle_timeout:
+            raise UploadStalled('No data from the client')
+        if self.beat is not None:
+            self.beat()
+        time.sleep(POLL_INTERVAL)
+
+    # Every byte is in; hold the end of the file back until the client
+    # finalizes, and check the checksum it sent, if any
+    def finish(self, idle_since):
+        if self.sha256 is not None:
+            return
+        while True:
+            state = IngestJob.objects.filter(pk=self.job.pk).values_list('finalized', 'sha256').first()
+            if state is not None and state[0]:
+                break
+            self.wait(idle_since)
+        self.sha256 = self.hash.hexdigest()
+        if state[1] and state[1].lower() != self.sha256:
+            raise IngestError('Upload is corrupt: its sha256 does not match the one sent on finalize')
+
+    def close(self):
+        self.file.close()
+
+
+# Parse a session's file as it arrives, then store it like one file of a
+# batch: content, chunks and dataset in one short transaction at the end.
+# Nothing is held open while waiting on the client, and a stalled upload
+# goes back to receiving; its next PUT or finalize starts the parse over.
+# The job beats for as long as bytes keep coming, however slowly, so a
+# session is only requeued if its worker is gone.
+def run_session(job):
+    progress = {'rows_done': 0, 'bytes_done': 0}
+    payloads = PayloadSpool(spool_dir())
+    beat = Heartbeat(job)
+    
+    def on_read(position):
+        progress['bytes_done'] = position
+        beat()
+    
+    def on_chunk(chunk):
+        progress['rows_done'] += len(chunk)
+        cache.set(progress_key(job.id), progress, PROGRESS_TIMEOUT)
+    
+    reader = SpoolReader(job, on_read, beat)
+    # pyarrow would call read() from its own I/O threads, and the reader's
+    # waits query the job; pandas' C parser reads on this thread
+    chunksize, compress, _ = parse_options()
+    try:
+        summary, _ = parse_file(reader, chunksize, compress, 'c', chunks=payloads, on_chunk=on_chunk)
+        digest = reader.sha256
+        beat(force=True)
+        datasets, _ = record_uploads(job.user, [(job.filename, digest)], {digest: (summary, payloads)}, None)
+    except UploadStalled:
+        # Only while this worker still holds the job: another may have it now
+        IngestJob.objects.filter(pk=job.pk, status=IngestJob.RUNNING, worker=job.worker).update(
+            status=IngestJob.RECEIVING, worker='', started_at=None, heartbeat_at=None)
+        return
+    except JobLost:
+        logger.warning('Upload session %s was requeued while running; dropping this run', job.pk)
+        return
+    except Exception as e:
+        if not isinstance(e, IngestError):
+            logger.exception('Upload session %s failed', job.pk)
+        finish_job(job, IngestJob.FAILED, error=str(e), **progress)
+        remove_spool(job.file_path)
+    else:
+        finish_job(job, IngestJob.DONE, dataset=datasets[0], sha256=digest,
+                   rows_done=datasets[0].total_count, bytes_done=job.bytes_total)
+        remove_spool(job.file_path)
+    finally:
+        reader.close()
+        payloads.close()
+        cache.delete(progress_key(job.id))
+
+
+# Run queued jobs until none are left; returns how many ran
+def process_jobs(worker):
+    count = 0
+    while True:
+        job = claim_job(worker)
+        if job is None:
+            return count
+        run_job(job)
+        count += 1
+
+
+# Jobs whose worker has not beaten for EQUIPMENT_INGEST_JOB_TIMEOUT seconds
+# are taken to be dead and go back to the queue. Rows claimed before
+# heartbeat_at existed fall back to started_at.
+def requeue_stale_jobs():
+    cutoff = timezone.now() - timedelta(seconds=job_timeout())
+    stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at=None, started_at__lt=cutoff)
+    return (IngestJob.objects.filter(stale, status=IngestJob.RUNNING)
+            .update(status=IngestJob.QUEUED, worker='', heartbeat_at=None))
+
+
+# Long-poll: return once the job finishes or its progress moves past
+# rows_seen (default: what it was on entry), or after timeout seconds
+def wait_for_job(job, timeout, rows_seen=None, interval=0.25):
+    status = job.status
+    if rows_seen is None:
+        rows_seen = job_progress(job)['rows_done']
+    deadline = time.monotonic() + min(timeout, MAX_WAIT)
+    while job.status not in IngestJob.FINISHED and job.status == status \
+            and job_progress(job)['rows_done'] == rows_seen and time.monotonic() < deadline:
+        time.sleep(interval)
+        job.refresh_from_db()
+    return job
+
+
+_executor = None
+_lock = threading.Lock()
+_active = 0
+
+
+def job_workers():
+    return getattr(settings, 'EQUIPMENT_INGEST_WORKERS', JOB_WORKERS)
+
+
+# Process queued jobs on up to EQUIPMENT_INGEST_WORKERS threads of this
+# process. With 0, jobs wait for `manage.py ingest_worker` instead.
+def start_local_workers():
+    global _executor, _active
+    workers = job_workers()
+    if workers <= 0:
+        return
+    with _lock:
+        if _active >= workers:
+            return
+        _active += 1
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='equipment-ingest')
+    _executor.submit(_drain)
+
+
+def _drain():
+    global _active
+    try:
+        requeue_stale_jobs()
+        expire_sessions()
+        process_jobs(worker_name())
+    except Exception:
+        logger.exception('Ingest worker stopped')
+    finally:
+        with _lock:
+            _active -= 1
+    try:
+        # A job queued while this thread was winding down found the pool full
+        if IngestJob.objects.filter(status=IngestJob.QUEUED).exists():
+            start_local_workers()
+    finally:
+        close_old_connections()
+
+
+# ============================================
+# backend/equipment/batch.py
+# ============================================
+import hashlib
+import os
+import posixpath
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from .content import record_uploads
+from .ingest import IngestError, parse_file, parse_to_spool
+from .instrumentation import span
+from .jobs import spool_dir
+from .models import DatasetContent
+from .parallel import ShardPayloads, executor, parse_options, parse_workers, reset_executor
+
+MAX_BATCH_FILES = 100
+MAX_BATCH_BYTES = 2 * 1024 * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+
+
+def max_batch_files():
+    return getattr(settings, 'EQUIPMENT_BATCH_MAX_FILES', MAX_BATCH_FILES)
+
+
+# One CSV of a batch, spooled to its own file and hashed on the way. Once
+# parsed, its chunk payloads are in another file, at chunks.
+class Member:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.chunks = None
+        self.digest = None
+        self.size = 0
+
+
+# Spools every CSV out of the uploaded files and archives, enforcing
+# EQUIPMENT_BATCH_MAX_FILES and EQUIPMENT_BATCH_MAX_BYTES (uncompressed) so
+# a small archive cannot expand without bound
+class Spool:
+    def __init__(self):
+        self.directory = spool_dir()
+        self.members = []
+        self.budget = getattr(settings, 'EQUIPMENT_BATCH_MAX_BYTES', MAX_BATCH_BYTES)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def add(self, name, source):
+        if len(self.members) >= max_batch_files():
+            raise IngestError(f'A batch holds at most {max_batch_files()} files')
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.csv')
+        member = Member(name, path)
+        self.members.append(member)
+        sha256 = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                block = source.read(BLOCK_SIZE)
+                if not block:
+                    break
+                member.size += len(block)
+                if member.size > self.budget:
+                    raise IngestError('Batch is too large once unpacked')
+                sha256.update(block)
+                f.write(block)
+        self.budget -= member.size
+        member.digest = sha256.hexdigest()
+
+    def add_upload(self, upload):
+        name = upload.name.lower()
+        upload.seek(0)
+        try:
+            if name.endswith('.zip'):
+                with zipfile.ZipFile(upload) as archive:
+                    for info in archive.infolist():
+                        if not info.is_dir() and is_csv_member(info.filename):
+                            with archive.open(info) as f:
+                                self.add(posixpath.basename(info.filename), f)
+            elif name.endswith(('.tar', '.tar.gz', '.tgz')):
+                with tarfile.open(fileobj=upload, mode='r:*') as archive:
+                    for info in archive:
+                        if info.isfile() and is_csv_member(info.name):
+                            self.add(posixpath.basename(info.name), archive.extractfile(info))
+            else:
+                self.add(upload.name, upload)
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError):
+            raise IngestError(f'{upload.name} is not a readable archive')
+
+    def cleanup(self):
+        for member in self.members:
+            for path in (member.path, member.chunks):
+                try:
+                    if path:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+# CSVs inside an archive, less folders of OS metadata and hidden files
+def is_csv_member(path):
+    parts = path.replace('\\', '/').split('/')
+    return (parts[-1].lower().endswith('.csv') and not parts[-1].startswith('.')
+            and '__MACOSX' not in parts)
+
+
+# {digest: (summary, chunks) or the exception parsing raised}. chunks reads
+# the member's payloads back from member.chunks, where they were spooled as
+# they were parsed, so only summaries come back from the pool and storing
+# the batch holds a few chunks at a time, however many members it has.
+def parse_members(members):
+    for member in members:
+        fd, member.chunks = tempfile.mkstemp(dir=os.path.dirname(member.path), suffix='.chunks')
+        os.close(fd)
+    
+    summaries = {}
+    if parse_workers() <= 1 or len(members) <= 1:
+        for member in members:
+            try:
+                summaries[member.digest] = parse_to_spool(member.path, member.chunks, *parse_options())
+            except Exception as e:
+                summaries[member.digest] = e
+    else:
+        pool = executor()
+        futures = {member.digest: pool.submit(parse_to_spool, member.path, member.chunks, *parse_options())
+                   for member in members}
+        for digest, future in futures.items():
+            try:
+                summaries[digest] = future.result()
+            except BrokenProcessPool:
+                reset_executor(pool)
+                raise
+            except Exception as e:
+                summaries[digest] = e
+    
+    results = {}
+    for member in members:
+        summary = summaries[member.digest]
+        if not isinstance(summary, Exception):
+            try:
+                summary.check()
+            except IngestError as e:
+                summary = e
+        results[member.digest] = summary if isinstance(summary, Exception) else (
+            summary, ShardPayloads([member.chunks]))
+    return results
+
+
+# Store every CSV in uploads (plain files or .zip/.tar/.tar.gz archives of
+# them) as datasets of user. Known files are deduplicated by content hash
+# and the rest parsed in parallel; all datasets then go in with one
+# transaction and one retention pass (see content.record_uploads).
+# Returns [(member name, dataset or error message)] and the pruned ids.
+def ingest_batch(user, uploads):
+    spool = Spool()
+    try:
+        with span('spool'):
+            for upload in uploads:
+                spool.add_upload(upload)
+        if not spool.members:
+            raise IngestError('No CSV files found')
+        members = spool.members
+        
+        with span('dedup'):
+            stored = set(DatasetContent.objects.filter(sha256__in={m.digest for m in members})
+                         .values_list('sha256', flat=True))
+        pending = {m.digest: m for m in members if m.digest not in stored}
+        with span('parse'):
+            results = parse_members(list(pending.values()))
+        
+        errors = {digest: result for digest, result in results.items() if isinstance(result, Exception)}
+        parsed = {digest: result for digest, result in results.items() if digest not in errors}
+        by_digest = {m.digest: m for m in members}
+        items = [(m.name, m.digest) for m in members if m.digest not in errors]
+        datasets, pruned = [], []
+        if items:
+            with span('record'):
+                datasets, pruned = record_uploads(
+                    user, items, parsed,
+                    lambda digest: parse_file(by_digest[digest].path, *parse_options()))
+    finally:
+        spool.cleanup()
+    
+    created = iter(datasets)
+    outcome = []
+    for member in members:
+        error = errors.get(member.digest)
+        outcome.append((member.name, str(error) if error is not None else next(created)))
+    return outcome, pruned
+
+
+# ============================================
+# backend/equipment/compare.py
+# ============================================
+from .ingest import NUMERIC_COLS
+from .models import ColumnStatistics
+from .stats import RunningStats
+from .storage import compute_statistics
+
+MAX_COMPARE = 20
+FIGURES = ['count', 'mean', 'std', 'min', 'max', 'p50', 'p95', 'p99']
+
+
+# {dataset id: {column: RunningStats}} rebuilt from the stored sketches in
+# one query; only datasets without stored statistics are scanned
+def column_stats(datasets):
+    content_ids = {dataset.content_id for dataset in datasets if dataset.content_id is not None}
+    states = {}
+    rows = (ColumnStatistics.objects.filter(content_id__in=content_ids, group='')
+            .only('content_id', 'column', 'sketch'))
+    for row in rows:
+        states.setdefault(row.content_id, {})[row.column] = row.sketch
+    
+    result = {}
+    for dataset in datasets:
+        stored = states.get(dataset.content_id)
+        if stored:
+            result[dataset.id] = {column: RunningStats.from_state(state) for column, state in stored.items()}
+        else:
+            result[dataset.id] = compute_statistics(dataset).overall
+    return result
+
+
+def figures(stats):
+    return stats.summary(histogram=False)
+
+
+def distribution_delta(counts, baseline):
+    return {name: counts.get(name, 0) - baseline.get(name, 0) for name in {**baseline, **counts}}
+
+
+def distribution_shares(counts):
+    total = sum(counts.values())
+    return {name: count / total for name, count in counts.items()} if total else {}
+
+
+# Per-dataset figures, the figures of all rows taken together (sketches
+# merge exactly, so no rows are read), and each dataset's difference from
+# the baseline dataset
+def compare_datasets(datasets, baseline=None):
+    baseline = baseline or datasets[0]
+    stats = column_stats(datasets)
+    merged = {col: RunningStats() for col in NUMERIC_COLS}
+    merged_types = {}
+    entries = {}
+    for dataset in datasets:
+        columns = stats[dataset.id]
+        for col in NUMERIC_COLS:
+            if col in columns:
+                merged[col].merge(columns[col])
+        for name, count in dataset.type_distribution.items():
+            merged_types[name] = merged_types.get(name, 0) + count
+        entries[dataset.id] = {
+            'id': dataset.id,
+            'filename': dataset.filename,
+            'uploaded_at': dataset.uploaded_at,
+            'total_count': dataset.total_count,
+            'columns': {col: figures(stats) for col, stats in columns.items()},
+            'type_distribution': dataset.type_distribution,
+        }
+    
+    base = entries[baseline.id]
+    base_shares = distribution_shares(base['type_distribution'])
+    deltas = []
+    for entry in entries.values():
+        if entry is base:
+            continue
+        means = {}
+        for col in NUMERIC_COLS:
+            mean = entry['columns'].get(col, {}).get('mean')
+            base_mean = base['columns'].get(col, {}).get('mean')
+            means[col] = None if mean is None or base_mean is None else mean - base_mean
+        deltas.append({
+            'id': entry['id'],
+            'total_count': entry['total_count'] - base['total_count'],
+            'means': means,
+            'type_distribution': distribution_delta(entry['type_distribution'], base['type_distribution']),
+            'type_share': distribution_delta(distribution_shares(entry['type_distribution']), base_shares),
+        })
+    
+    return {
+        'baseline': baseline.id,
+        'datasets': list(entries.values()),
+        'merged': {
+            'total_count': sum(entry['total_count'] for entry in entries.values()),
+            'columns': {col: figures(stats) for col, stats in merged.items()},
+            'type_distribution': dict(sorted(merged_types.items(), key=lambda item: item[1], reverse=True)),
+        },
+        'deltas': deltas,
+    }
+
+
+# ============================================
+# backend/equipment/trends.py
+# ============================================
+import math
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import BigIntegerField, Count, ExpressionWrapper, F, Max, Min, Sum
+from django.utils import timezone
+from .models import TrendPoint
+
+TREND_RETENTION_DAYS = 365
+MAX_TREND_WINDOW = 365
+AVERAGES = ['avg_flowrate', 'avg_pressure', 'avg_temperature']
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+# Epoch day 0 was a Thursday; shifting by 3 days starts weeks on Monday
+WEEK_SHIFT = 3 * DAY
+BUCKETS = ['hour', 'day', 'week', 'month']
+
+
+def trends_enabled():
+    return getattr(settings, 'EQUIPMENT_TRENDS', False)
+
+
+def trend_point(dataset):
+    return TrendPoint(
+        user_id=dataset.user_id,
+        recorded_at=dataset.uploaded_at,
+        recorded_ts=int(dataset.uploaded_at.timestamp()),
+        dataset_id=dataset.id,
+        total_count=dataset.total_count,
+        **{field: getattr(dataset, field) for field in AVERAGES}
+    )
+
+
+# Record uploads' summaries and drop their users' points older than
+# EQUIPMENT_TREND_RETENTION_DAYS (None keeps them forever)
+def record_trends(datasets):
+    TrendPoint.objects.bulk_create([trend_point(dataset) for dataset in datasets])
+    days = getattr(settings, 'EQUIPMENT_TREND_RETENTION_DAYS', TREND_RETENTION_DAYS)
+    if days is not None:
+        cutoff = timezone.now() - timedelta(days=days)
+        user_ids = {dataset.user_id for dataset in datasets}
+        TrendPoint.objects.filter(user_id__in=user_ids, recorded_ts__lt=int(cutoff.timestamp())).delete()
+
+
+def record_trend(dataset):
+    record_trends([dataset])
+
+
+# Rows appended to a dataset (storage.append_rows) are a point of their own,
+# timed at the append, with their summary alone. Rows without a single valid
+# value in some column have no average to plot and leave no point.
+def record_append(dataset, summary):
+    averages = {field: summary.mean(col) for field, col in zip(AVERAGES, ['Flowrate', 'Pressure', 'Temperature'])}
+    if any(math.isnan(value) for value in averages.values()):
+        return
+    now = timezone.now()
+    TrendPoint.objects.create(
+        user_id=dataset.user_id,
+        recorded_at=now,
+        recorded_ts=int(now.timestamp()),
+        dataset_id=dataset.id,
+        total_count=summary.total_count,
+        **averages
+    )
+
+
+def weighted(total, rows):
+    return total / rows if rows else None
+
+
+# Hour, day and week buckets are integer divisions of recorded_ts (shifted
+# by the time zone's UTC offset), so the database groups over the
+# (user, recorded_ts) index without calling a function per row. Months are
+# folded together from day buckets.
+def bucket_rows(points, bucket, offset):
+    size, shift = {'hour': (HOUR, 0), 'week': (WEEK, WEEK_SHIFT)}.get(bucket, (DAY, 0))
+    key = ExpressionWrapper((F('recorded_ts') + offset + shift) / size, output_field=BigIntegerField())
+    rows = (points.annotate(key=key)
+            .values('key')
+            .order_by('key')
+            .annotate(uploads=Count('id'),
+                      rows=Sum('total_count'),
+                      first=Min('recorded_ts'),
+                      last=Max('recorded_ts'),
+                      **{f'{field}_sum': Sum(F(field) * F('total_count')) for field in AVERAGES}))
+    for row in rows:
+        row['start'] = row['key'] * size - offset - shift
+        yield row
+
+
+def utc_offset(tz, ts):
+    return int(datetime.fromtimestamp(ts, tz).utcoffset().total_seconds())
+
+
+# (start, end, offset) spans of recorded_ts covering [first, last], each with
+# one UTC offset in tz. Steps a day at a time and bisects every change (a
+# DST switch) down to the second.
+def offset_spans(tz, first, last):
+    spans = []
+    span_start = ts = first
+    offset = utc_offset(tz, first)
+    while ts < last:
+        step = min(ts + DAY, last)
+        if utc_offset(tz, step) == offset:
+            ts = step
+            continue
+        low, high = ts, step
+        while high - low > 1:
+            middle = (low + high) // 2
+            if utc_offset(tz, middle) == offset:
+                low = middle
+            else:
+                high = middle
+        spans.append((span_start, high, offset))
+        span_start = ts = high
+        offset = utc_offset(tz, high)
+    spans.append((span_start, last + 1, offset))
+    return spans
+
+
+def add_row(current, row):
+    current['uploads'] += row['uploads']
+    current['rows'] += row['rows']
+    current['first'] = min(current['first'], row['first'])
+    current['last'] = max(current['last'], row['last'])
+    for field in AVERAGES:
+        current[f'{field}_sum'] += row[f'{field}_sum']
+
+
+# Buckets for points in [first, last], grouped per span of constant UTC
+# offset. A day or week a DST switch cuts in two comes back as two pieces
+# with the same local key; they are added together, keeping the start of
+# the earlier one. Hours are real hours, so only pieces with the same start
+# are (the repeated local hour of a switch back stays two buckets).
+def local_rows(points, bucket, tz, first, last):
+    merged = {}
+    for start, end, offset in offset_spans(tz, first, last):
+        span = points.filter(recorded_ts__gte=start, recorded_ts__lt=end)
+        for row in bucket_rows(span, bucket, offset):
+            key = row['start'] if bucket == 'hour' else row['key']
+            if key in merged:
+                add_row(merged[key], row)
+            else:
+                merged[key] = row
+    return sorted(merged.values(), key=lambda row: row['start'])
+
+
+def month_rows(day_rows, tz):
+    current = None
+    for row in day_rows:
+        day = datetime.fromtimestamp(row['start'], tz)
+        month = (day.year, day.month)
+        if current is None or current['month'] != month:
+            if current is not None:
+                yield current
+            start = day.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            current = dict(row, month=month, start=int(start.timestamp()))
+            continue
+        add_row(current, row)
+    if current is not None:
+        yield current
+
+
+# Per-bucket upload count, row count and row-weighted averages for the
+# user's points in [start, end). window > 1 adds trailing moving averages
+# over that many buckets, also row-weighted.
+def trend_rollup(user, bucket='day', start=None, end=None, window=1):
+    tz = timezone.get_current_timezone()
+    points = TrendPoint.objects.filter(user=user)
+    if start is not None:
+        points = points.filter(recorded_ts__gte=int(start.timestamp()))
+    if end is not None:
+        points = points.filter(recorded_ts__lt=int(end.timestamp()))
+    bounds = points.aggregate(first=Min('recorded_ts'), last=Max('recorded_ts'))
+    if bounds['first'] is None:
+        return []
+    if bucket == 'month':
+        rows = list(month_rows(local_rows(points, 'day', tz, bounds['first'], bounds['last']), tz))
+    else:
+        rows = local_rows(points, bucket, tz, bounds['first'], bounds['last'])
+    
+    result = []
+    totals = {'rows': 0, **{field: 0.0 for field in AVERAGES}}
+    history = []
+    for i, row in enumerate(rows):
+        point = {
+            'bucket': datetime.fromtimestamp(row['start'], tz),
+            'uploads': row['uploads'],
+            'total_count': row['rows'],
+            'first': datetime.fromtimestamp(row['first'], tz),
+            'last': datetime.fromtimestamp(row['last'], tz),
+        }
+        for field in AVERAGES:
+            point[field] = weighted(row[f'{field}_sum'], row['rows'])
+        if window > 1:
+            # Running sums over the trailing window
+            history.append(row)
+            totals['rows'] += row['rows']
+            for field in AVERAGES:
+                totals[field] += row[f'{field}_sum']
+            if len(history) > window:
+                old = history.pop(0)
+                totals['rows'] -= old['rows']
+                for field in AVERAGES:
+                    totals[field] -= old[f'{field}_sum']
+            point['moving'] = {field: weighted(totals[field], totals['rows']) for field in AVERAGES}
+        result.append(point)
+    return result
+
+
+# ============================================
+# backend/equipment/rows.py
+# ============================================
+import base64
+import json
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from .ingest import NUMERIC_COLS
+from .storage import load_frame, read_rows, take_rows
+
+SORTABLE_COLS = NUMERIC_COLS + ['Type']
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+
+
+def _int_param(params, name, default, minimum=0, maximum=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be an integer'})
+    if value < minimum:
+        raise ValidationError({name: f'Must be at least {minimum}'})
+    return min(value, maximum) if maximum is not None else value
+
+
+def _float_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be a number'})
+
+
+# Paging, projection, sorting and filtering options for GET .../rows/
+class RowQuery:
+    def __init__(self, params):
+        max_page = getattr(settings, 'EQUIPMENT_ROWS_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+        self.limit = _int_param(params, 'limit', DEFAULT_PAGE_SIZE, minimum=1, maximum=max_page)
+        if params.get('cursor'):
+            self.offset = decode_cursor(params['cursor'])
+        else:
+            self.offset = _int_param(params, 'offset', 0)
+        
+        self.columns = None
+        if params.get('columns'):
+            self.columns = [col.strip() for col in params['columns'].split(',') if col.strip()]
+        
+        self.ordering = params.get('ordering') or None
+        if self.ordering and self.ordering.lstrip('-') not in SORTABLE_COLS:
+            raise ValidationError({'ordering': f'Must be one of {SORTABLE_COLS}, optionally prefixed with -'})
+        
+        self.types = [t for t in params.get('type', '').split(',') if t]
+        self.ranges = {}
+        for col in NUMERIC_COLS:
+            low = _float_param(params, f'{col.lower()}_min')
+            high = _float_param(params, f'{col.lower()}_max')
+            if low is not None or high is not None:
+                self.ranges[col] = (low, high)
+    
+    @property
+    def is_plain(self):
+        return not (self.ordering or self.types or self.ranges)
+    
+    def key_columns(self):
+        cols = list(self.ranges)
+        if self.types:
+            cols.append('Type')
+        if self.ordering:
+            cols.append(self.ordering.lstrip('-'))
+        return list(dict.fromkeys(cols))
+    
+    # Which rows of frame pass the Type and range filters
+    def mask(self, frame):
+        mask = np.ones(len(frame), dtype=bool)
+        if self.types:
+            mask &= frame['Type'].astype(str).isin(self.types).to_numpy()
+        for col, (low, high) in self.ranges.items():
+            values = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=float)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+    
+    # Matching row positions in result order, from a scan of only the key columns
+    def matching_positions(self, dataset):
+        keys = load_frame(dataset, self.key_columns())
+        positions = np.flatnonzero(self.mask(keys))
+        if self.ordering:
+            col = self.ordering.lstrip('-')
+            values = keys[col].iloc[positions]
+            if col == 'Type':
+                values = values.astype(str)
+            order = values.reset_index(drop=True).sort_values(
+                ascending=not self.ordering.startswith('-'), kind='stable', na_position='last'
+            ).index.to_numpy()
+            positions = positions[order]
+        return positions
+    
+    def execute(self, dataset):
+        if self.is_plain:
+            count = dataset.total_count
+            page = read_rows(dataset, self.offset, self.offset + self.limit, self.columns)
+        else:
+            positions = self.matching_positions(dataset)
+            count = len(positions)
+            page = take_rows(dataset, positions[self.offset:self.offset + self.limit], self.columns)
+        return count, page
+
+
+def frame_records(frame):
+    # Same encoding as the old raw_data field (NaN -> null)
+    return json.loads(frame.to_json(orient='records'))
+
+
+def frame_columns(frame):
+    return {col: json.loads(frame[col].to_json(orient='values')) for col in frame.columns}
+
+
+# ============================================
+# backend/equipment/export.py
+# ============================================
+import json
+import zlib
+import pandas as pd
+from rest_framework.exceptions import ValidationError
+from .rows import RowQuery
+from .storage import iter_frames
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional; only Parquet export needs it
+    pyarrow = None
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+GZIP_LEVEL = 6
+
+
+# The rows filters of GET .../rows/ (columns, type, <column>_min/_max); rows
+# always come out in stored order, so there is no ordering or paging
+class ExportQuery(RowQuery):
+    def __init__(self, params):
+        super().__init__(params)
+        if self.ordering:
+            raise ValidationError({'ordering': 'Exports keep the stored row order'})
+    
+    def read_columns(self):
+        if self.columns is None:
+            return None
+        return list(dict.fromkeys(self.columns + self.key_columns()))
+    
+    # The dataset one stored chunk at a time, filtered and projected
+    def frames(self, dataset):
+        for frame in iter_frames(dataset, self.read_columns()):
+            if not self.is_plain:
+                frame = frame[self.mask(frame)]
+            if self.columns is not None:
+                frame = frame[[col for col in self.columns if col in frame.columns]]
+            yield frame
+
+
+def csv_parts(frames):
+    first = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=first).encode('utf-8')
+        first = False
+
+
+def ndjson_parts(frames):
+    for frame in frames:
+        if len(frame):
+            lines = frame.to_json(orient='records', lines=True)
+            yield (lines if lines.endswith('\n') else lines + '\n').encode('utf-8')
+
+
+# File-like target for ParquetWriter whose output is taken away after each
+# row group, so only one encoded chunk is ever buffered
+class ParquetSink:
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.closed = False
+    
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.size
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+# The schema is fixed by the first chunk: numeric columns as float64 (a later
+# chunk may hold NaN where the first had ints), everything else as strings
+def parquet_schema(frame):
+    fields = []
+    for col in frame.columns:
+        dtype = frame[col].dtype
+        numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        fields.append(pyarrow.field(str(col), pyarrow.float64() if numeric else pyarrow.string()))
+    return pyarrow.schema(fields)
+
+
+def parquet_table(frame, schema):
+    data = {}
+    for field in schema:
+        values = frame[field.name]
+        if pyarrow.types.is_floating(field.type):
+            data[field.name] = pd.to_numeric(values, errors='coerce').astype('float64')
+        else:
+            data[field.name] = [None if pd.isna(value) else str(value) for value in values.astype(object)]
+    return pyarrow.Table.from_pandas(pd.DataFrame(data), schema=schema, preserve_index=False)
+
+
+# One row group per stored chunk
+def parquet_parts(frames):
+    sink = ParquetSink()
+    writer = None
+    for frame in frames:
+        if writer is None:
+            schema = parquet_schema(frame)
+            writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        if len(frame):
+            writer.write_table(parquet_table(frame, schema))
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_parts(parts, level=GZIP_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for part in parts:
+        data = compressor.compress(part)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(request):
+    codings = [coding.split(';')[0].strip().lower()
+               for coding in request.headers.get('Accept-Encoding', '').split(',')]
+    return 'gzip' in codings
+
+
+# Body parts of an export of dataset as fmt. Only one stored chunk is
+# decoded and encoded at a time, so memory does not grow with the dataset.
+def export_parts(dataset, fmt, query):
+    if fmt == 'parquet' and pyarrow is None:
+        raise ValidationError({'format': 'Parquet export needs pyarrow installed on the server'})
+    frames = query.frames(dataset)
+    return {'csv': csv_parts, 'ndjson': ndjson_parts, 'parquet': parquet_parts}[fmt](frames)
+
+
+# ============================================
+# backend/equipment/charts.py
+# ============================================
+import hashlib
+import json
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import caches
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from rest_framework.exceptions import ValidationError
+from .compare import column_stats
+from .ingest import NUMERIC_COLS
+from .rows import _int_param
+from .stats import HISTOGRAM_BINS
+from .storage import iter_frames
+
+# Bump when chart_data's output or render_chart's layout changes
+CHART_VERSION = 1
+DEFAULT_POINTS = 1000
+MAX_POINTS = 5000
+MAX_BINS = 200
+DEFAULT_TOP = 8
+MAX_TOP = 50
+CHART_CACHE_TIMEOUT = 24 * 60 * 60
+METHODS = ['lttb', 'minmax']
+KINDS = ['overview', 'averages', 'types', 'histograms', 'series']
+IMAGE_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# What each image kind needs from chart_data
+KIND_PARTS = {
+    'overview': ['types'],
+    'averages': [],
+    'types': ['types'],
+    'histograms': ['histograms'],
+    'series': ['series'],
+}
+PARTS = ['types', 'histograms', 'series']
+COLORS = ['#3b82f6', '#10b981', '#f59e0b']
+TYPE_COLORS = ['#ef4444', '#3b82f6', '#10b981', '#f59e0b', '#8b5cf6']
+OTHER_COLOR = '#9ca3af'
+
+
+# Options for GET .../chart_data/ and .../chart/; every size is capped so
+# payloads stay bounded whatever the row count
+class ChartOptions:
+    def __init__(self, params):
+        self.points = _int_param(params, 'points', DEFAULT_POINTS, minimum=3, maximum=MAX_POINTS)
+        self.bins = _int_param(params, 'bins', HISTOGRAM_BINS, minimum=1, maximum=MAX_BINS)
+        self.top = _int_param(params, 'top', DEFAULT_TOP, minimum=1, maximum=MAX_TOP)
+        self.method = params.get('method') or 'lttb'
+        if self.method not in METHODS:
+            raise ValidationError({'method': f'Must be one of {METHODS}'})
+        self.columns = NUMERIC_COLS
+        if params.get('columns'):
+            self.columns = [col.strip() for col in params['columns'].split(',') if col.strip()]
+            unknown = [col for col in self.columns if col not in NUMERIC_COLS]
+            if unknown or not self.columns:
+                raise ValidationError({'columns': f'Must be a comma-separated subset of {NUMERIC_COLS}'})
+        self.kind = params.get('kind') or 'overview'
+        if self.kind not in KINDS:
+            raise ValidationError({'kind': f'Must be one of {KINDS}'})
+        # Not ?format=, which DRF reserves for picking a renderer
+        self.image = params.get('image') or 'png'
+        if self.image not in IMAGE_TYPES:
+            raise ValidationError({'image': f'Must be one of {list(IMAGE_TYPES)}'})
+    
+    def key(self):
+        return [self.points, self.bins, self.top, self.method, self.columns]
+
+
+# Stored rows only change under a content id by an append, which also
+# changes total_count, so charts are keyed by content (datasets still in
+# raw_data by their own id) plus the summary and options they are drawn from
+def chart_etag(dataset, options, *extra):
+    source = dataset.content_id if dataset.content_id is not None else f'dataset-{dataset.id}'
+    inputs = [CHART_VERSION, source, dataset.total_count, dataset.avg_flowrate, dataset.avg_pressure,
+              dataset.avg_temperature, dataset.type_distribution, options.key(), *extra]
+    return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def chart_cache():
+    return caches[getattr(settings, 'EQUIPMENT_CHART_CACHE', 'default')]
+
+
+# The top counts largest Types, the rest folded into one "Other" bucket
+def top_types(distribution, top):
+    ranked = sorted(distribution.items(), key=lambda item: (-item[1], item[0]))
+    labels = [name for name, _ in ranked[:top]]
+    counts = [count for _, count in ranked[:top]]
+    if len(ranked) > top:
+        labels.append('Other')
+        counts.append(sum(count for _, count in ranked[top:]))
+    return {'labels': labels, 'counts': counts}
+
+
+# Histograms come from the stored sketches, so no rows are read
+def histograms(dataset, columns, bins):
+    stats = column_stats([dataset])[dataset.id]
+    return {col: stats[col].histogram(bins) for col in columns if col in stats}
+
+
+# Positions of each bucket's smallest and largest value: keeps every spike,
+# at up to points positions
+def minmax_downsample(values, points):
+    n = len(values)
+    if n <= points:
+        return np.arange(n)
+    buckets = max(points // 2, 1)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    owner = np.repeat(np.arange(buckets), np.diff(edges))
+    picks = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(values, edges[:-1])
+        hits = np.flatnonzero(values == extreme[owner])
+        _, first = np.unique(owner[hits], return_index=True)
+        picks.append(hits[first])
+    return np.unique(np.concatenate(picks))
+
+
+# Largest-Triangle-Three-Buckets: the first and last positions plus, from
+# each bucket in between, the one forming the largest triangle with the
+# previous pick and the next bucket's mean
+def lttb_downsample(values, points):
+    n = len(values)
+    if n <= points:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(points - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        mean_x = (next_start + next_stop - 1) / 2
+        mean_y = values[next_start:next_stop].mean()
+        xs = np.arange(start, stop)
+        area = np.abs((previous - mean_x) * (values[start:stop] - values[previous])
+                      - (previous - xs) * (mean_y - values[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+DOWNSAMPLERS = {'lttb': lttb_downsample, 'minmax': minmax_downsample}
+
+
+# Each column as one float array, read chunk by chunk
+def column_arrays(dataset, columns):
+    parts = {col: [] for col in columns}
+    for frame in iter_frames(dataset, columns):
+        for col in columns:
+            if col in frame:
+                parts[col].append(pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=np.float64))
+    return {col: np.concatenate(arrays) if arrays else np.empty(0) for col, arrays in parts.items()}
+
+
+# Value against row position, downsampled to at most points per column;
+# missing values are skipped
+def series(dataset, columns, points, method):
+    result = {}
+    for col, values in column_arrays(dataset, columns).items():
+        positions = np.flatnonzero(~np.isnan(values))
+        picked = positions[DOWNSAMPLERS[method](values[positions], points)]
+        result[col] = {'x': picked.tolist(), 'y': values[picked].tolist()}
+    return result
+
+
+def chart_data(dataset, options, parts=PARTS):
+    key = f'equipment-chart-data:{chart_etag(dataset, options, list(parts))}'
+    cache = chart_cache()
+    data = cache.get(key)
+    if data is not None:
+        return data
+    data = {
+        'total_count': dataset.total_count,
+        'averages': {
+            'Flowrate': dataset.avg_flowrate,
+            'Pressure': dataset.avg_pressure,
+            'Temperature': dataset.avg_temperature,
+        },
+    }
+    if 'types' in parts:
+        data['types'] = top_types(dataset.type_distribution, options.top)
+    if 'histograms' in parts:
+        data['histograms'] = histograms(dataset, options.columns, options.bins)
+    if 'series' in parts:
+        data['method'] = options.method
+        data['series'] = series(dataset, options.columns, options.points, options.method)
+    cache.set(key, data, CHART_CACHE_TIMEOUT)
+    return data
+
+
+def plot_averages(ax, averages):
+    ax.bar(list(averages), list(averages.values()), color=COLORS)
+    ax.set_title('Average Parameters', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Value')
+
+
+def plot_types(ax, types):
+    colors = [TYPE_COLORS[i % len(TYPE_COLORS)] for i in range(len(types['labels']))]
+    if types['labels'] and types['labels'][-1] == 'Other':
+        colors[-1] = OTHER_COLOR
+    ax.pie(types['counts'], labels=types['labels'], autopct='%1.1f%%', colors=colors)
+    ax.set_title('Equipment Type Distribution', fontsize=14, fontweight='bold')
+
+
+def render_chart(data, kind, image):
+    figure = Figure(figsize=(10, 5) if kind == 'overview' else (8, 5))
+    FigureCanvasAgg(figure)
+    if kind == 'overview':
+        bars, pie = figure.subplots(1, 2)
+        plot_averages(bars, data['averages'])
+        plot_types(pie, data['types'])
+    elif kind == 'averages':
+        plot_averages(figure.subplots(), data['averages'])
+    elif kind == 'types':
+        plot_types(figure.subplots(), data['types'])
+    elif kind == 'histograms':
+        columns = list(data['histograms'])
+        axes = figure.subplots(1, max(len(columns), 1), squeeze=False)[0]
+        for ax, col, color in zip(axes, columns, COLORS * len(columns)):
+            histogram = data['histograms'][col]
+            if histogram['counts']:
+                ax.stairs(histogram['counts'], histogram['edges'], fill=True, color=color)
+            ax.set_title(col)
+    else:
+        columns = list(data['series'])
+        axes = figure.subplots(max(len(columns), 1), 1, sharex=True, squeeze=False)[:, 0]
+        for ax, col, color in zip(axes, columns, COLORS * len(columns)):
+            ax.plot(data['series'][col]['x'], data['series'][col]['y'], color=color, linewidth=0.8)
+            ax.set_ylabel(col)
+        axes[-1].set_xlabel('Row')
+    figure.tight_layout()
+    buffer = BytesIO()
+    figure.savefig(buffer, format=image)
+    return buffer.getvalue()
+
+
+# A rendered chart from EQUIPMENT_CHART_CACHE, rendered on a miss; etag is
+# chart_etag(dataset, options, options.kind, options.image)
+def chart_image(dataset, options, etag):
+    key = f'equipment-chart:{etag}'
+    cache = chart_cache()
+    image = cache.get(key)
+    if image is None:
+        data = chart_data(dataset, options, KIND_PARTS[options.kind])
+        image = render_chart(data, options.kind, options.image)
+        cache.set(key, image, CHART_CACHE_TIMEOUT)
+    return image
+
+
+# ============================================
+# backend/equipment/renderers.py
+# ============================================
+import datetime
+import decimal
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Whatever DRF's JSONEncoder handles that orjson does not natively, plus
+# dates and times, which orjson would format slightly differently
+def _default(obj):
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, datetime.datetime):
+        representation = obj.isoformat()
+        if representation.endswith('+00:00'):
+            representation = representation[:-6] + 'Z'
+        return representation
+    if isinstance(obj, datetime.time) and obj.utcoffset() is not None:
+        raise TypeError("JSON can't represent timezone-aware times.")
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__getitem__'):
+        try:
+            return dict(obj)
+        except (TypeError, ValueError):
+            return list(obj)
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f'Type is not JSON serializable: {type(obj).__name__}')
+
+
+# JSONRenderer's output, encoded by orjson (several times faster on the row
+# and statistics payloads); plain JSONRenderer when orjson is not installed.
+# Unlike JSONRenderer, NaN is written as null rather than rejected.
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+
+
+# ============================================
+# backend/equipment/views.py
+# ============================================
+from rest_framework import viewsets, status
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
+from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.contrib.auth import authenticate
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import content_disposition_header, parse_etags
+from datetime import datetime, time
+from io import BytesIO
+from itertools import chain
+import re
+from rest_framework.authtoken.models import Token
+import json
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .models import EquipmentDataset, IngestJob
+from .serializers import (EquipmentDatasetSerializer, EquipmentDatasetListSerializer, IngestJobSerializer,
+                          dataset_etag, history_etag, upload_summary)
+from .ingest import IngestError, RunningSummary, read_csv
+from .compare import MAX_COMPARE, compare_datasets
+from .trends import BUCKETS, MAX_TREND_WINDOW, trend_rollup
+from .jobs import (cancel_session, create_session, enqueue_upload, finalize_session, spool_dir, spooled_bytes,
+                   wait_for_job, write_chunk)
+from .batch import ingest_batch
+from .parallel import ingest_sharded, shardable
+from .storage import (ChunkWriter, append_rows, csv_engine, dataset_statistics, frame_slices, ingest_content,
+                      iter_records_json, records_json_parts)
+from .content import (create_content, find_content, history_limit, record_upload, release_orphaned_content,
+                      store_statistics, upload_digest)
+from .reports import discard_reports, render_report, report_etag, report_store, schedule_report
+from .rows import RowQuery, encode_cursor, frame_columns, frame_records
+from .charts import IMAGE_TYPES, ChartOptions, chart_data, chart_etag, chart_image
+from .export import EXPORT_FORMATS, ExportQuery, accepts_gzip, export_parts, gzip_parts
+from .instrumentation import metrics, span
+
+# A 304 for the request if it already holds etag, else None
+def not_modified(request, etag):
+    quoted = f'"{etag}"'
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if quoted in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+        response['ETag'] = quoted
+        return response
+    return None
+
+
+def with_etag(response, etag):
+    response['ETag'] = f'"{etag}"'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ?async=1 or "Prefer: respond-async": the client would rather poll a 202
+# than wait on this request
+def respond_async(request):
+    prefer = [token.strip() for token in request.headers.get('Prefer', '').split(',')]
+    return request.query_params.get('async') in ('1', 'true') or 'respond-async' in prefer
+
+
+# 400 for a CSV that was rejected, with the bad cells found before it was
+def ingest_error(e):
+    body = {'error': str(e)}
+    if e.report is not None and e.report.count:
+        body['validation'] = {'invalid_cells': e.report.count, 'errors': e.report.errors}
+    return Response(body, status=status.HTTP_400_BAD_REQUEST)
+
+
+class EquipmentDatasetViewSet(viewsets.ModelViewSet):
+    serializer_class = EquipmentDatasetSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def wants_summary(self):
+        return self.action == 'list' or self.request.query_params.get('summary') in ('1', 'true')
+    
+    def get_queryset(self):
+        queryset = EquipmentDataset.objects.filter(user=self.request.user)
+        # Only a full retrieve serializes the rows; everything else reads
+        # summaries or columnar chunks, so the raw_data blob stays unloaded
+        if self.action == 'retrieve' and not self.wants_summary():
+            return queryset
+        queryset = queryset.defer('raw_data')
+        if self.action == 'list':
+            return queryset[:history_limit()]
+        return queryset
+    
+    def get_serializer_class(self):
+        if self.wants_summary():
+            return EquipmentDatasetListSerializer
+        return EquipmentDatasetSerializer
+    
+    # List and retrieve carry ETags, so clients holding a copy (the desktop
+    # cache) revalidate with If-None-Match instead of downloading it again
+    def list(self, request, *args, **kwargs):
+        datasets = list(self.get_queryset())
+        etag = history_etag(datasets)
+        return not_modified(request, etag) or with_etag(
+            Response(self.get_serializer(datasets, many=True).data), etag)
+    
+    def retrieve(self, request, *args, **kwargs):
+        dataset = self.get_object()
+        etag = dataset_etag(dataset, summary=self.wants_summary())
+        return not_modified(request, etag) or with_etag(Response(self.get_serializer(dataset).data), etag)
+    
+    @action(detail=True, methods=['get'])
+    def rows(self, request, pk=None):
+        dataset = self.get_object()
+        query = RowQuery(request.query_params)
+        count, page = query.execute(dataset)
+        
+        url = remove_query_param(request.build_absolute_uri(), 'offset')
+        next_offset = query.offset + len(page)
+        next_url = None
+        if next_offset < count:
+            next_url = replace_query_param(url, 'cursor', encode_cursor(next_offset))
+        previous_url = None
+        if query.offset > 0:
+            previous_url = replace_query_param(url, 'cursor', encode_cursor(max(query.offset - query.limit, 0)))
+        
+        layout = request.query_params.get('layout', 'records')
+        return Response({
+            'count': count,
+            'offset': query.offset,
+            'limit': query.limit,
+            'columns': list(page.columns),
+            'next': next_url,
+            'previous': previous_url,
+            'results': frame_columns(page) if layout == 'columns' else frame_records(page)
+        })
+    
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        dataset = self.get_object()
+        by_type = request.query_params.get('by_type') not in ('0', 'false')
+        return Response(dataset_statistics(dataset, by_type=by_type))
+    
+    # Bounded chart inputs: histograms (?bins=), downsampled series
+    # (?points=, ?method=lttb|minmax, ?columns=) and the top Types (?top=)
+    @action(detail=True, methods=['get'])
+    def chart_data(self, request, pk=None):
+        dataset = self.get_object()
+        return Response(chart_data(dataset, ChartOptions(request.query_params)))
+    
+    # The same data drawn server side: ?kind=overview|averages|types|histograms|series&image=png|svg
+    @action(detail=True, methods=['get'])
+    def chart(self, request, pk=None):
+        dataset = self.get_object()
+        options = ChartOptions(request.query_params)
+        etag = chart_etag(dataset, options, options.kind, options.image)
+        return not_modified(request, etag) or with_etag(
+            HttpResponse(chart_image(dataset, options, etag), content_type=IMAGE_TYPES[options.image]), etag)
+    
+    # ?ids=3,5,8 (the first is the baseline unless ?baseline= says otherwise)
+    @action(detail=False, methods=['get'])
+    def compare(self, request):
+        try:
+            ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()]
+            baseline_id = int(request.query_params.get('baseline') or (ids[0] if ids else 0))
+        except ValueError:
+            raise ValidationError({'ids': 'ids must be a comma-separated list of dataset ids'})
+        ids = list(dict.fromkeys(ids))
+        if not ids or len(ids) > MAX_COMPARE:
+            raise ValidationError({'ids': f'Give between 1 and {MAX_COMPARE} dataset ids'})
+        
+        datasets = {dataset.id: dataset for dataset in self.get_queryset().filter(pk__in=ids)}
+        missing = [i for i in ids if i not in datasets]
+        if missing:
+            raise NotFound(f'Unknown dataset ids: {missing}')
+        if baseline_id not in datasets:
+            raise ValidationError({'baseline': 'baseline must be one of ids'})
+        return Response(compare_datasets([datasets[i] for i in ids], datasets[baseline_id]))
+    
+    @action(detail=False, methods=['post'])
+    def upload(self, request):
+        # Parsing the multipart body spools and hashes the file
+        with span('receive'):
+            files = request.FILES
+        if 'file' not in files:
+            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        csv_file = request.FILES['file']
+        # ?summary=1 wants no rows back, so nothing needs the whole frame
+        streaming = any(request.query_params.get(name) in ('1', 'true') for name in ('stream', 'summary'))
+        
+        digest = upload_digest(csv_file)
+        if request.query_params.get('async') in ('1', 'true'):
+            # Parse later on a worker; the client polls /api/jobs/{id}/
+            job = enqueue_upload(request.user, csv_file, digest)
+            return Response(IngestJobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+                            headers={'Location': reverse('job-detail', args=[job.id], request=request)})
+        
+        # Identical bytes were parsed before: reuse the stored rows and summary
+        with span('dedup'):
+            content = find_content(digest)
+        if content is not None:
+            with span('record'):
+                dataset = record_upload(request.user, csv_file.name, content)
+            return self.upload_response(dataset, None if streaming else iter_records_json(dataset))
+        
+        if streaming:
+            return self.upload_streaming(request, csv_file, digest)
+        
+        try:
+            summary = RunningSummary()
+            with span('read_csv'):
+                df = read_csv(csv_file, summary.validation, csv_engine())
+            
+            def build(content):
+                # Calculate statistics (summary fields and the stats table) in one pass
+                with span('stats'):
+                    summary.update(df)
+                for field, value in summary.as_dict().items():
+                    setattr(content, field, value)
+                with span('store'):
+                    ChunkWriter(content).write_frame(df)
+                    store_statistics(content, summary)
+            
+            # Create dataset
+            content = create_content(digest, build)
+            with span('record'):
+                dataset = record_upload(request.user, csv_file.name, content)
+            
+            return self.upload_response(dataset, records_json_parts(frame_slices(df)))
+            
+        except IngestError as e:
+            return ingest_error(e)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    # Many CSVs in one request: repeat the "files" field and/or send .zip,
+    # .tar or .tar.gz archives of them. One combined result lists every CSV
+    # in upload order, each with its dataset or its error.
+    @action(detail=False, methods=['post'])
+    def upload_batch(self, request):
+        with span('receive'):
+            uploads = request.FILES.getlist('files') + request.FILES.getlist('file')
+        if not uploads:
+            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            outcome, pruned = ingest_batch(request.user, uploads)
+        except IngestError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = []
+        for filename, dataset in outcome:
+            if isinstance(dataset, str):
+                results.append({'filename': filename, 'error': dataset})
+                continue
+            results.append({
+                'filename': filename,
+                'id': dataset.id,
+                'summary': upload_summary(dataset),
+                'rows': reverse('dataset-rows', args=[dataset.id], request=request),
+                'retained': dataset.id not in pruned,
+            })
+        uploaded = sum(1 for result in results if 'id' in result)
+        return Response({
+            'uploaded': uploaded,
+            'failed': len(results) - uploaded,
+            'pruned': pruned,
+            'results': results,
+        }, status=status.HTTP_200_OK if uploaded else status.HTTP_400_BAD_REQUEST)
+    
+    def upload_streaming(self, request, csv_file, digest):
+        # Each parsed chunk is written straight to columnar storage, so no full
+        # DataFrame is ever held and the response carries only the summary.
+        # Large files spooled to disk are parsed on every core instead.
+        try:
+            if hasattr(csv_file, 'temporary_file_path') and shardable(csv_file.size):
+                dataset = ingest_sharded(request.user, csv_file.name, csv_file.temporary_file_path(), digest,
+                                         spool_dir())
+                return self.upload_response(dataset)
+            with span('ingest'):
+                content = ingest_content(csv_file, digest)
+        except IngestError as e:
+            return ingest_error(e)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        with span('record'):
+            dataset = record_upload(request.user, csv_file.name, content)
+        return self.upload_response(dataset)
+    
+    # More rows for an existing dataset: POST a CSV with its columns as "file".
+    # Only the new rows are parsed; the summary is merged, not recomputed.
+    @action(detail=True, methods=['post'])
+    def append(self, request, pk=None):
+        dataset = self.get_object()
+        if 'file' not in request.FILES:
+            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            with span('append'):
+                dataset, added = append_rows(dataset, request.FILES['file'])
+        except IngestError as e:
+            return ingest_error(e)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return Response({
+            'id': dataset.id,
+            'appended': added.total_count,
+            'summary': upload_summary(dataset),
+            'rows': reverse('dataset-rows', args=[dataset.id], request=request),
+        })
+    
+    # rows, when given, is the records array as pieces of JSON text. They are
+    # streamed inside the response as they are encoded, rather than parsed
+    # back into dicts only for the renderer to encode them again.
+    def upload_response(self, dataset, rows=None):
+        body = {
+            'id': dataset.id,
+            'summary': upload_summary(dataset),
+            'rows': reverse('dataset-rows', args=[dataset.id], request=self.request),
+        }
+        if rows is None:
+            return Response(body)
+        head = json.dumps(body, separators=(',', ':'))[:-1] + ',"data":'
+        return StreamingHttpResponse(chain([head], rows, ['}']), content_type='application/json')
+    
+    def perform_destroy(self, instance):
+        dataset_id = instance.id
+        instance.delete()
+        discard_reports([dataset_id])
+        release_orphaned_content()
+    
+    @action(detail=True, methods=['get'])
+    def download_pdf(self, request, pk=None):
+        dataset = self.get_object()
+        etag = report_etag(dataset)
+        
+        # The ETag is derived from the report inputs, so a match needs no I/O
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        
+        store = report_store()
+        with span('report_cache'):
+            pdf = store.open(dataset.id, etag)
+        if pdf is None and respond_async(request):
+            # Cold cache, and the client polls: render off the request thread
+            # and have it come back, rather than holding this worker
+            schedule_report(dataset)
+            with span('report_cache'):
+                pdf = store.open(dataset.id, etag)
+            if pdf is None:
+                response = Response({'status': 'rendering'}, status=status.HTTP_202_ACCEPTED)
+                response['Retry-After'] = '1'
+                return response
+        elif pdf is None:
+            with span('render_report'):
+                data = render_report(dataset)
+            store.save(dataset.id, etag, data)
+            pdf = BytesIO(data)
+        
+        return with_etag(FileResponse(pdf, content_type='application/pdf', as_attachment=True,
+                                      filename=f'equipment_report_{dataset.id}.pdf'), etag)
+    
+    # The rows as a file: GET .../export/csv/, .../export/ndjson/ or
+    # .../export/parquet/, with the ?columns=, ?type= and ?<column>_min/_max=
+    # filters of rows/. Streamed a stored chunk at a time, gzip-encoded for
+    # clients that accept it (Parquet is compressed already).
+    @action(detail=True, methods=['get'], url_path=r'export/(?P<fmt>csv|ndjson|parquet)')
+    def export(self, request, pk=None, fmt=None):
+        dataset = self.get_object()
+        parts = export_parts(dataset, fmt, ExportQuery(request.query_params))
+        content_type, extension = EXPORT_FORMATS[fmt]
+        gzipped = fmt != 'parquet' and accepts_gzip(request)
+        response = StreamingHttpResponse(gzip_parts(parts) if gzipped else parts, content_type=content_type)
+        stem = dataset.filename.rsplit('.', 1)[0] or f'dataset_{dataset.id}'
+        response['Content-Disposition'] = content_disposition_header(True, f'{stem}.{extension}')
+        response['Vary'] = 'Accept-Encoding'
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
+        return response
+
+
+class IngestJobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = IngestJobSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return IngestJob.objects.filter(user=self.request.user).select_related('dataset').defer('dataset__raw_data')
+    
+    # ?wait=<seconds> long-polls until the job finishes or progresses past
+    # ?rows=<rows_done the client last saw>
+    def retrieve(self, request, pk=None):
+        job = self.get_object()
+        try:
+            wait = float(request.query_params.get('wait') or 0)
+            rows = request.query_params.get('rows')
+            rows = int(rows) if rows not in (None, '') else None
+        except ValueError:
+            raise ValidationError({'wait': 'wait and rows must be numbers'})
+        if wait > 0:
+            job = wait_for_job(job, wait, rows_seen=rows)
+        return Response(self.get_serializer(job).data)
+
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+# Resumable uploads (see jobs.py):
+#   POST   /api/uploads/                  {"filename", "size"} opens a session
+#   PUT    /api/uploads/{id}/             raw bytes, with Content-Range: bytes <first>-<last>/<size>
+#   GET    /api/uploads/{id}/             "received" is where to resume
+#   POST   /api/uploads/{id}/finalize/    {"sha256": optional check}; then poll /api/jobs/{id}/
+#   DELETE /api/uploads/{id}/             abandon it
+class UploadSessionViewSet(viewsets.GenericViewSet):
+    serializer_class = IngestJobSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return IngestJob.objects.filter(user=self.request.user, resumable=True)
+    
+    def session_response(self, job, **kwargs):
+        data = self.get_serializer(job).data
+        data['received'] = spooled_bytes(job)
+        data['finalized'] = job.finalized
+        return Response(data, **kwargs)
+    
+    def create(self, request):
+        filename = str(request.data.get('filename') or '').strip()
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = 0
+        if not filename or size <= 0:
+            raise ValidationError({'size': 'Give the filename and the size in bytes (above 0)'})
+        job = create_session(request.user, filename[:255], size)
+        return self.session_response(job, status=status.HTTP_201_CREATED, headers={
+            'Location': reverse('upload-detail', args=[job.id], request=request)})
+    
+    def retrieve(self, request, pk=None):
+        return self.session_response(self.get_object())
+    
+    def update(self, request, pk=None):
+        job = self.get_object()
+        if job.finalized or job.status in IngestJob.FINISHED:
+            return Response({'error': 'Upload is already finalized'}, status=status.HTTP_409_CONFLICT)
+        match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if match is None or int(match.group(2)) - int(match.group(1)) + 1 != length:
+            raise ValidationError({'Content-Range': 'Send bytes <first>-<last>/<size> matching the body'})
+        offset = int(match.group(1))
+        if offset + length > job.bytes_total:
+            raise ValidationError({'Content-Range': f'The upload was opened for {job.bytes_total} bytes'})
+        received = spooled_bytes(job)
+        if offset > received:
+            # Bytes in between are missing; the client resumes from received
+            return Response({'error': 'Chunk starts past the received bytes', 'received': received},
+                            status=status.HTTP_409_CONFLICT)
+        received = write_chunk(job, offset, request.stream, length)
+        return Response({'received': received})
+    
+    def destroy(self, request, pk=None):
+        job = self.get_object()
+        if job.status not in IngestJob.FINISHED:
+            cancel_session(job)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        job = self.get_object()
+        received = spooled_bytes(job)
+        if not job.finalized:
+            if received < job.bytes_total:
+                return Response({'error': 'Upload is incomplete', 'received': received},
+                                status=status.HTTP_409_CONFLICT)
+            job = finalize_session(job, str(request.data.get('sha256') or '').lower())
+        return self.session_response(job, status=status.HTTP_202_ACCEPTED, headers={
+            'Location': reverse('job-detail', args=[job.id], request=request)})
+
+
+# ?bucket=hour|day|week|month&start=<ISO datetime>&end=<ISO datetime>&window=<buckets>
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def trends_view(request):
+    params = request.query_params
+    bucket = params.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        raise ValidationError({'bucket': f"bucket must be one of {', '.join(BUCKETS)}"})
+    bounds = {}
+    for name in ('start', 'end'):
+        value = params.get(name)
+        if value:
+            try:
+                parsed = parse_datetime(value)
+                if parsed is None and parse_date(value) is not None:
+                    parsed = datetime.combine(parse_date(value), time.min)
+            except ValueError:
+                parsed = None
+            if not parsed:
+                raise ValidationError({name: 'Use an ISO 8601 date or datetime'})
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            bounds[name] = parsed
+    try:
+        window = int(params.get('window', 1))
+    except ValueError:
+        window = 0
+    if not 1 <= window <= MAX_TREND_WINDOW:
+        raise ValidationError({'window': f'window must be between 1 and {MAX_TREND_WINDOW}'})
+    
+    points = trend_rollup(request.user, bucket, bounds.get('start'), bounds.get('end'), window)
+    return Response({'bucket': bucket, 'window': window, 'points': points})
+
+
+# Prometheus text format; staff only (scrape with a staff user's token)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# No authentication: a client still sending a revoked token (after logout)
+# would otherwise be refused before it could log in again
+@api_view(['POST'])
+@authentication_classes([])
+def login_view(request):
+    username = request.data.get('username')
+    password = request.data.get('password')
+    user = authenticate(username=username, password=password)
+    
+    if user:
+        token, _ = Token.objects.get_or_create(user=user)
+        return Response({'token': token.key, 'user': username})
+    return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+# Deletes the caller's token, which every server process stops accepting at
+# once (see authentication.CachedTokenAuthentication); the next login issues
+# a new one
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_view(request):
+    Token.objects.filter(user=request.user).delete()
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# ============================================
+# backend/equipment/urls.py
+# ============================================
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import (EquipmentDatasetViewSet, IngestJobViewSet, UploadSessionViewSet, login_view, logout_view,
+                    metrics_view, trends_view)
+
+router = DefaultRouter()
+router.register(r'datasets', EquipmentDatasetViewSet, basename='dataset')
+router.register(r'jobs', IngestJobViewSet, basename='job')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
+
+urlpatterns = [
+    path('', include(router.urls)),
+    path('login/', login_view, name='login'),
+    path('logout/', logout_view, name='logout'),
+    path('trends/', trends_view, name='trends'),
+    path('metrics/', metrics_view, name='metrics'),
+]
+
+
+# ============================================
+# backend/equipment/management/commands/convert_raw_data.py
+# ============================================
+from django.core.management.base import BaseCommand
+from equipment.models import EquipmentDataset
+from equipment.storage import convert_to_columnar
+
+
+class Command(BaseCommand):
+    help = 'Move datasets still stored as raw_data JSON into columnar chunks'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--chunksize', type=int, default=None,
+                            help='rows per stored chunk (default: EQUIPMENT_INGEST_CHUNKSIZE)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='only report how many datasets would be converted')
+    
+    def handle(self, *args, **options):
+        pending = EquipmentDataset.objects.filter(storage_format=EquipmentDataset.STORAGE_JSON)
+        total = pending.count()
+        if options['dry_run']:
+            self.stdout.write(f'{total} dataset(s) stored as JSON')
+            return
+        
+        # One dataset per transaction, so an interrupted run can simply be restarted
+        dataset_ids = list(pending.values_list('id', flat=True))
+        for done, dataset_id in enumerate(dataset_ids, start=1):
+            dataset = EquipmentDataset.objects.get(id=dataset_id)
+            convert_to_columnar(dataset, options['chunksize'])
+            self.stdout.write(f'[{done}/{total}] converted dataset {dataset_id} ({dataset.filename})')
+        
+        self.stdout.write(self.style.SUCCESS(f'Converted {total} dataset(s)'))
+
+
+# ============================================
+# backend/equipment/management/commands/ingest_worker.py
+# ============================================
+import time
+from django.core.management.base import BaseCommand
+from equipment.jobs import process_jobs, requeue_stale_jobs, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Process uploads queued with ?async=1 (run with EQUIPMENT_INGEST_WORKERS = 0)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='exit once the queue is empty')
+        parser.add_argument('--poll', type=float, default=1.0, help='seconds between queue checks')
+    
+    def handle(self, *args, **options):
+        worker = worker_name()
+        while True:
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale job(s)')
+            count = process_jobs(worker)
+            if count:
+                self.stdout.write(f'Processed {count} job(s)')
+            if options['once']:
+                return
+            if not count:
+                time.sleep(options['poll'])
+
+
+# ============================================
+# backend/equipment/management/commands/backfill_trends.py
+# ============================================
+from django.core.management.base import BaseCommand
+from equipment.models import EquipmentDataset, TrendPoint
+from equipment.trends import trend_point
+
+
+class Command(BaseCommand):
+    help = 'Add trend points for datasets still in the upload history'
+    
+    def handle(self, *args, **options):
+        recorded = set(TrendPoint.objects.exclude(dataset_id=None).values_list('dataset_id', flat=True))
+        datasets = EquipmentDataset.objects.defer('raw_data').exclude(pk__in=recorded)
+        points = [trend_point(ds) for ds in datasets]
+        TrendPoint.objects.bulk_create(points, batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f'Added {len(points)} trend point(s)'))
+
+
+# ============================================
+# backend/equipment/tests.py
+# ============================================
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from zoneinfo import ZoneInfo
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test import SimpleTestCase, TestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from .authentication import CachedTokenAuthentication, _local
+from .charts import MAX_BINS, METHODS
+from .columnar import decode_frame, encode_frame, payload_columns
+from .content import history_limit, prune_history
+from .ingest import (MAX_REPORTED_ERRORS, NUMERIC_COLS, RunningSummary, ValidationReport, default_engine,
+                     ingest_csv, parse_file, read_csv, shard_bounds)
+from .instrumentation import metrics
+from .jobs import Heartbeat, JobLost, claim_job, process_jobs, requeue_stale_jobs, run_session
+from .models import DatasetChunk, DatasetContent, EquipmentDataset, IngestJob, TrendPoint
+from .parallel import parse_options, parse_sharded
+from .renderers import ORJSONRenderer
+from .rows import frame_records
+from .serializers import upload_summary
+from .stats import QUANTILES, RELATIVE_ACCURACY, DatasetStats, RunningStats
+from .trends import trend_rollup
+
+HEADER = 'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+TYPES = ['Pump', 'Valve', 'Compressor']
+
+
+def csv_bytes(count, start=0):
+    lines = [HEADER]
+    for i in range(start, start + count):
+        lines.append(f'Unit-{i},{TYPES[i % len(TYPES)]},{100 + i % 17},{5 + i % 7}.5,{60 + i % 11}\n')
+    return ''.join(lines).encode()
+
+
+def csv_file(name, data):
+    return SimpleUploadedFile(name, data, content_type='text/csv')
+
+
+# Spool and report files go to a temporary directory, and nothing runs on
+# background threads, which would not see the test transaction
+class EquipmentTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        overrides = override_settings(EQUIPMENT_INGEST_SPOOL_DIR=f'{self.tmp}/spool',
+                                      EQUIPMENT_REPORT_DIR=f'{self.tmp}/reports',
+                                      EQUIPMENT_REPORT_CACHE=None,
+                                      EQUIPMENT_REPORT_PRERENDER=False,
+                                      EQUIPMENT_INGEST_WORKERS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user('alice', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def upload(self, name, data, **params):
+        query = ''.join(f'&{key}={value}' for key, value in params.items())
+        response = self.client.post(f"{reverse('dataset-upload')}?summary=1{query}", {'file': csv_file(name, data)},
+                                    format='multipart')
+        self.assertIn(response.status_code, (200, 202), response.content)
+        return response.json()
+
+
+class DedupTests(EquipmentTestCase):
+    def test_identical_uploads_share_content(self):
+        data = csv_bytes(400)
+        first = self.upload('line.csv', data)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.upload('again.csv', data)
+        self.assertEqual(second['summary'], first['summary'])
+        self.assertFalse(any('equipment_datasetchunk' in query['sql'] and query['sql'].startswith('INSERT')
+                             for query in queries.captured_queries))
+        self.assertEqual(DatasetContent.objects.count(), 1)
+        
+        self.assertEqual(self.client.delete(reverse('dataset-detail', args=[first['id']])).status_code, 204)
+        rows = self.client.get(reverse('dataset-rows', args=[second['id']]), {'offset': 399}).json()
+        self.assertEqual((rows['count'], rows['results'][0]['Equipment Name']), (400, 'Unit-399'))
+    
+    @override_settings(EQUIPMENT_CONTENT_CACHE_SIZE=0)
+    def test_unreferenced_content_is_released(self):
+        dataset = self.upload('line.csv', csv_bytes(100))
+        self.client.delete(reverse('dataset-detail', args=[dataset['id']]))
+        self.assertFalse(DatasetContent.objects.exists())
+        self.assertFalse(DatasetChunk.objects.exists())
+
+
+class StreamingIngestTests(EquipmentTestCase):
+    def test_chunked_summary_matches_whole_file(self):
+        data = csv_bytes(1000)
+        whole = RunningSummary()
+        whole.update(read_csv(io.BytesIO(data)))
+        streamed = ingest_csv(io.BytesIO(data), chunksize=64)
+        expected, actual = whole.as_dict(), streamed.as_dict()
+        for field in ('avg_flowrate', 'avg_pressure', 'avg_temperature'):
+            self.assertAlmostEqual(actual.pop(field), expected.pop(field), places=9)
+        self.assertEqual(actual, expected)
+        
+        frame = pd.read_csv(io.BytesIO(data))
+        self.assertEqual(streamed.total_count, len(frame))
+        self.assertAlmostEqual(streamed.mean('Flowrate'), frame['Flowrate'].mean(), places=9)
+        self.assertEqual(streamed.group_distribution(), frame['Type'].value_counts().to_dict())
+    
+    @override_settings(EQUIPMENT_CONTENT_CACHE_SIZE=0, EQUIPMENT_INGEST_CHUNKSIZE=64)
+    def test_streamed_upload_matches_full_upload(self):
+        data = csv_bytes(999)
+        response = self.client.post(reverse('dataset-upload'), {'file': csv_file('line.csv', data)},
+                                    format='multipart')
+        self.assertEqual(response.status_code, 200)
+        full = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(full['data']), 999)
+        # Released with its only dataset, so the same bytes are parsed again
+        self.client.delete(reverse('dataset-detail', args=[full['id']]))
+        self.assertFalse(DatasetContent.objects.exists())
+        
+        streamed = self.upload('line.csv', data)
+        self.assertNotIn('data', streamed)
+        self.assertEqual(streamed['summary'], full['summary'])
+        self.assertEqual(DatasetChunk.objects.count(), 999 // 64 + 1)
+
+
+# Cell values with every kind of missing value as None
+def cells(series):
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+class ColumnarTests(SimpleTestCase):
+    def frame(self):
+        return pd.DataFrame({
+            'Equipment Name': ['007', 'Pompe-é', None, 'Valve-9'],
+            'Type': pd.Categorical(['Pump', 'Pump', None, 'Valve']),
+            'Flowrate': [1.5, float('nan'), 3.0, 4.25],
+            'Serial': [10, 20, 30, 40],
+            'Site': ['north', 'north', 'north', None],
+        })
+    
+    def test_round_trip(self):
+        frame = self.frame()
+        for compress in (True, False):
+            with self.subTest(compress=compress):
+                decoded = decode_frame(encode_frame(frame, compress=compress))
+                self.assertEqual(list(decoded.columns), list(frame.columns))
+                for col in frame.columns:
+                    self.assertEqual(cells(decoded[col]), cells(frame[col]), col)
+                self.assertEqual(str(decoded['Type'].dtype), 'category')
+                self.assertEqual([str(decoded[col].dtype) for col in ('Flowrate', 'Serial')], ['float64', 'int64'])
+    
+    def test_projection(self):
+        payload = encode_frame(self.frame())
+        self.assertEqual(payload_columns(payload), ['Equipment Name', 'Type', 'Flowrate', 'Serial', 'Site'])
+        projected = decode_frame(payload, ['Flowrate', 'Equipment Name', 'Missing'])
+        self.assertEqual(list(projected.columns), ['Flowrate', 'Equipment Name'])
+        self.assertEqual(cells(projected['Equipment Name']), ['007', 'Pompe-é', None, 'Valve-9'])
+        empty = decode_frame(payload, [])
+        self.assertEqual((list(empty.columns), len(empty)), ([], 4))
+
+
+@override_settings(EQUIPMENT_INGEST_CHUNKSIZE=64)
+class RowsTests(EquipmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = csv_bytes(500)
+        self.dataset = self.upload('line.csv', self.data)['id']
+        self.frame = pd.read_csv(io.BytesIO(self.data))
+    
+    def get(self, url=None, **params):
+        response = self.client.get(url or reverse('dataset-rows', args=[self.dataset]), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+    
+    def names(self, page):
+        return [row['Equipment Name'] for row in page['results']]
+    
+    def test_offset_and_cursor_pages(self):
+        page = self.get(offset=60, limit=10)
+        self.assertEqual((page['count'], page['offset'], page['limit']), (500, 60, 10))
+        self.assertEqual(self.names(page), [f'Unit-{i}' for i in range(60, 70)])
+        
+        following = self.get(page['next'])
+        self.assertEqual(self.names(following), [f'Unit-{i}' for i in range(70, 80)])
+        self.assertEqual(self.names(self.get(following['previous'])), self.names(page))
+        self.assertIsNone(self.get(offset=490, limit=10)['next'])
+        self.assertIsNone(self.get(limit=10)['previous'])
+    
+    def test_projection_and_layout(self):
+        page = self.get(columns='Flowrate,Type', limit=3, layout='columns')
+        self.assertEqual(page['columns'], ['Flowrate', 'Type'])
+        self.assertEqual(page['results'], {'Flowrate': [100.0, 101.0, 102.0], 'Type': TYPES})
+    
+    def test_filters_and_ordering(self):
+        page = self.get(type='Valve,Pump', flowrate_min=110, pressure_max=8, ordering='-Flowrate', limit=1000)
+        frame = self.frame
+        expected = frame[frame['Type'].isin(['Valve', 'Pump']) & (frame['Flowrate'] >= 110)
+                         & (frame['Pressure'] <= 8)]
+        expected = expected.sort_values('Flowrate', ascending=False, kind='stable')
+        self.assertEqual(page['count'], len(expected))
+        self.assertEqual(self.names(page), expected['Equipment Name'].tolist())
+        
+        second = self.get(type='Valve,Pump', flowrate_min=110, pressure_max=8, ordering='-Flowrate', limit=7,
+                          offset=7)
+        self.assertEqual(self.names(second), expected['Equipment Name'].tolist()[7:14])
+    
+    def test_invalid_parameters(self):
+        url = reverse('dataset-rows', args=[self.dataset])
+        for params in ({'ordering': 'Equipment Name'}, {'cursor': '!!'}, {'limit': 0}, {'flowrate_min': 'x'}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+
+class StatisticsTests(SimpleTestCase):
+    def frame(self, rows=10000, seed=7):
+        rng = np.random.default_rng(seed)
+        values = rng.normal(50, 30, size=(rows, 3)).round(2)
+        values[rng.random(values.shape) < 0.02] = np.nan
+        values[rng.random(values.shape) < 0.01] = 0.0
+        frame = pd.DataFrame(values, columns=NUMERIC_COLS)
+        frame.insert(0, 'Type', rng.choice(TYPES, size=rows, p=[0.6, 0.3, 0.1]))
+        return frame
+    
+    def summarise(self, frame, chunksize):
+        stats = DatasetStats(NUMERIC_COLS, 'Type')
+        for start in range(0, len(frame), chunksize):
+            stats.update(frame.iloc[start:start + chunksize])
+        return stats
+    
+    def check_column(self, stats, values, label):
+        figures = stats.summary(histogram=False)
+        self.assertEqual(figures['count'], values.count(), label)
+        for name, expected in (('mean', values.mean()), ('std', values.std()), ('min', values.min()),
+                               ('max', values.max())):
+            self.assertAlmostEqual(figures[name], expected, delta=1e-9 * max(abs(expected), 1), msg=(label, name))
+        for name, q in QUANTILES.items():
+            expected = values.quantile(q, interpolation='lower')
+            self.assertLessEqual(abs(figures[name] - expected), RELATIVE_ACCURACY * abs(expected) + 1e-12,
+                                 (label, name))
+    
+    def test_matches_pandas(self):
+        frame = self.frame()
+        stats = self.summarise(frame, chunksize=997)
+        self.assertEqual(stats.total_count, len(frame))
+        self.assertEqual(stats.group_distribution(), frame['Type'].value_counts().to_dict())
+        for col in NUMERIC_COLS:
+            self.check_column(stats.overall[col], frame[col], col)
+            for name, group in frame.groupby('Type'):
+                self.check_column(stats.groups[name][col], group[col], f'{name} {col}')
+    
+    def test_merge_and_stored_state(self):
+        frame = self.frame(rows=3000)
+        whole = self.summarise(frame, chunksize=len(frame))
+        merged = self.summarise(frame.iloc[:1234], chunksize=100)
+        merged.merge(self.summarise(frame.iloc[1234:], chunksize=311))
+        for col in NUMERIC_COLS:
+            expected = whole.overall[col].summary()
+            restored = RunningStats.from_state(json.loads(json.dumps(merged.overall[col].to_state())))
+            for stats in (merged.overall[col], restored):
+                figures = stats.summary()
+                self.assertEqual(figures.pop('histogram'), expected['histogram'])
+                for name, value in figures.items():
+                    self.assertAlmostEqual(value, expected[name], places=9, msg=(col, name))
+
+
+class CompareTests(EquipmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = [csv_bytes(300), csv_bytes(150, start=300), csv_bytes(40, start=1000)]
+        self.ids = [self.upload(f'run{i}.csv', data)['id'] for i, data in enumerate(self.data)]
+        self.frames = [pd.read_csv(io.BytesIO(data)) for data in self.data]
+    
+    def compare(self, **params):
+        return self.client.get(reverse('dataset-compare'), params)
+    
+    def check_deltas(self, result, baseline):
+        base = self.frames[baseline]
+        deltas = {delta['id']: delta for delta in result['deltas']}
+        self.assertEqual(result['baseline'], self.ids[baseline])
+        self.assertEqual(sorted(deltas), sorted(i for i in self.ids if i != self.ids[baseline]))
+        for dataset_id, frame in zip(self.ids, self.frames):
+            if dataset_id == self.ids[baseline]:
+                continue
+            delta = deltas[dataset_id]
+            self.assertEqual(delta['total_count'], len(frame) - len(base))
+            for col in NUMERIC_COLS:
+                self.assertAlmostEqual(delta['means'][col], frame[col].mean() - base[col].mean(), places=9)
+            counts, base_counts = frame['Type'].value_counts(), base['Type'].value_counts()
+            self.assertEqual(delta['type_distribution'],
+                             {name: int(counts.get(name, 0) - base_counts.get(name, 0)) for name in TYPES})
+    
+    def test_deltas_against_first_dataset(self):
+        response = self.compare(ids=','.join(map(str, self.ids)))
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.check_deltas(result, 0)
+        self.assertEqual([entry['id'] for entry in result['datasets']], self.ids)
+        
+        merged, everything = result['merged'], pd.concat(self.frames)
+        self.assertEqual(merged['total_count'], len(everything))
+        for col in NUMERIC_COLS:
+            self.assertEqual(merged['columns'][col]['count'], len(everything))
+            self.assertAlmostEqual(merged['columns'][col]['mean'], everything[col].mean(), places=9)
+            self.assertAlmostEqual(merged['columns'][col]['std'], everything[col].std(), places=9)
+    
+    def test_chosen_baseline(self):
+        response = self.compare(ids=','.join(map(str, self.ids)), baseline=self.ids[2])
+        self.assertEqual(response.status_code, 200)
+        self.check_deltas(response.json(), 2)
+    
+    def test_invalid_requests(self):
+        ids = ','.join(map(str, self.ids[:2]))
+        self.assertEqual(self.compare(ids=ids, baseline=self.ids[2]).status_code, 400)
+        self.assertEqual(self.compare(ids='a,b').status_code, 400)
+        self.assertEqual(self.compare(ids=f'{ids},999999').status_code, 404)
+
+
+class ChartDataTests(EquipmentTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # One spike, which downsampling must not lose
+        lines = csv_bytes(5000).decode().splitlines(keepends=True)
+        lines[3001] = 'Unit-3000,Pump,999,5.5,60\n'
+        self.data = ''.join(lines).encode()
+        self.dataset = self.upload('line.csv', self.data)['id']
+        self.frame = pd.read_csv(io.BytesIO(self.data))
+    
+    def chart_data(self, **params):
+        response = self.client.get(reverse('dataset-chart-data', args=[self.dataset]), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+    
+    def test_histogram_bins(self):
+        for bins, expected in ((7, 7), (MAX_BINS + 50, MAX_BINS)):
+            with self.subTest(bins=bins):
+                for col, histogram in self.chart_data(bins=bins)['histograms'].items():
+                    self.assertEqual((len(histogram['counts']), len(histogram['edges'])), (expected, expected + 1))
+                    self.assertEqual(sum(histogram['counts']), 5000)
+                    self.assertEqual((histogram['edges'][0], histogram['edges'][-1]),
+                                     (self.frame[col].min(), self.frame[col].max()))
+    
+    def test_series_points(self):
+        for method in METHODS:
+            with self.subTest(method=method):
+                data = self.chart_data(points=50, method=method, columns='Flowrate')
+                self.assertEqual(list(data['series']), ['Flowrate'])
+                series = data['series']['Flowrate']
+                self.assertLessEqual(len(series['x']), 50)
+                self.assertEqual(series['x'], sorted(set(series['x'])))
+                self.assertEqual(series['y'], self.frame['Flowrate'].iloc[series['x']].tolist())
+                self.assertIn(999.0, series['y'])
+                self.assertIn(self.frame['Flowrate'].min(), series['y'])
+        series = self.chart_data(points=50)['series']['Pressure']
+        self.assertEqual((series['x'][0], series['x'][-1]), (0, 4999))
+        self.assertEqual(len(self.chart_data(points=10 ** 6)['series']['Pressure']['x']), 5000)
+    
+    def test_top_types(self):
+        self.assertEqual(self.chart_data(top=2)['types'],
+                         {'labels': ['Pump', 'Valve', 'Other'], 'counts': [1667, 1667, 1666]})
+        self.assertEqual(self.chart_data()['types']['labels'], ['Pump', 'Valve', 'Compressor'])
+    
+    def test_invalid_options(self):
+        url = reverse('dataset-chart-data', args=[self.dataset])
+        for params in ({'method': 'mean'}, {'columns': 'Type'}, {'points': 2}, {'bins': 0}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+
+@modify_settings(MIDDLEWARE={'append': 'equipment.instrumentation.InstrumentationMiddleware'})
+class InstrumentationTests(EquipmentTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        self.staff = User.objects.create_user('root', password='secret', is_staff=True)
+        self.staff_client = APIClient()
+        self.staff_client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.staff).key}')
+    
+    def timings(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+        return entries
+    
+    def test_server_timing(self):
+        response = self.client.post(f"{reverse('dataset-upload')}?summary=1",
+                                    {'file': csv_file('line.csv', csv_bytes(50))}, format='multipart')
+        timings = self.timings(response)
+        for name in ('receive', 'dedup', 'ingest', 'record', 'db', 'total'):
+            self.assertIn(name, timings)
+            self.assertGreaterEqual(float(timings[name]['dur']), 0)
+        self.assertRegex(timings['db']['desc'], r'^"[1-9]\d* queries"$')
+        self.assertGreaterEqual(float(timings['total']['dur']), float(timings['ingest']['dur']))
+    
+    def test_metrics_are_staff_only(self):
+        self.client.get(reverse('dataset-list'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.staff_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('equipment_requests_total{view="dataset-list",method="GET",status="200"} 1', text)
+        self.assertIn('equipment_request_duration_seconds_count{view="dataset-list"} 1', text)
+        self.assertIn('# TYPE equipment_span_duration_seconds histogram', text)
+    
+    def test_profiling_is_staff_only(self):
+        with override_settings(EQUIPMENT_PROFILE_DIR=f'{self.tmp}/profiles'):
+            plain = self.client.get(reverse('dataset-list'), HTTP_X_PROFILE='cprofile')
+            profiled = self.staff_client.get(reverse('dataset-list'), HTTP_X_PROFILE='cprofile')
+        self.assertNotIn('X-Profile-File', plain)
+        self.assertEqual(os.listdir(f'{self.tmp}/profiles'), [profiled['X-Profile-File']])
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def test_matches_json_renderer(self):
+        moment = datetime(2026, 3, 8, 7, 30, 15, 123456, tzinfo=ZoneInfo('UTC'))
+        data = {
+            'utc': moment,
+            'whole_seconds': moment.replace(microsecond=0),
+            'local': moment.astimezone(ZoneInfo('America/Chicago')),
+            'naive': moment.replace(tzinfo=None),
+            # Local mean time, an offset with seconds
+            'historic': datetime(1880, 1, 1, 12, tzinfo=ZoneInfo('America/Chicago')),
+            'date': moment.date(),
+            'time': moment.time(),
+            'elapsed': timedelta(seconds=90, microseconds=5),
+            'amount': Decimal('1.25'),
+            'label': gettext_lazy('Pump'),
+            'array': np.arange(3),
+            'scalar': np.float64(0.1),
+            'text': 'Pompe "é"\n',
+            'nested': [{'id': 1, 'values': (1.5, None, True)}],
+        }
+        rendered = json.loads(ORJSONRenderer().render(data))
+        self.assertEqual(rendered, json.loads(JSONRenderer().render(data)))
+        self.assertEqual((rendered['utc'], rendered['historic']),
+                         ('2026-03-08T07:30:15.123456Z', '1880-01-01T12:00:00-05:50:36'))
+    
+    def test_nan_is_null(self):
+        self.assertEqual(ORJSONRenderer().render({'mean': float('nan')}), b'{"mean":null}')
+
+
+class UploadResponseTests(EquipmentTestCase):
+    def post(self, data):
+        response = self.client.post(reverse('dataset-upload'), {'file': csv_file('line.csv', data)},
+                                    format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+    
+    def test_spliced_rows_match_encoded_rows(self):
+        data = (HEADER + 'Pompe "é",Pump,n/a,5.5,60\n' + csv_bytes(300).decode()[len(HEADER):]).encode()
+        with override_settings(EQUIPMENT_INGEST_CHUNKSIZE=64):
+            parsed = self.post(data)
+            # Same bytes again: the rows now come out of storage
+            stored = self.post(data)
+        dataset = EquipmentDataset.objects.get(pk=parsed['id'])
+        frame = read_csv(io.BytesIO(data))
+        expected = {
+            'id': dataset.id,
+            'summary': upload_summary(dataset),
+            'rows': f"http://testserver{reverse('dataset-rows', args=[dataset.id])}",
+            'data': frame_records(frame),
+        }
+        self.assertEqual(parsed, expected)
+        self.assertEqual(parsed['data'][0], {'Equipment Name': 'Pompe "é"', 'Type': 'Pump', 'Flowrate': None,
+                                             'Pressure': 5.5, 'Temperature': 60.0})
+        self.assertEqual(stored['data'], parsed['data'])
+        self.assertEqual(stored['summary'], parsed['summary'])
+
+
+class PruneHistoryTests(EquipmentTestCase):
+    def test_keeps_newest_datasets(self):
+        ids = [self.upload(f'run{i}.csv', csv_bytes(20, start=i))['id'] for i in range(history_limit() + 3)]
+        kept = list(EquipmentDataset.objects.filter(user=self.user).values_list('pk', flat=True))
+        self.assertEqual(sorted(kept), sorted(ids[-history_limit():]))
+    
+    def test_prune_statements(self):
+        limit = history_limit()
+        with override_settings(EQUIPMENT_HISTORY_LIMIT=limit + 3):
+            ids = [self.upload(f'run{i}.csv', csv_bytes(20, start=i))['id'] for i in range(limit + 3)]
+        job = IngestJob.objects.create(user=self.user, filename='run0.csv', sha256='0' * 64,
+                                       status=IngestJob.DONE, dataset_id=ids[0])
+        # Same upload time as the oldest kept dataset: the pk breaks the tie
+        EquipmentDataset.objects.filter(pk=ids[2]).update(
+            uploaded_at=EquipmentDataset.objects.get(pk=ids[3]).uploaded_at)
+        deleted = []
+        
+        def on_delete(sender, instance, **kwargs):
+            deleted.append(instance.pk)
+        
+        post_delete.connect(on_delete, sender=EquipmentDataset)
+        self.addCleanup(post_delete.disconnect, on_delete, sender=EquipmentDataset)
+        with CaptureQueriesContext(connection) as queries:
+            pruned = prune_history(self.user)
+        
+        self.assertEqual(sorted(pruned), sorted(ids[:3]))
+        self.assertEqual(sorted(deleted), sorted(ids[:3]))
+        kept = EquipmentDataset.objects.filter(user=self.user).values_list('pk', flat=True)
+        self.assertEqual(sorted(kept), sorted(ids[3:]))
+        self.assertIsNone(IngestJob.objects.get(pk=job.pk).dataset_id)
+        # The surplus ids, the collector's fetch of them, then one UPDATE and
+        # one DELETE however many datasets go
+        statements = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual([sql.split()[0] for sql in statements], ['SELECT', 'SELECT', 'UPDATE', 'DELETE'],
+                         statements)
+        self.assertNotIn('raw_data', statements[1])
+        with self.assertNumQueries(1):
+            self.assertEqual(prune_history(self.user), [])
+
+
+class AppendTests(EquipmentTestCase):
+    def append(self, dataset_id, name, data):
+        response = self.client.post(reverse('dataset-append', args=[dataset_id]), {'file': csv_file(name, data)},
+                                    format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+    
+    def stats(self, dataset_id):
+        return self.client.get(reverse('dataset-stats', args=[dataset_id])).json()
+    
+    def test_append_matches_one_upload_of_all_rows(self):
+        first, second = csv_bytes(700), csv_bytes(450, start=700)
+        dataset = self.upload('line.csv', first)
+        appended = self.append(dataset['id'], 'more.csv', second)
+        whole = self.upload('whole.csv', first + second[len(HEADER):])
+        
+        self.assertEqual(appended['appended'], 450)
+        self.assertEqual(appended['summary'], whole['summary'])
+        merged, expected = self.stats(dataset['id']), self.stats(whole['id'])
+        for column, figures in expected['columns'].items():
+            for field in ('count', 'mean', 'std', 'min', 'max'):
+                self.assertAlmostEqual(merged['columns'][column][field], figures[field], places=9, msg=column)
+        self.assertEqual(sorted(merged['by_type']), sorted(expected['by_type']))
+        rows = self.client.get(reverse('dataset-rows', args=[dataset['id']]), {'offset': 1149}).json()
+        self.assertEqual((rows['count'], rows['results'][0]['Equipment Name']), (1150, 'Unit-1149'))
+    
+    def test_append_leaves_shared_content_alone(self):
+        data = csv_bytes(300)
+        original = self.upload('line.csv', data)
+        copy = self.upload('copy.csv', data)
+        self.assertEqual(EquipmentDataset.objects.get(pk=original['id']).content_id,
+                         EquipmentDataset.objects.get(pk=copy['id']).content_id)
+        self.append(copy['id'], 'more.csv', csv_bytes(100, start=300))
+        
+        self.assertEqual(self.client.get(reverse('dataset-detail', args=[original['id']]),
+                                         {'summary': 1}).json()['total_count'], 300)
+        self.assertEqual(self.stats(original['id'])['columns']['Flowrate']['count'], 300)
+        self.assertEqual(self.stats(copy['id'])['columns']['Flowrate']['count'], 400)
+    
+    def test_append_with_other_columns_is_rejected(self):
+        dataset = self.upload('line.csv', csv_bytes(50))
+        response = self.client.post(reverse('dataset-append', args=[dataset['id']]),
+                                    {'file': csv_file('odd.csv', b'Equipment Name,Type\nX,Pump\n')}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(EquipmentDataset.objects.get(pk=dataset['id']).total_count, 50)
+
+
+class ExportTests(EquipmentTestCase):
+    def export(self, dataset_id, fmt, params, **headers):
+        response = self.client.get(reverse('dataset-export', kwargs={'pk': dataset_id, 'fmt': fmt}), params, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+    
+    def test_csv_type_filter_gzip(self):
+        dataset = self.upload('line.csv', csv_bytes(1000))
+        response, body = self.export(dataset['id'], 'csv', {'type': 'Pump', 'columns': 'Equipment Name,Flowrate'},
+                                     HTTP_ACCEPT_ENCODING='br, gzip;q=0.8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        rows = list(csv.reader(io.StringIO(gzip.decompress(body).decode('utf-8'))))
+        self.assertEqual(rows[0], ['Equipment Name', 'Flowrate'])
+        self.assertEqual([row[0] for row in rows[1:]], [f'Unit-{i}' for i in range(0, 1000, len(TYPES))])
+    
+    def test_ndjson_without_gzip(self):
+        dataset = self.upload('line.csv', csv_bytes(90))
+        response, body = self.export(dataset['id'], 'ndjson', {'type': 'Valve,Compressor', 'flowrate_min': 110})
+        self.assertFalse(response.has_header('Content-Encoding'))
+        records = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+        self.assertTrue(records)
+        self.assertTrue(all(record['Type'] in ('Valve', 'Compressor') and record['Flowrate'] >= 110
+                            for record in records))
+        self.assertEqual(len(records), sum(1 for i in range(90) if i % 3 and 100 + i % 17 >= 110))
+
+
+class BatchUploadTests(EquipmentTestCase):
+    def archive(self, members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for name, data in members.items():
+                archive.writestr(name, data)
+        return SimpleUploadedFile('batch.zip', buffer.getvalue(), content_type='application/zip')
+    
+    def check_batch(self):
+        members = {f'line{i}.csv': csv_bytes(200 * (i + 1), start=i) for i in range(3)}
+        members['broken.csv'] = b'a,b\n1,2\n'
+        response = self.client.post(reverse('dataset-upload-batch'), {'files': [self.archive(members)]},
+                                    format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual((body['uploaded'], body['failed']), (3, 1))
+        counts = {result['filename']: result.get('summary', {}).get('total_count') for result in body['results']}
+        self.assertEqual(counts, {'line0.csv': 200, 'line1.csv': 400, 'line2.csv': 600, 'broken.csv': None})
+        rows = self.client.get(reverse('dataset-rows', args=[body['results'][2]['id']]), {'offset': 550}).json()
+        self.assertEqual((rows['count'], rows['results'][0]['Equipment Name']), (600, 'Unit-552'))
+        # Member CSVs and their chunk spools are gone once the batch is stored
+        self.assertEqual(os.listdir(f'{self.tmp}/spool'), [])
+    
+    @override_settings(EQUIPMENT_PARSE_WORKERS=1)
+    def test_batch_parsed_in_process(self):
+        self.check_batch()
+    
+    @override_settings(EQUIPMENT_PARSE_WORKERS=2)
+    def test_batch_parsed_on_pool(self):
+        self.check_batch()
+
+
+# Every name holds a quoted newline (and an escaped quote), so byte offsets
+# picked for shard boundaries keep landing inside quoted fields
+def multiline_csv(count):
+    lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature,Notes\n']
+    for i in range(count):
+        notes = f'"say ""hi""\nto {i}"' if i % 5 == 0 else f'plain {i}'
+        lines.append(f'"Unit-{i}\nbay {i % 4}",{TYPES[i % len(TYPES)]},{100 + i % 17},{5 + i % 7}.5,{60 + i % 11},'
+                     f'{notes}\n')
+    return ''.join(lines).encode()
+
+
+class ShardedParseTests(EquipmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = multiline_csv(2000)
+        self.path = f'{self.tmp}/line.csv'
+        with open(self.path, 'wb') as f:
+            f.write(self.data)
+        os.makedirs(f'{self.tmp}/shards')
+    
+    def frames(self, payloads):
+        return pd.concat([decode_frame(payload) for _, payload in payloads], ignore_index=True)
+    
+    def test_boundaries_skip_quoted_newlines(self):
+        body = self.data.index(b'\n') + 1
+        inside = 0
+        for shards in range(2, 9):
+            header, bounds = shard_bounds(self.path, shards)
+            self.assertEqual(header, self.data[:body])
+            self.assertEqual((bounds[0][0], bounds[-1][1]), (body, len(self.data)))
+            for start, end in bounds[1:]:
+                self.assertEqual(self.data[:start].count(b'"') % 2, 0)
+            targets = [body + (len(self.data) - body) * i // shards for i in range(1, shards)]
+            inside += sum(self.data[:target].count(b'"') % 2 for target in targets)
+        # Naive cuts would have split a quoted field
+        self.assertGreater(inside, 0)
+    
+    @override_settings(EQUIPMENT_INGEST_CHUNKSIZE=150)
+    def test_sharded_parse_matches_serial(self):
+        serial, chunks = parse_file(self.path, *parse_options())
+        expected = serial.as_dict()
+        rows = self.frames(chunks)
+        self.assertEqual(rows['Equipment Name'].iloc[7], 'Unit-7\nbay 3')
+        self.assertEqual(rows['Notes'].iloc[5], 'say "hi"\nto 5')
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            for shards in (2, 3, 7):
+                with self.subTest(shards=shards):
+                    summary, payloads = parse_sharded(self.path, f'{self.tmp}/shards', pool=pool, shards=shards)
+                    try:
+                        actual = summary.as_dict()
+                        for field in ('avg_flowrate', 'avg_pressure', 'avg_temperature'):
+                            self.assertAlmostEqual(actual.pop(field), expected[field], places=9)
+                        self.assertEqual(actual, {key: value for key, value in expected.items()
+                                                  if not key.startswith('avg_')})
+                        self.assertTrue(self.frames(payloads).equals(rows))
+                    finally:
+                        payloads.close()
+        self.assertEqual(os.listdir(f'{self.tmp}/shards'), [])
+    
+    @override_settings(EQUIPMENT_PARSE_WORKERS=2, EQUIPMENT_PARALLEL_MIN_BYTES=1, FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_upload_parsed_on_pool(self):
+        with patch('equipment.views.ingest_content') as serial:
+            dataset = self.upload('line.csv', self.data)
+        serial.assert_not_called()
+        self.assertEqual(dataset['summary']['total_count'], 2000)
+        rows = self.client.get(reverse('dataset-rows', args=[dataset['id']]), {'offset': 1995}).json()['results']
+        self.assertEqual([row['Equipment Name'] for row in rows], [f'Unit-{i}\nbay {i % 4}' for i in range(1995, 2000)])
+
+
+class IngestJobTests(EquipmentTestCase):
+    def running_job(self, started, heartbeat, **fields):
+        return IngestJob.objects.create(user=self.user, filename='slow.csv', sha256='0' * 64,
+                                        status=IngestJob.RUNNING, worker='other', started_at=started,
+                                        heartbeat_at=heartbeat, **fields)
+    
+    def test_async_upload_runs_on_worker(self):
+        job = self.upload('async.csv', csv_bytes(300), **{'async': 1})
+        self.assertEqual(job['status'], IngestJob.QUEUED)
+        self.assertEqual(process_jobs('worker'), 1)
+        job = IngestJob.objects.get(pk=job['id'])
+        self.assertEqual(job.status, IngestJob.DONE, job.error)
+        self.assertEqual(job.dataset.total_count, 300)
+        self.assertIsNotNone(job.heartbeat_at)
+    
+    def test_requeues_on_stale_heartbeat_only(self):
+        long_ago = timezone.now() - timedelta(hours=3)
+        alive = self.running_job(long_ago, timezone.now())
+        dead = self.running_job(long_ago, long_ago)
+        legacy = self.running_job(long_ago, None)
+        self.assertEqual(requeue_stale_jobs(), 2)
+        statuses = dict(IngestJob.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[alive.pk], IngestJob.RUNNING)
+        self.assertEqual(statuses[dead.pk], IngestJob.QUEUED)
+        self.assertEqual(statuses[legacy.pk], IngestJob.QUEUED)
+    
+    def test_requeued_job_stops_its_old_worker(self):
+        self.upload('async.csv', csv_bytes(50), **{'async': 1})
+        job = claim_job('first')
+        beat = Heartbeat(job)
+        beat(force=True)
+        IngestJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(claim_job('second').pk, job.pk)
+        with self.assertRaises(JobLost):
+            beat(force=True)
+
+
+class UploadSessionTests(EquipmentTestCase):
+    def open_session(self, data):
+        response = self.client.post(reverse('upload-list'), {'filename': 'big.csv', 'size': len(data)}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+    
+    def put(self, session, data, first, last):
+        return self.client.put(reverse('upload-detail', args=[session]), data[first:last + 1],
+                               content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=f'bytes {first}-{last}/{len(data)}')
+    
+    def send(self, data, sha256):
+        session = self.open_session(data)
+        middle = len(data) // 2
+        self.assertEqual(self.put(session, data, 0, middle - 1).json()['received'], middle)
+        self.assertEqual(self.put(session, data, middle, len(data) - 1).json()['received'], len(data))
+        response = self.client.post(reverse('upload-finalize', args=[session]), {'sha256': sha256}, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        process_jobs('worker')
+        return IngestJob.objects.get(pk=session)
+    
+    def test_finalize_stores_dataset(self):
+        data = csv_bytes(500)
+        job = self.send(data, hashlib.sha256(data).hexdigest())
+        self.assertEqual(job.status, IngestJob.DONE, job.error)
+        self.assertEqual(job.dataset.total_count, 500)
+    
+    def test_finalize_with_wrong_sha256_fails(self):
+        data = csv_bytes(500)
+        job = self.send(data, hashlib.sha256(b'something else').hexdigest())
+        self.assertEqual(job.status, IngestJob.FAILED)
+        self.assertIn('sha256', job.error)
+        self.assertIsNone(job.dataset)
+        self.assertFalse(EquipmentDataset.objects.filter(user=self.user).exists())
+    
+    def test_requeued_session_is_left_to_its_new_worker(self):
+        data = csv_bytes(500)
+        session = self.open_session(data)
+        self.put(session, data, 0, len(data) - 1)
+        stale = claim_job('first')
+        IngestJob.objects.filter(pk=session).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        requeue_stale_jobs()
+        claim_job('second')
+        # Every byte is in but not finalized, so the old run waits and beats
+        with self.assertLogs('equipment.jobs', 'WARNING'):
+            run_session(stale)
+        job = IngestJob.objects.get(pk=session)
+        self.assertEqual((job.status, job.worker), (IngestJob.RUNNING, 'second'))
+        self.assertFalse(EquipmentDataset.objects.filter(user=self.user).exists())
+
+
+class TokenAuthenticationTests(EquipmentTestCase):
+    def setUp(self):
+        super().setUp()
+        _local.clear()
+        self.addCleanup(_local.clear)
+        self.client = APIClient()
+    
+    def login(self):
+        response = self.client.post(reverse('login'), {'username': 'alice', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['token']
+    
+    def authenticate(self, key):
+        request = APIRequestFactory().get('/api/datasets/', HTTP_AUTHORIZATION=f'Token {key}')
+        return CachedTokenAuthentication().authenticate(request)
+    
+    def check_logout(self):
+        key = self.login()
+        self.assertEqual(self.authenticate(key)[0].pk, self.user.pk)
+        # Cached now: no query for the next request with the token
+        with self.assertNumQueries(0):
+            self.authenticate(key)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(self.client.post(reverse('logout')).status_code, 204)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(key)
+        self.assertNotEqual(self.login(), key)
+    
+    def test_logout_revokes_cached_token(self):
+        self.check_logout()
+    
+    @override_settings(EQUIPMENT_TOKEN_CACHE='default')
+    def test_logout_revokes_token_in_shared_cache(self):
+        self.check_logout()
+    
+    def test_deactivated_user_is_refused(self):
+        key = self.login()
+        self.authenticate(key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(key)
+    
+    def test_password_change_drops_cached_token(self):
+        key = self.login()
+        self.authenticate(key)
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('changed')
+        user.save()
+        with self.assertNumQueries(1):
+            self.authenticate(key)
+    
+    def test_login_keeps_cached_tokens(self):
+        key = self.login()
+        self.authenticate(key)
+        # Saving last_login (every login does) or unrelated fields looks no token up
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Alice'
+        with self.assertNumQueries(1):
+            user.save()
+        self.assertEqual(self.login(), key)
+        with self.assertNumQueries(0):
+            self.authenticate(key)
+    
+    def test_query_parameter_is_off_by_default(self):
+        key = self.login()
+        url = reverse('dataset-list')
+        self.assertEqual(self.client.get(url, {'token': key}).status_code, 401)
+        with override_settings(EQUIPMENT_TOKEN_QUERY_PARAM='token'):
+            self.assertEqual(self.client.get(url, {'token': key}).status_code, 200)
+
+
+CHICAGO = ZoneInfo('America/Chicago')
+
+
+# America/Chicago switched to daylight time at 2026-03-08 02:00 and back at
+# 2026-11-01 02:00; the buckets must not depend on which half of the year
+# the rollup runs in
+@override_settings(TIME_ZONE='America/Chicago')
+class TrendRollupTests(EquipmentTestCase):
+    def add_point(self, *local, rows=10, flowrate=100.0):
+        recorded_at = datetime(*local, tzinfo=CHICAGO)
+        TrendPoint.objects.create(user=self.user, recorded_at=recorded_at, recorded_ts=int(recorded_at.timestamp()),
+                                  total_count=rows, avg_flowrate=flowrate, avg_pressure=5.0, avg_temperature=60.0)
+    
+    def buckets(self, bucket):
+        return [(point['bucket'], point['uploads']) for point in trend_rollup(self.user, bucket)]
+    
+    def test_days_across_dst_change(self):
+        self.add_point(2026, 1, 15, 23, 30)
+        self.add_point(2026, 3, 7, 23, 30)
+        self.add_point(2026, 3, 8, 0, 30)
+        self.add_point(2026, 3, 8, 23, 30)
+        self.add_point(2026, 7, 15, 0, 15)
+        self.add_point(2026, 11, 1, 0, 30)
+        self.add_point(2026, 11, 1, 23, 30)
+        self.assertEqual(self.buckets('day'), [
+            (datetime(2026, 1, 15, tzinfo=CHICAGO), 1),
+            (datetime(2026, 3, 7, tzinfo=CHICAGO), 1),
+            (datetime(2026, 3, 8, tzinfo=CHICAGO), 2),
+            (datetime(2026, 7, 15, tzinfo=CHICAGO), 1),
+            (datetime(2026, 11, 1, tzinfo=CHICAGO), 2),
+        ])
+    
+    def test_months_across_dst_change(self):
+        self.add_point(2026, 2, 28, 23, 30, flowrate=10.0)
+        self.add_point(2026, 3, 1, 0, 30, rows=30, flowrate=20.0)
+        self.add_point(2026, 3, 31, 23, 30, rows=10, flowrate=40.0)
+        self.add_point(2026, 4, 1, 0, 30)
+        months = trend_rollup(self.user, 'month')
+        self.assertEqual([(point['bucket'], point['uploads']) for point in months], [
+            (datetime(2026, 2, 1, tzinfo=CHICAGO), 1),
+            (datetime(2026, 3, 1, tzinfo=CHICAGO), 2),
+            (datetime(2026, 4, 1, tzinfo=CHICAGO), 1),
+        ])
+        self.assertAlmostEqual(months[1]['avg_flowrate'], 25.0)
+    
+    def test_week_cut_by_dst_change(self):
+        self.add_point(2026, 3, 2, 0, 30)
+        self.add_point(2026, 3, 8, 23, 30)
+        self.add_point(2026, 3, 9, 0, 30)
+        self.assertEqual(self.buckets('week'), [
+            (datetime(2026, 3, 2, tzinfo=CHICAGO), 2),
+            (datetime(2026, 3, 9, tzinfo=CHICAGO), 1),
+        ])
+    
+    def test_repeated_hour_stays_two_buckets(self):
+        self.add_point(2026, 11, 1, 0, 30)
+        self.add_point(2026, 11, 1, 1, 30)
+        repeated = datetime(2026, 11, 1, 1, 30, fold=1, tzinfo=CHICAGO)
+        TrendPoint.objects.create(user=self.user, recorded_at=repeated, recorded_ts=int(repeated.timestamp()),
+                                  total_count=10, avg_flowrate=100.0, avg_pressure=5.0, avg_temperature=60.0)
+        hours = [point['bucket'].timestamp() for point in trend_rollup(self.user, 'hour')]
+        self.assertEqual(len(hours), 3)
+        self.assertEqual(hours[2] - hours[1], 3600)
+
+
+class ReportTests(EquipmentTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dataset = self.upload('line.csv', csv_bytes(50))['id']
+        self.url = reverse('dataset-download-pdf', args=[self.dataset])
+    
+    def test_cold_cache_renders_inline(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        etag = response['ETag']
+        
+        # Stored now: the next request serves the same file without rendering
+        with patch('equipment.views.render_report') as render:
+            cached = self.client.get(self.url)
+            self.assertEqual(cached.status_code, 200)
+            self.assertEqual(cached['ETag'], etag)
+            self.assertTrue(b''.join(cached.streaming_content).startswith(b'%PDF'))
+        render.assert_not_called()
+    
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+    
+    @override_settings(EQUIPMENT_REPORT_WORKERS=1)
+    def test_async_is_opt_in(self):
+        for kwargs in ({'data': {'async': 1}}, {'HTTP_PREFER': 'respond-async'}):
+            with self.subTest(**kwargs), patch('equipment.views.schedule_report') as schedule:
+                response = self.client.get(self.url, **kwargs)
+                self.assertEqual(response.status_code, 202)
+                self.assertEqual(response['Retry-After'], '1')
+                self.assertEqual(response.json(), {'status': 'rendering'})
+                schedule.assert_called_once()
+
+class ValidationTests(EquipmentTestCase):
+    def post(self, data, **params):
+        return self.client.post(reverse('dataset-upload'), {'file': csv_file('line.csv', data)}, format='multipart',
+                                QUERY_STRING='&'.join(f'{key}={value}' for key, value in params.items()))
+    
+    def rows(self, dataset_id):
+        return self.client.get(reverse('dataset-rows', args=[dataset_id]), {'limit': 1000}).json()['results']
+    
+    def test_names_and_types_are_pinned(self):
+        data = (HEADER + '007,Pump,1,2,3\n1e3,Valve,4,5,6\n').encode()
+        dataset = self.upload('names.csv', data)
+        self.assertEqual([row['Equipment Name'] for row in self.rows(dataset['id'])], ['007', '1e3'])
+        for engine in ('c', 'pyarrow'):
+            with self.subTest(engine=engine):
+                frame = read_csv(io.BytesIO(data), engine=engine)
+                self.assertEqual(list(frame['Equipment Name']), ['007', '1e3'])
+                self.assertEqual(str(frame['Type'].dtype), 'category')
+                self.assertEqual([str(frame[col].dtype) for col in NUMERIC_COLS], ['float64'] * 3)
+    
+    def test_bad_cells_are_reported(self):
+        lines = [HEADER, 'A,Pump,1,2,3\n', 'B,Pump,broken,2,3\n', 'C,Valve,4,high,6\n']
+        response = self.post(''.join(lines).encode())
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['summary']['validation'], {'invalid_cells': 2, 'errors': [
+            {'row': 2, 'column': 'Flowrate', 'value': 'broken'},
+            {'row': 3, 'column': 'Pressure', 'value': 'high'},
+        ]})
+        self.assertEqual([row['Flowrate'] for row in body['data']], [1.0, None, 4.0])
+    
+    def test_reported_cells_are_capped(self):
+        count = MAX_REPORTED_ERRORS + 50
+        data = (HEADER + ''.join(f'U{i},Pump,bad{i},2,3\n' for i in range(count)) + 'Z,Pump,1,2,3\n').encode()
+        # Chunks of 40 rows: the cap holds across the per-chunk reports
+        with override_settings(EQUIPMENT_INGEST_CHUNKSIZE=40):
+            validation = self.upload('dirty.csv', data)['summary']['validation']
+        self.assertEqual(validation['invalid_cells'], count)
+        self.assertEqual(len(validation['errors']), MAX_REPORTED_ERRORS)
+        self.assertEqual(validation['errors'][-1], {'row': MAX_REPORTED_ERRORS, 'column': 'Flowrate',
+                                                    'value': f'bad{MAX_REPORTED_ERRORS - 1}'})
+    
+    def test_column_without_numbers_is_rejected(self):
+        data = (HEADER + 'A,Pump,low,2,3\nB,Valve,?,5,6\n').encode()
+        for params in ({}, {'summary': 1}):
+            with self.subTest(**params):
+                response = self.post(data, **params)
+                self.assertEqual(response.status_code, 400, response.content)
+                body = response.json()
+                self.assertIn('Flowrate', body['error'])
+                self.assertEqual(body['validation']['invalid_cells'], 2)
+        self.assertFalse(DatasetContent.objects.exists())
+    
+    def test_header_only_is_rejected(self):
+        for params in ({}, {'summary': 1}):
+            with self.subTest(**params):
+                response = self.post(HEADER.encode(), **params)
+                self.assertEqual(response.status_code, 400, response.content)
+                self.assertNotIn('validation', response.json())
+        self.assertFalse(EquipmentDataset.objects.exists())
+    
+    def test_pyarrow_falls_back_to_c(self):
+        data = (HEADER + 'A,Pump,1,oops,3\n').encode()
+        report = ValidationReport()
+        with patch('equipment.ingest.pyarrow', None):
+            self.assertEqual(default_engine(), 'c')
+            frame = read_csv(io.BytesIO(data), report, engine='pyarrow')
+        self.assertEqual(frame['Flowrate'].tolist(), [1.0])
+        self.assertEqual(report.errors, [{'row': 1, 'column': 'Pressure', 'value': 'oops'}])
+
+
+# ============================================
+# backend/equipment_api/settings.py (Add to existing)
+# ============================================
+"""
+Add these to your settings.py:
+
+INSTALLED_APPS = [
+    ...
+    'rest_framework',
+    'rest_framework.authtoken',
+    'corsheaders',
+    'equipment',
+]
+
+MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+    # Server-Timing headers, /api/metrics/ and X-Profile (see below)
+    'equipment.instrumentation.InstrumentationMiddleware',
+    ...
+]
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        # Token auth with the token -> user lookup cached (see below)
+        'equipment.authentication.CachedTokenAuthentication',
+    ],
+    # orjson when installed, falling back to the stock JSON encoder
+    'DEFAULT_RENDERER_CLASSES': [
+        'equipment.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+CORS_ALLOW_ALL_ORIGINS = True  # For development only
+
+# Spool every upload to a temp file instead of buffering small ones in RAM,
+# hashing it on the way in for upload deduplication
+FILE_UPLOAD_HANDLERS = [
+    'equipment.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Uploads kept per user; older ones are deleted after each upload
+EQUIPMENT_HISTORY_LIMIT = 5
+
+# Long-retention trend index: every upload's summary is also kept in a small
+# TrendPoint table (GET /api/trends/) for this many days (None: forever),
+# independent of EQUIPMENT_HISTORY_LIMIT. Existing history can be added with
+# `python manage.py backfill_trends`.
+EQUIPMENT_TRENDS = True
+EQUIPMENT_TREND_RETENTION_DAYS = 365
+
+# Parsed content no dataset references any more is kept for re-uploads:
+# at most this many entries, for at most this many seconds
+EQUIPMENT_CONTENT_CACHE_SIZE = 20
+EQUIPMENT_CONTENT_CACHE_TTL = 24 * 60 * 60
+
+# Rows per parsed/stored chunk for uploads and columnar storage
+EQUIPMENT_INGEST_CHUNKSIZE = 50000
+
+# CSV parser: 'pyarrow' (multithreaded, when pyarrow is installed) or 'c'
+# (pandas). None picks pyarrow if it imports. Either way the required
+# columns get pinned dtypes, and measurement cells that are not numbers are
+# stored as nulls and reported with the upload rather than rejecting it.
+EQUIPMENT_CSV_ENGINE = None
+
+# Uploads sent with ?async=1 wait in EQUIPMENT_INGEST_SPOOL_DIR (default:
+# the system temp dir) for one of EQUIPMENT_INGEST_WORKERS threads in the
+# web process. Set it to 0 and run `python manage.py ingest_worker` to
+# process them elsewhere (give both processes a shared CACHES backend to
+# see live progress). Workers mark their running jobs alive every 15
+# seconds; a job not marked for EQUIPMENT_INGEST_JOB_TIMEOUT seconds is
+# assumed dead and queued again.
+EQUIPMENT_INGEST_SPOOL_DIR = BASE_DIR / 'ingest_spool'
+EQUIPMENT_INGEST_WORKERS = 2
+EQUIPMENT_INGEST_JOB_TIMEOUT = 10 * 60
+
+# Resumable uploads (/api/uploads/) spool to EQUIPMENT_INGEST_SPOOL_DIR and
+# are parsed by the same workers while their pieces arrive. A worker gives
+# the session back after EQUIPMENT_UPLOAD_IDLE_TIMEOUT seconds without new
+# bytes (the next piece restarts it); sessions idle for
+# EQUIPMENT_UPLOAD_SESSION_TTL seconds are dropped.
+EQUIPMENT_UPLOAD_IDLE_TIMEOUT = 60
+EQUIPMENT_UPLOAD_SESSION_TTL = 24 * 60 * 60
+
+# CSV parsing runs on a pool of EQUIPMENT_PARSE_WORKERS processes (default:
+# CPU count, at most 4; 1 parses inline). Batch uploads parse their files
+# side by side; a single file of at least EQUIPMENT_PARALLEL_MIN_BYTES
+# (?async=1, ?summary=1 or ?stream=1 uploads) is split at line boundaries
+# and its shards parsed side by side. EQUIPMENT_BATCH_WORKERS, the old name,
+# is still read when EQUIPMENT_PARSE_WORKERS is unset.
+EQUIPMENT_PARSE_WORKERS = 4
+EQUIPMENT_PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+# POST /api/datasets/upload_batch/ holds at most EQUIPMENT_BATCH_MAX_FILES
+# CSVs and EQUIPMENT_BATCH_MAX_BYTES once archives are unpacked. Django's own
+# DATA_UPLOAD_MAX_NUMBER_FILES (100) caps the files per request as well.
+EQUIPMENT_BATCH_MAX_FILES = 100
+EQUIPMENT_BATCH_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Largest ?limit= accepted by GET /api/datasets/{id}/rows/
+EQUIPMENT_ROWS_MAX_PAGE_SIZE = 10000
+
+# zlib-compress columnar chunks (smaller on disk, slightly slower to write)
+EQUIPMENT_COLUMNAR_COMPRESS = True
+
+# Rendered PDF reports are cached under EQUIPMENT_REPORT_DIR (default: the
+# system temp dir), or in a Django cache when EQUIPMENT_REPORT_CACHE names a
+# CACHES alias. Renders run on EQUIPMENT_REPORT_WORKERS background threads
+# (0 renders inline); EQUIPMENT_REPORT_PRERENDER starts one after each upload.
+EQUIPMENT_REPORT_DIR = BASE_DIR / 'report_cache'
+EQUIPMENT_REPORT_CACHE = None
+EQUIPMENT_REPORT_WORKERS = 2
+EQUIPMENT_REPORT_PRERENDER = True
+
+# CACHES alias for chart data and server-rendered chart images
+EQUIPMENT_CHART_CACHE = 'default'
+
+# Tokens are looked up once per EQUIPMENT_TOKEN_CACHE_TTL seconds rather
+# than once per request, in a per-process LRU of EQUIPMENT_TOKEN_CACHE_SIZE
+# entries. With several server processes, name a shared CACHES alias in
+# EQUIPMENT_TOKEN_CACHE: logout or a deleted token then takes effect in every
+# process within EQUIPMENT_TOKEN_LOCAL_TTL seconds (immediately in the one
+# that handled it). Tokens are only read from the Authorization header;
+# EQUIPMENT_TOKEN_QUERY_PARAM = 'token' would also accept ?token=, for links
+# that cannot carry a header, but query strings end up in access logs.
+EQUIPMENT_TOKEN_CACHE_SIZE = 10000
+EQUIPMENT_TOKEN_CACHE_TTL = 5 * 60
+EQUIPMENT_TOKEN_CACHE = None
+EQUIPMENT_TOKEN_LOCAL_TTL = 5
+EQUIPMENT_TOKEN_QUERY_PARAM = None
+
+# Staff requests sent with an `X-Profile: cprofile` (or `pyinstrument`, if
+# installed) header are profiled; the dump is written here and named in the
+# response's X-Profile-File header
+EQUIPMENT_PROFILE_DIR = BASE_DIR / 'profiles'
+
+"""
+
+
+# ============================================
+# backend/equipment_api/urls.py
+# ============================================
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/', include('equipment.urls')),
+]
+
+
+# ============================================
+# backend/requirements.txt
+# ============================================
+"""
+Django==4.2.7
+djangorestframework==3.14.0
+pandas==2.1.3
+reportlab==4.0.7
+matplotlib==3.8.2
+orjson==3.9.10
+django-cors-headers==4.3.1
+# Optional: Parquet export (GET /api/datasets/{id}/export/parquet/) and faster CSV parsing
+pyarrow==14.0.2
+"""
+
+# ============================================
+# backend/benchmarks/synthetic.py
+# ============================================
+import os
+import numpy as np
+
+EQUIPMENT_TYPES = ['Reactor', 'Pump', 'Heat Exchanger', 'Column', 'Compressor', 'Separator', 'Mixer', 'Valve']
+
+
+def type_names(cardinality):
+    names = EQUIPMENT_TYPES[:cardinality]
+    names += [f'Type-{i}' for i in range(len(names), cardinality)]
+    return names
+
+
+# Write a synthetic equipment CSV with the same columns as sample_equipment_data.csv
+def write_equipment_csv(path, rows, type_cardinality=5, seed=0, block=100000):
+    rng = np.random.default_rng(seed)
+    types = np.array(type_names(type_cardinality))
+    with open(path, 'w') as f:
+        f.write('Equipment Name,Type,Flowrate,Pressure,Temperature\n')
+        for start in range(0, rows, block):
+            n = min(block, rows - start)
+            kinds = types[rng.integers(0, len(types), n)]
+            flow = rng.normal(170, 35, n).round(1)
+            pressure = rng.normal(52, 12, n).round(1)
+            temp = rng.normal(75, 22, n).round(1)
+            lines = [
+                f'{kind}-{start + i},{kind},{flow[i]},{pressure[i]},{temp[i]}\n'
+                for i, kind in enumerate(kinds)
+            ]
+            f.writelines(lines)
+    return path
+
+
+# The same synthetic data as an in-memory DataFrame, for benchmarks that
+# start after parsing
+def equipment_frame(rows, type_cardinality=5, seed=0):
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    types = np.array(type_names(type_cardinality))
+    kinds = types[rng.integers(0, len(types), rows)]
+    return pd.DataFrame({
+        'Equipment Name': pd.Series(kinds).str.cat(np.arange(rows).astype(str), sep='-'),
+        'Type': kinds,
+        'Flowrate': rng.normal(170, 35, rows).round(1),
+        'Pressure': rng.normal(52, 12, rows).round(1),
+        'Temperature': rng.normal(75, 22, rows).round(1),
+    })
+
+
+# Reuse a previously generated file from cache_dir when possible
+def cached_equipment_csv(cache_dir, rows, type_cardinality=5):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'equipment_{rows}_{type_cardinality}.csv')
+    if not os.path.exists(path):
+        write_equipment_csv(path + '.tmp', rows, type_cardinality)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+# ============================================
+# backend/benchmarks/bench_ingest.py
+# ============================================
+"""
+Peak RSS and rows/sec for whole-file vs chunked CSV ingest.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_ingest --sizes 10000 1000000 10000000
+
+Each measurement runs in a fresh subprocess so ru_maxrss is not polluted by
+earlier runs.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import cached_equipment_csv
+from equipment.ingest import DEFAULT_CHUNKSIZE, REQUIRED_COLS, ingest_csv
+
+MODES = ['full', 'stream']
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024 * 1024)
+
+
+def run_full(path, chunksize):
+    # Mirrors the original upload() path
+    df = pd.read_csv(path)
+    assert all(col in df.columns for col in REQUIRED_COLS)
+    df['Flowrate'].mean()
+    df['Pressure'].mean()
+    df['Temperature'].mean()
+    df['Type'].value_counts().to_dict()
+    return len(df)
+
+
+def run_stream(path, chunksize):
+    return ingest_csv(path, chunksize=chunksize).total_count
+
+
+def child(mode, path, chunksize):
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    rows = {'full': run_full, 'stream': run_stream}[mode](path, chunksize)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'mode': mode,
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 1000000, 10000000])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.chunksize)
+        return
+
+    if not args.json:
+        print(f"{'rows':>10} {'mode':>7} {'seconds':>9} {'rows/sec':>12} {'peak RSS MB':>12}")
+    for size in args.sizes:
+        path = cached_equipment_csv(args.cache_dir, size)
+        for mode in args.modes:
+            out = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_ingest',
+                 '--chunksize', str(args.chunksize), '--child', mode, path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(out)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{result['rows']:>10} {mode:>7} {result['seconds']:>9.2f} "
+                      f"{result['rows_per_sec']:>12,.0f} {result['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_parse.py
+# ============================================
+"""
+Parse throughput with inferred vs pinned dtypes, per parser engine.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_parse --sizes 100000 1000000 --dirty 0 0.001
+
+"inferred" is the old read_csv(chunksize=...) with every dtype guessed per
+chunk; "c" and "pyarrow" are ingest.iter_csv_chunks with the pinned SCHEMA
+and validation. --dirty writes a copy of each file with that fraction of
+measurement cells replaced by text, to show bad cells cost a per-chunk
+coercion, not a slower parser. "chunk MB" is the in-memory size of one chunk.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import cached_equipment_csv
+from equipment.ingest import DEFAULT_CHUNKSIZE, NUMERIC_COLS, ValidationReport, iter_csv_chunks, pyarrow
+
+ENGINES = ['inferred', 'c', 'pyarrow']
+
+
+# A copy of path with about fraction of the measurement cells made invalid
+def dirty_csv(path, fraction, seed=0):
+    out = f'{path[:-4]}_dirty{fraction:g}.csv'
+    if os.path.exists(out):
+        return out
+    frame = pd.read_csv(path, dtype=str)
+    rng = np.random.default_rng(seed)
+    for col in NUMERIC_COLS:
+        frame.loc[rng.random(len(frame)) < fraction, col] = 'n/a?'
+    frame.to_csv(out + '.tmp', index=False)
+    os.replace(out + '.tmp', out)
+    return out
+
+
+def parse(path, engine, chunksize):
+    report = ValidationReport()
+    if engine == 'inferred':
+        chunks = pd.read_csv(path, chunksize=chunksize)
+    else:
+        chunks = iter_csv_chunks(path, chunksize, report, engine)
+    rows, chunk_mb = 0, 0.0
+    for chunk in chunks:
+        if not rows:
+            chunk_mb = chunk.memory_usage(deep=True).sum() / (1024 * 1024)
+        rows += len(chunk)
+    return rows, report.count, chunk_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES)
+    parser.add_argument('--dirty', type=float, nargs='+', default=[0.0, 0.001],
+                        help='fractions of measurement cells to make invalid')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--repeat', type=int, default=3, help='best of this many runs')
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    engines = [engine for engine in args.engines if engine != 'pyarrow' or pyarrow is not None]
+    if not args.json:
+        if engines != args.engines:
+            print('pyarrow is not installed; skipping its runs')
+        print(f"{'rows':>10} {'dirty':>7} {'engine':>9} {'seconds':>8} {'rows/sec':>12} {'MB/sec':>8} "
+              f"{'invalid':>8} {'chunk MB':>9}")
+    for size in args.sizes:
+        clean = cached_equipment_csv(args.cache_dir, size)
+        for fraction in args.dirty:
+            path = dirty_csv(clean, fraction) if fraction else clean
+            megabytes = os.path.getsize(path) / (1024 * 1024)
+            for engine in engines:
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    rows, invalid, chunk_mb = parse(path, engine, args.chunksize)
+                    timings.append(time.perf_counter() - start)
+                elapsed = min(timings)
+                result = {
+                    'rows': rows,
+                    'dirty': fraction,
+                    'engine': engine,
+                    'seconds': elapsed,
+                    'rows_per_sec': rows / elapsed if elapsed else 0.0,
+                    'mb_per_sec': megabytes / elapsed if elapsed else 0.0,
+                    'invalid_cells': invalid,
+                    'chunk_mb': chunk_mb,
+                }
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print(f"{rows:>10} {fraction:>7g} {engine:>9} {elapsed:>8.2f} {result['rows_per_sec']:>12,.0f} "
+                          f"{result['mb_per_sec']:>8.1f} {invalid:>8} {chunk_mb:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_storage.py
+# ============================================
+"""
+Bytes stored and decode time: raw_data JSON records vs columnar chunks.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_storage --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import cached_equipment_csv
+from equipment.columnar import decode_frame, encode_frame
+from equipment.ingest import DEFAULT_CHUNKSIZE
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_size(path, chunksize):
+    df = pd.read_csv(path)
+    results = []
+
+    raw = df.to_json(orient='records')
+    results.append({
+        'format': 'json',
+        'bytes': len(raw.encode('utf-8')),
+        'decode_all_s': timed(lambda: json.loads(raw)),
+        # JSON has no projection: every row must be parsed to get one column
+        'decode_flowrate_s': timed(lambda: [row['Flowrate'] for row in json.loads(raw)]),
+    })
+
+    for compress in (False, True):
+        payloads = [
+            encode_frame(df.iloc[start:start + chunksize].reset_index(drop=True), compress=compress)
+            for start in range(0, len(df), chunksize)
+        ]
+        results.append({
+            'format': 'columnar+zlib' if compress else 'columnar',
+            'bytes': sum(len(p) for p in payloads),
+            'decode_all_s': timed(lambda: [decode_frame(p) for p in payloads]),
+            'decode_flowrate_s': timed(lambda: [decode_frame(p, ['Flowrate']) for p in payloads]),
+        })
+
+    for result in results:
+        result['rows'] = len(df)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    if not args.json:
+        print(f"{'rows':>10} {'format':>14} {'MB':>9} {'decode all s':>13} {'decode 1 col s':>15}")
+    for size in args.sizes:
+        for result in bench_size(cached_equipment_csv(args.cache_dir, size), args.chunksize):
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{result['rows']:>10} {result['format']:>14} {result['bytes'] / 1e6:>9.2f} "
+                      f"{result['decode_all_s']:>13.3f} {result['decode_flowrate_s']:>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/django_env.py
+# ============================================
+import contextlib
+import os
+
+
+# Configure Django and run the body against a throwaway test database, so
+# benchmarks never touch the development db.sqlite3. Pass test_name (a file
+# path for SQLite) when several threads must write to it concurrently.
+@contextlib.contextmanager
+def test_database(settings_module='equipment_api.settings', test_name=None):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    
+    setup_test_environment()
+    if test_name:
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = test_name
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+# ============================================
+# backend/benchmarks/bench_dedup.py
+# ============================================
+"""
+Upload latency on a content-hash cache hit vs a full parse.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_dedup --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import cached_equipment_csv
+
+
+def post(client, query, name, data):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    start = time.perf_counter()
+    response = client.post(f'/api/datasets/upload/{query}', {'file': SimpleUploadedFile(name, data)},
+                           format='multipart')
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.content[:200]
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with test_database():
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('bench'))
+
+        if not args.json:
+            print(f"{'rows':>10} {'response':>9} {'miss s':>9} {'hit s':>9} {'speedup':>8}")
+        variant = 0
+        for size in args.sizes:
+            with open(cached_equipment_csv(args.cache_dir, size), 'rb') as f:
+                data = f.read()
+            for label, query in (('rows', ''), ('summary', '?stream=1')):
+                # Trailing blank lines change the hash but not the parsed rows,
+                # so every miss really is a first sighting
+                variant += 1
+                unique = data + b'\n' * variant
+                miss = post(client, query, 'miss.csv', unique)
+                hits = [post(client, query, 'hit.csv', unique) for _ in range(args.repeat)]
+                result = {
+                    'rows': size,
+                    'response': label,
+                    'miss_s': miss,
+                    'hit_s': statistics.median(hits),
+                    'speedup': miss / statistics.median(hits),
+                }
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print(f"{size:>10} {label:>9} {result['miss_s']:>9.3f} {result['hit_s']:>9.3f} "
+                          f"{result['speedup']:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_append.py
+# ============================================
+"""
+Adding rows to a dataset: re-uploading the whole file vs POST .../append/.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_append --sizes 100000 1000000 --append 1 1000 50000
+
+"reupload" is the old workflow, the history file with the new rows at the
+end uploaded as a new dataset; "append" sends only the new rows. The base
+file is uploaded twice, so the first append has to copy the content both
+datasets share ("1st append"); later ones change it in place ("append").
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import cached_equipment_csv
+
+
+def post(client, url, name, data):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    start = time.perf_counter()
+    response = client.post(url, {'file': SimpleUploadedFile(name, data)}, format='multipart')
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.content[:200]
+    return elapsed, response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--append', type=int, nargs='+', default=[1, 1000, 50000], help='rows added per request')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with test_database():
+        from django.contrib.auth.models import User
+        from django.test.utils import override_settings
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('bench'))
+        # Start the parse pool outside the timings, as a running server would have
+        sample = cached_equipment_csv(args.cache_dir, max(args.sizes))
+        with open(sample, 'rb') as f:
+            post(client, '/api/datasets/upload/?summary=1', 'warmup.csv', f.read())
+
+        if not args.json:
+            print(f"{'rows':>10} {'added':>7} {'reupload s':>11} {'1st append s':>13} {'append s':>9} {'speedup':>8}")
+        variant = 0
+        for size in args.sizes:
+            with open(cached_equipment_csv(args.cache_dir, size), 'rb') as f:
+                data = f.read()
+            header, body = data.split(b'\n', 1)
+            lines = body.splitlines(keepends=True)
+            for added in args.append:
+                extra = header + b'\n' + b''.join(lines[:added])
+                # Trailing blank lines keep every upload a content-hash miss
+                variant += 1
+                with override_settings(EQUIPMENT_HISTORY_LIMIT=1000, EQUIPMENT_REPORT_PRERENDER=False):
+                    reupload, _ = post(client, '/api/datasets/upload/?summary=1', 'all.csv',
+                                       data + b''.join(lines[:added]) + b'\n' * variant)
+                    for _ in range(2):
+                        _, dataset = post(client, '/api/datasets/upload/?summary=1', 'base.csv',
+                                          data + b'\n' * variant)
+                    url = f"/api/datasets/{dataset['id']}/append/"
+                    first, _ = post(client, url, 'more.csv', extra)
+                    steady = [post(client, url, 'more.csv', extra)[0] for _ in range(args.repeat)]
+                result = {
+                    'rows': size,
+                    'added': added,
+                    'reupload_s': reupload,
+                    'first_append_s': first,
+                    'append_s': statistics.median(steady),
+                    'speedup': reupload / statistics.median(steady),
+                }
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print(f"{size:>10} {added:>7} {reupload:>11.3f} {first:>13.3f} {result['append_s']:>9.3f} "
+                          f"{result['speedup']:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_export.py
+# ============================================
+"""
+Peak Python memory and time to get a dataset's rows out: the JSON detail
+endpoint (every row in one response) vs the streaming CSV, NDJSON and
+Parquet exports, plain and gzip-encoded.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_export --sizes 100000 1000000
+"""
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import cached_equipment_csv
+
+
+def fetch(client, url, headers):
+    response = client.get(url, **headers)
+    assert response.status_code == 200, response.status_code
+    if response.streaming:
+        return sum(len(part) for part in response.streaming_content)
+    return len(response.content)
+
+
+# Timed without tracing (tracemalloc slows pure-Python encoders such as
+# to_csv severalfold), then fetched again under tracemalloc for the peak
+def measure(client, url, **headers):
+    start = time.perf_counter()
+    size = fetch(client, url, headers)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fetch(client, url, headers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024), size / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with test_database():
+        from django.contrib.auth.models import User
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from rest_framework.test import APIClient
+        from equipment.export import pyarrow
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('bench'))
+
+        variants = [('detail', '', {}), ('csv', 'export/csv/', {}),
+                    ('csv gzip', 'export/csv/', {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+                    ('ndjson', 'export/ndjson/', {}),
+                    ('ndjson gzip', 'export/ndjson/', {'HTTP_ACCEPT_ENCODING': 'gzip'})]
+        if pyarrow is not None:
+            variants.append(('parquet', 'export/parquet/', {}))
+        if not args.json:
+            print(f"{'rows':>10} {'export':>12} {'seconds':>8} {'peak MB':>8} {'body MB':>8}")
+        for size in args.sizes:
+            with open(cached_equipment_csv(args.cache_dir, size), 'rb') as f:
+                response = client.post('/api/datasets/upload/?summary=1',
+                                       {'file': SimpleUploadedFile('export.csv', f.read())}, format='multipart')
+            assert response.status_code == 200, response.content[:200]
+            dataset_id = response.json()['id']
+            for label, path, headers in variants:
+                elapsed, peak, body = measure(client, f'/api/datasets/{dataset_id}/{path}', **headers)
+                result = {'rows': size, 'export': label, 'seconds': elapsed, 'peak_mb': peak, 'body_mb': body}
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print(f"{size:>10} {label:>12} {elapsed:>8.2f} {peak:>8.1f} {body:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_batch.py
+# ============================================
+"""
+Uploading many CSVs: one request per file (plus the history refresh the
+clients did after each) vs one batch request, inline and on a process pool.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_batch --files 24 --rows 20000 --workers 1 4
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import write_equipment_csv
+
+
+def make_files(directory, count, rows):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f'batch_{rows}_{i}.csv')
+        if not os.path.exists(path):
+            write_equipment_csv(path, rows, seed=i)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=24)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with test_database():
+        from django.contrib.auth.models import User
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext, override_settings
+        from rest_framework.test import APIClient
+        from equipment import parallel
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('bench'))
+        files = []
+        for path in make_files(args.cache_dir, args.files, args.rows):
+            with open(path, 'rb') as f:
+                files.append((os.path.basename(path), f.read()))
+        variant = [0]
+
+        # Trailing blank lines change the hash but not the rows, so no run
+        # is served from another run's content
+        def unique():
+            variant[0] += 1
+            return [(name, data + b'\n' * variant[0]) for name, data in files]
+
+        # Each run returns its wall time, leaving out building the request bodies
+        def one_by_one():
+            members = unique()
+            start = time.perf_counter()
+            for name, data in members:
+                response = client.post('/api/datasets/upload/?summary=1',
+                                       {'file': SimpleUploadedFile(name, data)}, format='multipart')
+                assert response.status_code == 200, response.content[:200]
+                client.get('/api/datasets/')
+            return time.perf_counter() - start
+
+        def batched(archive):
+            members = unique()
+            if archive:
+                buffer = io.BytesIO()
+                with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+                    for name, data in members:
+                        zf.writestr(name, data)
+                uploads = [SimpleUploadedFile('batch.zip', buffer.getvalue())]
+            else:
+                uploads = [SimpleUploadedFile(name, data) for name, data in members]
+            start = time.perf_counter()
+            response = client.post('/api/datasets/upload_batch/', {'files': uploads}, format='multipart')
+            assert response.status_code == 200 and not response.json()['failed'], response.content[:200]
+            client.get('/api/datasets/')
+            return time.perf_counter() - start
+
+        runs = [('per file', 1, one_by_one)]
+        for workers in args.workers:
+            runs.append(('batch', workers, lambda: batched(False)))
+            runs.append(('batch zip', workers, lambda: batched(True)))
+
+        if not args.json:
+            print(f"{'files':>6} {'rows':>8} {'mode':>10} {'workers':>8} {'seconds':>8} {'files/s':>8} {'queries':>8}")
+        for mode, workers, run in runs:
+            with override_settings(EQUIPMENT_PARSE_WORKERS=workers):
+                if parallel._executor is not None:
+                    parallel._executor.shutdown()
+                    parallel._executor = None
+                if workers > 1:
+                    # Start the pool outside the timing, as a running server would have
+                    parallel.executor().submit(int).result()
+                with CaptureQueriesContext(connection) as queries:
+                    elapsed = run()
+            result = {
+                'files': args.files,
+                'rows': args.rows,
+                'mode': mode,
+                'workers': workers,
+                'seconds': elapsed,
+                'files_per_s': args.files / elapsed,
+                'queries': len(queries),
+            }
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{args.files:>6} {args.rows:>8} {mode:>10} {workers:>8} {elapsed:>8.2f} "
+                      f"{result['files_per_s']:>8.1f} {result['queries']:>8}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_parallel.py
+# ============================================
+"""
+CSV parse throughput on one core (ingest.parse_file) vs the file split into
+line-aligned shards across 1..N worker processes (parallel.parse_sharded),
+checking that the merged summary matches the serial one.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_parallel --sizes 1000000 5000000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import cached_equipment_csv
+
+
+def same_summary(a, b):
+    a, b = a.as_dict(), b.as_dict()
+    return (a['total_count'] == b['total_count'] and a['type_distribution'] == b['type_distribution']
+            and list(a['type_distribution']) == list(b['type_distribution'])
+            and all(math.isclose(a[key], b[key], rel_tol=1e-9)
+                    for key in ('avg_flowrate', 'avg_pressure', 'avg_temperature')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000000, 5000000])
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with test_database():
+        from equipment.ingest import parse_file
+        from equipment.parallel import parse_options, parse_sharded
+        spool = tempfile.mkdtemp(prefix='bench_parallel_')
+
+        if not args.json:
+            print(f"{'rows':>10} {'MB':>7} {'mode':>8} {'workers':>8} {'seconds':>8} {'rows/sec':>12} "
+                  f"{'speedup':>8} {'exact':>6}")
+        for size in args.sizes:
+            path = cached_equipment_csv(args.cache_dir, size)
+            megabytes = os.path.getsize(path) / (1024 * 1024)
+            start = time.perf_counter()
+            serial, _ = parse_file(path, *parse_options(), chunks=[])
+            runs = [('serial', 1, time.perf_counter() - start, True)]
+            for workers in args.workers:
+                with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    # Start the pool outside the timing, as a running server would have
+                    list(pool.map(int, range(workers)))
+                    start = time.perf_counter()
+                    summary, payloads = parse_sharded(path, spool, pool=pool, shards=workers)
+                    elapsed = time.perf_counter() - start
+                    payloads.close()
+                runs.append(('sharded', workers, elapsed, same_summary(summary, serial)))
+
+            for mode, workers, elapsed, exact in runs:
+                result = {
+                    'rows': size,
+                    'megabytes': megabytes,
+                    'mode': mode,
+                    'workers': workers,
+                    'seconds': elapsed,
+                    'rows_per_sec': size / elapsed,
+                    'speedup': runs[0][2] / elapsed,
+                    'exact': exact,
+                }
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print(f"{size:>10} {megabytes:>7.0f} {mode:>8} {workers:>8} {elapsed:>8.2f} "
+                          f"{result['rows_per_sec']:>12,.0f} {result['speedup']:>7.2f}x {str(exact):>6}")
+        os.rmdir(spool)
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_resumable.py
+# ============================================
+"""
+Time from the last byte sent to a stored dataset: ?async=1 (parsed once the
+whole file is in) vs a resumable upload (parsed while its pieces arrive).
+The network is simulated by pacing the sends at --mbps.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_resumable --sizes 200000 1000000 --mbps 50 200
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import cached_equipment_csv
+
+CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def wait_done(client, job_id):
+    while True:
+        job = client.get(f'/api/jobs/{job_id}/', {'wait': 5}).json()
+        if job['status'] in ('done', 'failed'):
+            assert job['status'] == 'done', job['error']
+            return job
+
+
+def async_upload(client, name, data, rate):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    # The test client cannot trickle a body in, so the transfer is a sleep
+    time.sleep(len(data) / rate)
+    sent = time.perf_counter()
+    response = client.post('/api/datasets/upload/?async=1', {'file': SimpleUploadedFile(name, data)},
+                           format='multipart')
+    assert response.status_code == 202, response.content[:200]
+    wait_done(client, response.json()['id'])
+    return sent
+
+
+def resumable_upload(client, name, data, rate):
+    session = client.post('/api/uploads/', {'filename': name, 'size': len(data)}, format='json').json()
+    for offset in range(0, len(data), CHUNK_BYTES):
+        chunk = data[offset:offset + CHUNK_BYTES]
+        time.sleep(len(chunk) / rate)
+        response = client.generic('PUT', f"/api/uploads/{session['id']}/", chunk,
+                                  content_type='application/octet-stream',
+                                  HTTP_CONTENT_RANGE=f'bytes {offset}-{offset + len(chunk) - 1}/{len(data)}')
+        assert response.status_code == 200, response.content[:200]
+    sent = time.perf_counter()
+    response = client.post(f"/api/uploads/{session['id']}/finalize/", {}, format='json')
+    assert response.status_code == 202, response.content[:200]
+    wait_done(client, session['id'])
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200000, 1000000])
+    parser.add_argument('--mbps', type=float, nargs='+', default=[50, 200], help='simulated link speed')
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    # Ingest runs on worker threads, which need a database file to share
+    with tempfile.TemporaryDirectory() as tmp, \
+            test_database(test_name=os.path.join(tmp, 'bench_resumable.sqlite3')):
+        from django.contrib.auth.models import User
+        from django.test.utils import override_settings
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('bench'))
+
+        if not args.json:
+            print(f"{'rows':>10} {'MB':>7} {'mbps':>6} {'protocol':>10} {'total s':>8} {'after last byte s':>18}")
+        variant = 0
+        with override_settings(EQUIPMENT_INGEST_WORKERS=1, EQUIPMENT_INGEST_SPOOL_DIR=tmp,
+                               EQUIPMENT_REPORT_PRERENDER=False):
+            for size in args.sizes:
+                with open(cached_equipment_csv(args.cache_dir, size), 'rb') as f:
+                    data = f.read()
+                for mbps in args.mbps:
+                    rate = mbps * 1e6 / 8
+                    for protocol, upload in (('async', async_upload), ('resumable', resumable_upload)):
+                        # Trailing blank lines keep every run off the dedup path
+                        variant += 1
+                        unique = data + b'\n' * variant
+                        start = time.perf_counter()
+                        sent = upload(client, 'bench.csv', unique, rate)
+                        end = time.perf_counter()
+                        result = {
+                            'rows': size,
+                            'mb': len(unique) / 1e6,
+                            'mbps': mbps,
+                            'protocol': protocol,
+                            'total_s': end - start,
+                            'after_last_byte_s': end - sent,
+                        }
+                        if args.json:
+                            print(json.dumps(result))
+                        else:
+                            print(f"{size:>10} {result['mb']:>7.1f} {mbps:>6g} {protocol:>10} "
+                                  f"{result['total_s']:>8.2f} {result['after_last_byte_s']:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_reports.py
+# ============================================
+"""
+download_pdf latency: inline render vs cached PDF vs If-None-Match 304.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_reports --repeat 50
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from django.test.utils import override_settings
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import cached_equipment_csv
+
+
+def timed_get(client, url, **headers):
+    start = time.perf_counter()
+    response = client.get(url, **headers)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return time.perf_counter() - start, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with test_database(), tempfile.TemporaryDirectory() as report_dir, \
+            override_settings(EQUIPMENT_REPORT_DIR=report_dir, EQUIPMENT_REPORT_WORKERS=0,
+                              EQUIPMENT_REPORT_PRERENDER=False):
+        from django.contrib.auth.models import User
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from rest_framework.test import APIClient
+        from equipment.reports import discard_reports
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('bench'))
+        with open(cached_equipment_csv(args.cache_dir, args.rows), 'rb') as f:
+            upload = SimpleUploadedFile('bench.csv', f.read())
+        dataset_id = client.post('/api/datasets/upload/?stream=1', {'file': upload}, format='multipart').json()['id']
+        url = f'/api/datasets/{dataset_id}/download_pdf/'
+
+        # Inline render (EQUIPMENT_REPORT_WORKERS = 0) is what every request
+        # cost before caching
+        timings = {'render': [], 'cached': [], 'not_modified': []}
+        for _ in range(args.repeat):
+            discard_reports([dataset_id])
+            elapsed, response = timed_get(client, url)
+            timings['render'].append(elapsed)
+        etag = response['ETag']
+        for _ in range(args.repeat):
+            timings['cached'].append(timed_get(client, url)[0])
+            elapsed, response = timed_get(client, url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304
+            timings['not_modified'].append(elapsed)
+
+        if not args.json:
+            print(f"{'path':>14} {'median ms':>10} {'p95 ms':>8}")
+        for path, values in timings.items():
+            values.sort()
+            result = {
+                'path': path,
+                'median_ms': statistics.median(values) * 1000,
+                'p95_ms': values[int(len(values) * 0.95) - 1] * 1000,
+            }
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{path:>14} {result['median_ms']:>10.2f} {result['p95_ms']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_stats.py
+# ============================================
+"""
+Per-column statistics: separate pandas passes vs one RunningSummary pass.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_stats --sizes 100000 1000000 10000000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import equipment_frame
+from equipment.ingest import DEFAULT_CHUNKSIZE, NUMERIC_COLS, RunningSummary
+from equipment.stats import HISTOGRAM_BINS, QUANTILES
+
+
+# What the stats endpoint reports, computed the obvious way: one pandas call
+# (and so one pass over the data) per figure, then again per Type
+def multi_pass(df):
+    result = {'type_distribution': df['Type'].value_counts().to_dict()}
+    for col in NUMERIC_COLS:
+        series = df[col]
+        result[col] = {
+            'mean': series.mean(),
+            'std': series.std(),
+            'min': series.min(),
+            'max': series.max(),
+            'quantiles': series.quantile(list(QUANTILES.values())).tolist(),
+            'histogram': np.histogram(series.dropna(), bins=HISTOGRAM_BINS),
+        }
+    grouped = df.groupby('Type')[NUMERIC_COLS]
+    result['by_type'] = grouped.agg(['count', 'mean', 'std', 'min', 'max'])
+    result['by_type_quantiles'] = grouped.quantile(list(QUANTILES.values()))
+    return result
+
+
+def single_pass(df):
+    summary = RunningSummary()
+    summary.update(df)
+    return summary
+
+
+def chunked(df, chunksize=DEFAULT_CHUNKSIZE):
+    summary = RunningSummary()
+    for start in range(0, len(df), chunksize):
+        summary.update(df.iloc[start:start + chunksize])
+    return summary
+
+
+def timed(fn, df, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(df)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def quantile_error(df, summary):
+    worst = 0.0
+    for col in NUMERIC_COLS:
+        exact = df[col].quantile(list(QUANTILES.values())).tolist()
+        stats = summary.overall[col]
+        for q, value in zip(QUANTILES.values(), exact):
+            if value:
+                worst = max(worst, abs(stats.sketch.quantile(q) / value - 1))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000, 10000000])
+    parser.add_argument('--types', type=int, default=5, help='distinct Type values')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    if not args.json:
+        print(f"{'rows':>10} {'mode':>12} {'seconds':>9} {'rows/s':>12} {'max q err':>10}")
+    for size in args.sizes:
+        df = equipment_frame(size, args.types)
+        for mode, fn in (('multi-pass', multi_pass), ('single-pass', single_pass), ('chunked', chunked)):
+            seconds, result = timed(fn, df, args.repeat)
+            error = None if mode == 'multi-pass' else quantile_error(df, result)
+            row = {'rows': size, 'mode': mode, 'seconds': seconds, 'rows_per_sec': size / seconds,
+                   'max_quantile_error': error}
+            if args.json:
+                print(json.dumps(row))
+            else:
+                shown = 'exact' if error is None else f'{error:.2%}'
+                print(f"{size:>10} {mode:>12} {seconds:>9.3f} {size / seconds:>12,.0f} {shown:>10}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_history.py
+# ============================================
+"""
+Upload latency and queries per upload under concurrent uploads from one
+user, for set-based history retention vs the old per-row delete loop.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_history --threads 1 4 8 --uploads 25
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import cached_equipment_csv
+
+
+# What upload did before: load every surplus row (raw_data included) and
+# delete them one at a time
+def loop_prune_history(user):
+    from equipment.content import history_limit
+    from equipment.models import EquipmentDataset
+    deleted = []
+    for ds in EquipmentDataset.objects.filter(user=user)[history_limit():]:
+        deleted.append(ds.id)
+        ds.delete()
+    return deleted
+
+
+def run(threads, uploads, data):
+    from django.contrib.auth.models import User
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    user = User.objects.get(username='bench')
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+
+    def worker():
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            for _ in range(uploads):
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = client.post('/api/datasets/upload/?stream=1',
+                                           {'file': SimpleUploadedFile('bench.csv', data)}, format='multipart')
+                    elapsed = time.perf_counter() - start
+                with lock:
+                    if response.status_code == 200:
+                        latencies.append(elapsed)
+                        queries.append(len(captured))
+                    else:
+                        errors.append(response.status_code)
+        finally:
+            connection.close()
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'uploads': len(latencies),
+        'errors': len(errors),
+        'uploads_per_sec': len(latencies) / wall,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+        'queries_per_upload': statistics.mean(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--uploads', type=int, default=25, help='uploads per thread')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with open(cached_equipment_csv(args.cache_dir, args.rows), 'rb') as f:
+        # Identical bytes every time: uploads after the first are dedup hits,
+        # so the timings are dominated by history bookkeeping
+        data = f.read()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            test_database(test_name=os.path.join(tmp, 'bench_history.sqlite3')):
+        from django.contrib.auth.models import User
+        from django.test.utils import override_settings
+        from equipment import content
+        from equipment.models import EquipmentDataset
+        User.objects.create_user('bench')
+        set_based = content.prune_history
+
+        if not args.json:
+            print(f"{'strategy':>10} {'threads':>8} {'uploads':>8} {'errors':>7} {'up/s':>8} "
+                  f"{'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+        with override_settings(EQUIPMENT_REPORT_PRERENDER=False):
+            for strategy, prune in (('loop', loop_prune_history), ('set-based', set_based)):
+                content.prune_history = prune
+                try:
+                    for threads in args.threads:
+                        EquipmentDataset.objects.all().delete()
+                        result = dict(strategy=strategy, threads=threads, **run(threads, args.uploads, data))
+                        if args.json:
+                            print(json.dumps(result))
+                        else:
+                            print(f"{strategy:>10} {threads:>8} {result['uploads']:>8} {result['errors']:>7} "
+                                  f"{result['uploads_per_sec']:>8.1f} {result['p50_ms']:>8.1f} "
+                                  f"{result['p95_ms']:>8.1f} {result['queries_per_upload']:>8.1f}")
+                finally:
+                    content.prune_history = set_based
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_trends.py
+# ============================================
+"""
+GET /api/trends/ latency for hourly/daily/weekly rollups over many uploads.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_trends --points 1000 10000 100000
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from benchmarks.django_env import test_database
+
+
+def seed(user, points, span_days, rng):
+    from django.utils import timezone
+    from equipment.models import TrendPoint
+    now = timezone.now()
+    offsets = np.sort(rng.uniform(0, span_days * 86400, points))
+    TrendPoint.objects.bulk_create([
+        TrendPoint(user=user, recorded_at=now - timedelta(seconds=float(offset)),
+                   recorded_ts=int(now.timestamp() - offset), total_count=int(count),
+                   avg_flowrate=float(flow), avg_pressure=float(pressure), avg_temperature=float(temp))
+        for offset, count, flow, pressure, temp in zip(
+            offsets, rng.integers(100, 100000, points), rng.normal(170, 5, points),
+            rng.normal(52, 2, points), rng.normal(75, 3, points))
+    ], batch_size=2000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--points', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='trend points (uploads) for the measured user')
+    parser.add_argument('--span-days', type=int, default=365)
+    parser.add_argument('--window', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with test_database():
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIClient
+        from equipment.models import TrendPoint
+        rng = np.random.default_rng(0)
+        # Another user's points share the table, as they would in production
+        seed(User.objects.create_user('other'), max(args.points), args.span_days, rng)
+
+        if not args.json:
+            print(f"{'points':>8} {'bucket':>7} {'buckets':>8} {'median ms':>10} {'p95 ms':>8}")
+        for points in args.points:
+            user = User.objects.create_user(f'bench-{points}')
+            seed(user, points, args.span_days, rng)
+            client = APIClient()
+            client.force_authenticate(user)
+            for bucket in ('hour', 'day', 'week'):
+                url = f'/api/trends/?bucket={bucket}&window={args.window}'
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append(time.perf_counter() - start)
+                buckets = len(response.json()['points'])
+                timings.sort()
+                result = {
+                    'points': points,
+                    'bucket': bucket,
+                    'buckets': buckets,
+                    'median_ms': statistics.median(timings) * 1000,
+                    'p95_ms': timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000,
+                }
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print(f"{points:>8} {bucket:>7} {buckets:>8} {result['median_ms']:>10.1f} "
+                          f"{result['p95_ms']:>8.1f}")
+            TrendPoint.objects.filter(user=user).delete()
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_charts.py
+# ============================================
+"""
+Chart payload size and end-to-end render time: full rows vs chart_data vs server PNG.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_charts --rows 1000000
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+from django.test.utils import override_settings
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import cached_equipment_csv
+
+COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
+
+
+# What a client draws: a histogram and a line per numeric column
+def draw(histograms, series):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    axes = figure.subplots(2, len(COLUMNS))
+    for i, col in enumerate(COLUMNS):
+        counts, edges = histograms[col]
+        axes[0][i].stairs(counts, edges, fill=True)
+        x, y = series[col]
+        axes[1][i].plot(x, y, linewidth=0.8)
+    figure.savefig(BytesIO(), format='png')
+
+
+def full_rows(client, dataset_id, bins):
+    response = client.get(f'/api/datasets/{dataset_id}/')
+    # raw_data is itself JSON text, as the frontends receive it
+    rows = json.loads(json.loads(response.content)['raw_data'])
+    histograms = {}
+    series = {}
+    for col in COLUMNS:
+        values = np.array([row[col] for row in rows], dtype=np.float64)
+        counts, edges = np.histogram(values[~np.isnan(values)], bins=bins)
+        histograms[col] = (counts, edges)
+        series[col] = (np.arange(len(values)), values)
+    draw(histograms, series)
+    return len(response.content)
+
+
+def chart_data(client, dataset_id, bins, points):
+    response = client.get(f'/api/datasets/{dataset_id}/chart_data/?bins={bins}&points={points}')
+    data = json.loads(response.content)
+    histograms = {col: (h['counts'], h['edges']) for col, h in data['histograms'].items()}
+    series = {col: (s['x'], s['y']) for col, s in data['series'].items()}
+    draw(histograms, series)
+    return len(response.content)
+
+
+def chart_png(client, dataset_id, bins, points):
+    for kind in ('histograms', 'series'):
+        response = client.get(f'/api/datasets/{dataset_id}/chart/?kind={kind}&bins={bins}&points={points}')
+    return len(response.content)
+
+
+def measure(fn, repeat, before=None):
+    timings = []
+    size = None
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        size = fn()
+        timings.append(time.perf_counter() - start)
+    return size, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--bins', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--skip-full-above', type=int, default=None,
+                        help='skip the full-rows path above this many rows')
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-charts'}}
+    with test_database(), override_settings(CACHES=cache, EQUIPMENT_REPORT_PRERENDER=False):
+        from django.contrib.auth.models import User
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from rest_framework.test import APIClient
+        from equipment.charts import chart_cache
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('bench'))
+
+        if not args.json:
+            print(f"{'rows':>9} {'path':>16} {'payload KB':>11} {'median ms':>10} {'max ms':>8}")
+        for rows in args.rows:
+            with open(cached_equipment_csv(args.cache_dir, rows), 'rb') as f:
+                upload = SimpleUploadedFile('bench.csv', f.read())
+            dataset_id = client.post('/api/datasets/upload/?stream=1', {'file': upload},
+                                     format='multipart').json()['id']
+            clear = chart_cache().clear
+            paths = [
+                ('chart_data cold', lambda: chart_data(client, dataset_id, args.bins, args.points), clear),
+                ('chart_data warm', lambda: chart_data(client, dataset_id, args.bins, args.points), None),
+                ('png cold', lambda: chart_png(client, dataset_id, args.bins, args.points), clear),
+                ('png warm', lambda: chart_png(client, dataset_id, args.bins, args.points), None),
+            ]
+            if args.skip_full_above is None or rows <= args.skip_full_above:
+                # Every row to the client, as the charts were fed before
+                paths.insert(0, ('full rows', lambda: full_rows(client, dataset_id, args.bins), None))
+            for path, fn, before in paths:
+                size, timings = measure(fn, args.repeat, before)
+                result = {
+                    'rows': rows,
+                    'path': path,
+                    'payload_bytes': size,
+                    'median_ms': statistics.median(timings) * 1000,
+                    'max_ms': max(timings) * 1000,
+                }
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print(f"{rows:>9} {path:>16} {size / 1024:>11.1f} {result['median_ms']:>10.1f} "
+                          f"{result['max_ms']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/loadtest.py
+# ============================================
+"""
+Load test: concurrent clients against a live local server, per endpoint.
+
+Run from the backend directory:
+
+    python -m benchmarks.loadtest --clients 1 8 32 --rows 1000 100000 --types 5 50 --output results.json
+    python -m benchmarks.loadtest --clients 1 8 32 --compare results.json
+
+The server runs in a child process, on a throwaway test database (an SQLite
+file by default; pass --settings a module whose DATABASES points at a local
+Postgres). Every response carries the server's query count and peak RSS in
+X-Bench-* headers (for --upload-mode async these cover the upload and job
+polls, not the worker thread's ingest). --compare prints p95 and throughput changes against an
+earlier --output file, e.g. one taken on another commit.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from benchmarks.synthetic import cached_equipment_csv
+
+PASSWORD = 'bench-password'
+TIMEOUT = 300
+MAX_POLLS = 600
+UPLOAD_MODES = {'full': '', 'stream': '?stream=1', 'async': '?async=1'}
+
+
+# ---- server (child process) ----
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024 * 1024)
+
+
+# Wrap the WSGI app so each response reports the queries it ran and the
+# server's RSS high-water mark
+def instrumented(app):
+    from django.db import connection
+
+    def wrapped(environ, start_response):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        def start(status, headers, exc_info=None):
+            headers.append(('X-Bench-Queries', str(len(queries))))
+            headers.append(('X-Bench-Peak-RSS', f'{peak_rss_mb():.1f}'))
+            return start_response(status, headers, exc_info)
+
+        with connection.execute_wrapper(count):
+            return app(environ, start)
+    return wrapped
+
+
+def serve(args):
+    os.environ['DJANGO_SETTINGS_MODULE'] = args.settings
+    from django.conf import settings
+    from django.test.utils import override_settings
+    from benchmarks.django_env import test_database
+    sqlite = settings.DATABASES['default']['ENGINE'].endswith('sqlite3')
+    with tempfile.TemporaryDirectory() as tmp:
+        # A file rather than SQLite's in-memory test database, so request
+        # threads can write concurrently
+        test_name = os.path.join(tmp, 'loadtest.sqlite3') if sqlite else None
+        with test_database(args.settings, test_name), \
+                override_settings(ALLOWED_HOSTS=['*'],
+                                  EQUIPMENT_REPORT_DIR=os.path.join(tmp, 'reports'),
+                                  EQUIPMENT_INGEST_SPOOL_DIR=os.path.join(tmp, 'spool')):
+            from django.contrib.auth.hashers import make_password
+            from django.contrib.auth.models import User
+            from django.core.handlers.wsgi import WSGIHandler
+            from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+            from django.db import connection
+
+            class QuietHandler(WSGIRequestHandler):
+                def log_message(self, *args):
+                    pass
+
+            # One hash for every user; hashing per user is slow and not what
+            # is being measured
+            password = make_password(PASSWORD)
+            User.objects.bulk_create([User(username=f'bench-{i}', password=password)
+                                      for i in range(args.serve)])
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+            server.set_app(instrumented(WSGIHandler()))
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            print(json.dumps({'url': f'http://127.0.0.1:{server.server_port}', 'vendor': connection.vendor}),
+                  flush=True)
+            # Serve until the parent closes stdin
+            sys.stdin.read()
+            server.shutdown()
+            server.server_close()
+
+
+# ---- clients ----
+
+def call(method, url, token=None, body=None, content_type=None):
+    request = urllib.request.Request(url, data=body, method=method)
+    if token:
+        request.add_header('Authorization', f'Token {token}')
+    if content_type:
+        request.add_header('Content-Type', content_type)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+            status, headers, payload = response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        status, headers, payload = e.code, e.headers, e.read()
+    except (urllib.error.URLError, OSError):
+        return {'status': 0, 'seconds': time.perf_counter() - start, 'queries': 0, 'rss': 0.0, 'body': b''}
+    return {
+        'status': status,
+        'seconds': time.perf_counter() - start,
+        'queries': int(headers.get('X-Bench-Queries', 0)),
+        'rss': float(headers.get('X-Bench-Peak-RSS', 0)),
+        'retry_after': headers.get('Retry-After'),
+        'body': payload,
+    }
+
+
+# Fold follow-up requests (polling) into the first one's sample
+def combine(first, *rest):
+    for sample in rest:
+        first['seconds'] += sample['seconds']
+        first['queries'] += sample['queries']
+        first['rss'] = max(first['rss'], sample['rss'])
+        first['status'] = sample['status']
+        first['body'] = sample['body']
+    first['retries'] = len(rest)
+    return first
+
+
+def multipart(filename, data):
+    boundary = uuid.uuid4().hex
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n').encode()
+    return head + data + f'\r\n--{boundary}--\r\n'.encode(), f'multipart/form-data; boundary={boundary}'
+
+
+class Client:
+    def __init__(self, url, index, options):
+        self.url = url
+        self.index = index
+        self.options = options
+        self.token = None
+        self.dataset_ids = []
+
+    def login(self, n):
+        body = json.dumps({'username': f'bench-{self.index}', 'password': PASSWORD}).encode()
+        sample = call('POST', f'{self.url}/api/login/', body=body, content_type='application/json')
+        if sample['status'] == 200:
+            self.token = json.loads(sample['body'])['token']
+        return sample
+
+    def upload(self, n, data):
+        if not self.options.dedup:
+            # A unique last row, so every upload is parsed rather than
+            # served from the content-hash cache
+            data += f'loadtest-{self.index}-{n}-{uuid.uuid4().hex},Pump,1.0,1.0,1.0\n'.encode()
+        body, content_type = multipart(f'loadtest-{self.index}-{n}.csv', data)
+        mode = self.options.upload_mode
+        url = f'{self.url}/api/datasets/upload/{UPLOAD_MODES[mode]}'
+        sample = call('POST', url, self.token, body, content_type)
+        if mode != 'async' or sample['status'] != 202:
+            return combine(sample)
+        job_url = f"{self.url}/api/jobs/{json.loads(sample['body'])['id']}/?wait=5"
+        samples = [sample, call('GET', job_url, self.token)]
+        while (samples[-1]['status'] == 200 and len(samples) <= MAX_POLLS
+               and json.loads(samples[-1]['body'])['status'] not in ('done', 'failed')):
+            samples.append(call('GET', job_url, self.token))
+        sample = combine(*samples)
+        if sample['status'] == 200 and json.loads(sample['body'])['status'] == 'failed':
+            sample['status'] = 500
+        return sample
+
+    def list(self, n):
+        sample = call('GET', f'{self.url}/api/datasets/', self.token)
+        if sample['status'] == 200:
+            self.dataset_ids = [item['id'] for item in json.loads(sample['body'])]
+        return sample
+
+    def retrieve(self, n):
+        if not self.dataset_ids:
+            return {'status': 0, 'seconds': 0.0, 'queries': 0, 'rss': 0.0, 'body': b''}
+        dataset_id = self.dataset_ids[n % len(self.dataset_ids)]
+        return call('GET', f'{self.url}/api/datasets/{dataset_id}/', self.token)
+
+    # Time until the PDF arrives, polling through 202 "still rendering"
+    def download_pdf(self, n):
+        if not self.dataset_ids:
+            return {'status': 0, 'seconds': 0.0, 'queries': 0, 'rss': 0.0, 'body': b''}
+        url = f'{self.url}/api/datasets/{self.dataset_ids[n % len(self.dataset_ids)]}/download_pdf/?async=1'
+        samples = [call('GET', url, self.token)]
+        while samples[-1]['status'] == 202 and len(samples) <= MAX_POLLS:
+            time.sleep(min(float(samples[-1].get('retry_after') or 1), self.options.poll))
+            samples.append(call('GET', url, self.token))
+        return combine(*samples)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    return values[max(math.ceil(q * len(values)) - 1, 0)] * 1000
+
+
+# Every client performs `requests` calls of one endpoint at the same time
+def run_phase(clients, requests, action):
+    samples = []
+    lock = threading.Lock()
+
+    def worker(client):
+        for n in range(requests):
+            sample = action(client, n)
+            sample.pop('body', None)
+            with lock:
+                samples.append(sample)
+
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    ok = sorted(s['seconds'] for s in samples if 200 <= s['status'] < 300)
+    queries = [s['queries'] for s in samples if 200 <= s['status'] < 300]
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(ok),
+        'throughput_rps': len(ok) / wall if wall else 0.0,
+        'p50_ms': percentile(ok, 0.50),
+        'p95_ms': percentile(ok, 0.95),
+        'p99_ms': percentile(ok, 0.99),
+        'queries_mean': sum(queries) / len(queries) if queries else None,
+        'queries_max': max(queries) if queries else None,
+        'retries': sum(s.get('retries', 0) for s in samples),
+        'peak_rss_mb': max((s['rss'] for s in samples), default=0.0),
+    }
+
+
+def result_key(result):
+    return result['endpoint'], result['clients'], result.get('rows'), result.get('types')
+
+
+def print_result(result):
+    def ms(value):
+        return f'{value:>8.1f}' if value is not None else f"{'-':>8}"
+    queries = result['queries_mean']
+    print(f"{result['endpoint']:>13} {result['clients']:>7} {result.get('rows') or '':>8} "
+          f"{result.get('types') or '':>5} {result['requests']:>8} {result['errors']:>6} "
+          f"{result['throughput_rps']:>8.1f} {ms(result['p50_ms'])} {ms(result['p95_ms'])} {ms(result['p99_ms'])} "
+          f"{queries if queries is None else round(queries, 1)!s:>8} {result['peak_rss_mb']:>8.1f}")
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {result_key(result): result for result in json.load(f)['results']}
+    print(f"\n{'endpoint':>13} {'clients':>7} {'rows':>8} {'types':>5} {'p95 ms':>17} {'change':>8} "
+          f"{'req/s':>15} {'change':>8}")
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old is None or not old['p95_ms'] or result['p95_ms'] is None:
+            continue
+        p95 = (result['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+        rps = ((result['throughput_rps'] - old['throughput_rps']) / old['throughput_rps'] * 100
+               if old['throughput_rps'] else 0.0)
+        print(f"{result['endpoint']:>13} {result['clients']:>7} {result.get('rows') or '':>8} "
+              f"{result.get('types') or '':>5} {old['p95_ms']:>8.1f}->{result['p95_ms']:<8.1f} {p95:>+7.1f}% "
+              f"{old['throughput_rps']:>7.1f}->{result['throughput_rps']:<7.1f} {rps:>+7.1f}%")
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32], help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=20, help='requests per client per endpoint')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000], help='rows per uploaded CSV')
+    parser.add_argument('--types', type=int, nargs='+', default=[5], help='Type cardinality of uploaded CSVs')
+    parser.add_argument('--upload-mode', choices=list(UPLOAD_MODES), default='full')
+    parser.add_argument('--dedup', action='store_true', help='upload identical bytes (content-hash hits)')
+    parser.add_argument('--poll', type=float, default=0.1, help='seconds between download_pdf polls')
+    parser.add_argument('--settings', default='equipment_api.settings', help='Django settings module')
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--output', help='write all results, with run metadata, to this JSON file')
+    parser.add_argument('--compare', help='a previous --output file to compare against')
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    csvs = {(rows, types): open(cached_equipment_csv(args.cache_dir, rows, types), 'rb').read()
+            for rows in args.rows for types in args.types}
+    server = subprocess.Popen([sys.executable, '-m', 'benchmarks.loadtest', '--serve', str(max(args.clients)),
+                               '--settings', args.settings],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    results = []
+    try:
+        hello = json.loads(server.stdout.readline())
+        if not args.json:
+            print(f"{'endpoint':>13} {'clients':>7} {'rows':>8} {'types':>5} {'requests':>8} {'errors':>6} "
+                  f"{'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'RSS MB':>8}")
+
+        def record(endpoint, clients, stats, **extra):
+            result = dict(endpoint=endpoint, clients=clients, **extra, **stats)
+            results.append(result)
+            if args.json:
+                print(json.dumps(result), flush=True)
+            else:
+                print_result(result)
+
+        for count in args.clients:
+            clients = [Client(hello['url'], i, args) for i in range(count)]
+            record('login', count, run_phase(clients, args.requests, Client.login))
+            for (rows, types), data in csvs.items():
+                stats = run_phase(clients, args.requests, lambda client, n: client.upload(n, data))
+                record('upload', count, stats, rows=rows, types=types)
+            for endpoint in ('list', 'retrieve', 'download_pdf'):
+                record(endpoint, count, run_phase(clients, args.requests, getattr(Client, endpoint)))
+    finally:
+        server.stdin.close()
+        server.wait()
+
+    if args.output:
+        meta = {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': hello['vendor'],
+            'args': {name: value for name, value in vars(args).items() if name not in ('serve', 'compare', 'output')},
+        }
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_auth.py
+# ============================================
+"""
+Queries and latency per authenticated request: DRF's TokenAuthentication
+(a Token -> User join every time) vs CachedTokenAuthentication, with the
+token in the Authorization header and in ?token= (EQUIPMENT_TOKEN_QUERY_PARAM,
+turned on for the run).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_auth --requests 500
+"""
+import argparse
+import json
+import time
+
+from django.test.utils import override_settings
+
+from benchmarks.django_env import test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with test_database(), override_settings(EQUIPMENT_TOKEN_QUERY_PARAM='token'):
+        from django.contrib.auth.models import User
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework.authentication import TokenAuthentication
+        from rest_framework.authtoken.models import Token
+        from rest_framework.test import APIClient
+        from equipment import authentication
+        from equipment.views import EquipmentDatasetViewSet
+        token = Token.objects.create(user=User.objects.create_user('bench')).key
+        client = APIClient()
+
+        def header():
+            return client.get('/api/datasets/', HTTP_AUTHORIZATION=f'Token {token}')
+
+        def query_param():
+            return client.get('/api/datasets/', {'token': token})
+
+        runs = [('drf', 'header', TokenAuthentication, header),
+                ('cached', 'header', authentication.CachedTokenAuthentication, header),
+                ('cached', '?token=', authentication.CachedTokenAuthentication, query_param)]
+        if not args.json:
+            print(f"{'auth':>7} {'token in':>9} {'requests':>9} {'queries/req':>12} {'auth q/req':>11} {'ms/req':>8}")
+        for mode, where, backend, request in runs:
+            EquipmentDatasetViewSet.authentication_classes = [backend]
+            authentication._local.clear()
+            # One warm-up request fills the cache, as it would after login
+            assert request().status_code == 200
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(args.requests):
+                    assert request().status_code == 200
+            elapsed = time.perf_counter() - start
+            auth_queries = sum(1 for query in queries if 'authtoken_token' in query['sql'])
+            result = {
+                'auth': mode,
+                'token_in': where,
+                'requests': args.requests,
+                'queries_per_request': len(queries) / args.requests,
+                'auth_queries_per_request': auth_queries / args.requests,
+                'ms_per_request': elapsed * 1000 / args.requests,
+            }
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{mode:>7} {where:>9} {args.requests:>9} {result['queries_per_request']:>12.2f} "
+                      f"{result['auth_queries_per_request']:>11.2f} {result['ms_per_request']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# backend/benchmarks/bench_upload_response.py
+# ============================================
+"""
+CPU time per MB uploaded for the upload response: parse-and-re-encode vs spliced rows vs summary only.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_upload_response --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from django.test.utils import override_settings
+
+from benchmarks.django_env import test_database
+from benchmarks.synthetic import cached_equipment_csv
+
+
+# What upload_response did before: parse the encoded rows back into dicts
+# and let the renderer encode them again
+def legacy_upload_response(self, dataset, rows=None):
+    from rest_framework.response import Response
+    from equipment.serializers import upload_summary
+    body = {'id': dataset.id}
+    if rows is not None:
+        body['data'] = json.loads(''.join(rows))
+    body['summary'] = upload_summary(dataset)
+    return Response(body)
+
+
+def consume(response):
+    if response.streaming:
+        return sum(len(part) for part in response.streaming_content)
+    response.render()
+    return len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir())
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    args = parser.parse_args()
+
+    with test_database(), override_settings(EQUIPMENT_REPORT_PRERENDER=False, EQUIPMENT_TRENDS=False):
+        from django.contrib.auth.models import User
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from equipment.renderers import ORJSONRenderer
+        from equipment.views import EquipmentDatasetViewSet
+        user = User.objects.create_user('bench')
+        factory = APIRequestFactory()
+        spliced = EquipmentDatasetViewSet.upload_response
+        modes = [
+            ('legacy json', legacy_upload_response, JSONRenderer, ''),
+            ('legacy orjson', legacy_upload_response, ORJSONRenderer, ''),
+            ('spliced', spliced, ORJSONRenderer, ''),
+            ('summary only', spliced, ORJSONRenderer, '?summary=1'),
+        ]
+
+        if not args.json:
+            print(f"{'rows':>9} {'MB':>7} {'mode':>14} {'CPU s/MB':>9} {'wall s':>8} {'response MB':>12}")
+        for size in args.sizes:
+            path = cached_equipment_csv(args.cache_dir, size)
+            with open(path, 'rb') as f:
+                data = f.read()
+            megabytes = os.path.getsize(path) / (1024 * 1024)
+            for mode, upload_response, renderer, query in modes:
+                EquipmentDatasetViewSet.upload_response = upload_response
+                view = EquipmentDatasetViewSet.as_view({'post': 'upload'}, renderer_classes=[renderer])
+                cpu, wall = [], []
+                try:
+                    for i in range(args.repeat):
+                        # A unique last row, so every run parses rather than
+                        # hitting the content-hash cache
+                        upload = SimpleUploadedFile('bench.csv', data + f'bench-{mode}-{i},Pump,1,1,1\n'.encode())
+                        request = factory.post(f'/api/datasets/upload/{query}', {'file': upload}, format='multipart')
+                        force_authenticate(request, user)
+                        cpu_start, wall_start = time.process_time(), time.perf_counter()
+                        length = consume(view(request))
+                        cpu.append(time.process_time() - cpu_start)
+                        wall.append(time.perf_counter() - wall_start)
+                finally:
+                    EquipmentDatasetViewSet.upload_response = spliced
+                result = {
+                    'rows': size,
+                    'mb': megabytes,
+                    'mode': mode,
+                    'cpu_s_per_mb': statistics.median(cpu) / megabytes,
+                    'wall_s': statistics.median(wall),
+                    'response_mb': length / (1024 * 1024),
+                }
+                if args.json:
+                    print(json.dumps(result))
+                else:
+                    print(f"{size:>9} {megabytes:>7.1f} {mode:>14} {result['cpu_s_per_mb']:>9.3f} "
+                          f"{result['wall_s']:>8.2f} {result['response_mb']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
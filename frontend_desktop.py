@@ -1,23 +1,875 @@
 # ============================================
-# frontend-desktop/main.py
+# frontend-desktop/table_model.py
 # ============================================
-import sys
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+
+
+# Table model over column arrays; cells are only formatted when painted.
+# Rows come either from memory (set_columns / set_records) or are fetched
+# from the server one page at a time (set_remote). Remote pages arrive
+# asynchronously through page_loaded() and live in a small LRU, so
+# scrolling through a huge dataset keeps memory bounded.
+class DatasetTableModel(QAbstractTableModel):
+    def __init__(self, parent=None, page_size=500, max_pages=40):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.columns = []
+        self.arrays = {}
+        self.row_total = 0
+        self.source = None
+        self.request_page = None
+        self.pages = OrderedDict()
+        self.pending = set()
+
+    def reset_source(self, columns, arrays, total, source=None, request_page=None):
+        self.beginResetModel()
+        self.columns = list(columns)
+        self.arrays = arrays
+        self.row_total = total
+        self.source = source
+        self.request_page = request_page
+        self.pages.clear()
+        self.pending.clear()
+        self.endResetModel()
+
+    def clear(self):
+        self.reset_source([], {}, 0)
+
+    def set_columns(self, columns, arrays):
+        columns = list(columns)
+        self.reset_source(columns, arrays, len(arrays[columns[0]]) if columns else 0)
+
+    def set_records(self, records):
+        columns = list(records[0].keys()) if records else []
+        self.set_columns(columns, {col: [row.get(col) for row in records] for col in columns})
+
+    # request_page(number, offset, limit) must eventually call
+    # page_loaded(source, number, columns, arrays); it may do so synchronously.
+    def set_remote(self, total, request_page, source=None):
+        self.reset_source([], {}, total, source, request_page)
+        if total:
+            # The first page also tells us the column names
+            self.page(0)
+
+    def page_loaded(self, source, number, columns, arrays):
+        if source != self.source or self.request_page is None:
+            return  # a late page for a dataset that is no longer shown
+        self.pending.discard(number)
+        self.pages[number] = arrays
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+        if not self.columns:
+            self.beginResetModel()
+            self.columns = list(columns)
+            self.endResetModel()
+            return
+        first = number * self.page_size
+        last = min(first + self.page_size, self.row_total) - 1
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(self.columns) - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_total
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def value(self, row, column):
+        name = self.columns[column]
+        if self.request_page is None:
+            return self.arrays[name][row]
+        page = self.page(row // self.page_size)
+        if page is None:
+            return None  # still loading; page_loaded() repaints it
+        values = page.get(name)
+        offset = row % self.page_size
+        return values[offset] if values is not None and offset < len(values) else None
+
+    def page(self, number):
+        if number in self.pages:
+            self.pages.move_to_end(number)
+            return self.pages[number]
+        if number not in self.pending:
+            self.pending.add(number)
+            self.request_page(number, number * self.page_size, self.page_size)
+        return self.pages.get(number)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        if role == Qt.DisplayRole:
+            value = self.value(index.row(), index.column())
+            return '' if value is None else str(value)
+        if role == Qt.TextAlignmentRole:
+            value = self.value(index.row(), index.column())
+            if isinstance(value, (int, float)):
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+        return QVariant()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return QVariant()
+        if orientation == Qt.Horizontal:
+            return self.columns[section] if section < len(self.columns) else QVariant()
+        return str(section + 1)
+
+
+# ============================================
+# frontend-desktop/api_client.py
+# ============================================
+import hashlib
+import mimetypes
+import os
+import time
+import uuid
 import requests
+from requests.adapters import HTTPAdapter
+
+
+# Byte range sent per PUT of a resumable upload
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+class Cancelled(Exception):
+    pass
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+# The server could not be reached at all (as opposed to answering an error)
+class Offline(ApiError):
+    pass
+
+
+# multipart/form-data body read lazily from disk. requests streams any
+# object with read() and __len__, so files are never loaded in full and
+# every block read reports progress and checks for cancellation. paths is
+# one path or a list of them, all sent under the same form field.
+class MultipartFile:
+    def __init__(self, paths, field='file', progress=None, is_cancelled=None):
+        if isinstance(paths, str):
+            paths = [paths]
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+        # Alternating bytes and open files, read back to back
+        self.segments = []
+        for i, path in enumerate(paths):
+            name = os.path.basename(path).replace('"', '')
+            media_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            self.segments.append((f'\r\n' if i else '') + (
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{field}"; filename="{name}"\r\n'
+                f'Content-Type: {media_type}\r\n\r\n'))
+            self.segments.append(open(path, 'rb'))
+        self.segments.append(f'\r\n--{boundary}--\r\n')
+        self.segments = [s.encode('utf-8') if isinstance(s, str) else s for s in self.segments]
+        self.sizes = [len(s) if isinstance(s, bytes) else os.fstat(s.fileno()).st_size for s in self.segments]
+        self.size = sum(size for s, size in zip(self.segments, self.sizes) if not isinstance(s, bytes))
+        self.current = 0
+        self.offset = 0
+        self.sent = 0
+        self.progress = progress
+        self.is_cancelled = is_cancelled
+
+    def __len__(self):
+        return sum(self.sizes)
+
+    def read(self, size=-1):
+        if self.is_cancelled and self.is_cancelled():
+            raise Cancelled()
+        if size is None or size < 0:
+            size = len(self)
+        parts = []
+        while size > 0 and self.current < len(self.segments):
+            segment = self.segments[self.current]
+            remaining = self.sizes[self.current] - self.offset
+            if isinstance(segment, bytes):
+                piece = segment[self.offset:self.offset + size]
+            else:
+                piece = segment.read(min(size, remaining))
+                if not piece and remaining:
+                    raise IOError(f'{segment.name} changed during upload')
+                self.sent += len(piece)
+            parts.append(piece)
+            self.offset += len(piece)
+            size -= len(piece)
+            if self.offset >= self.sizes[self.current]:
+                self.current += 1
+                self.offset = 0
+        if self.progress:
+            self.progress(self.sent, self.size)
+        return b''.join(parts)
+
+    def close(self):
+        for segment in self.segments:
+            if not isinstance(segment, bytes):
+                segment.close()
+
+
+# Thin wrapper over one pooled, keep-alive requests.Session. Every method is
+# blocking and meant to run on a worker thread (see workers.py).
+class ApiClient:
+    def __init__(self, base_url, pool_size=8, timeout=(5, 300)):
+        self.base_url = base_url
+        self.timeout = timeout
+        # Resumable upload sessions by (path, size, mtime), see upload_resumable
+        self.sessions = {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def set_token(self, token):
+        if token:
+            self.session.headers['Authorization'] = f'Token {token}'
+        else:
+            self.session.headers.pop('Authorization', None)
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            return self.session.request(method, f'{self.base_url}{path}', **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise Offline(f'Server unreachable: {e.__class__.__name__}') from e
+
+    def json_or_raise(self, response, default_error):
+        if response.status_code in (200, 201, 202):
+            return response.json()
+        try:
+            message = response.json().get('error', default_error)
+        except ValueError:
+            message = default_error
+        raise ApiError(message, response.status_code)
+
+    def login(self, username, password):
+        response = self.request('POST', '/login/', json={'username': username, 'password': password})
+        if response.status_code != 200:
+            raise ApiError('Invalid credentials', response.status_code)
+        token = response.json()['token']
+        self.set_token(token)
+        return token
+
+    # Revoke token on the server. Best effort: signing out locally never
+    # waits on it, and an unreachable server has nothing to revoke yet.
+    def logout(self, token):
+        try:
+            self.request('POST', '/logout/', headers={'Authorization': f'Token {token}'}, timeout=5)
+        except Offline:
+            pass
+
+    # Conditional GET: returns (data, etag), or (None, etag) when the
+    # server answers 304 Not Modified for the etag we already hold
+    def get_json(self, path, default_error, etag=None, **kwargs):
+        headers = {'If-None-Match': etag} if etag else {}
+        response = self.request('GET', path, headers=headers, **kwargs)
+        if response.status_code == 304:
+            return None, etag
+        return self.json_or_raise(response, default_error), response.headers.get('ETag')
+
+    def list_datasets(self, etag=None):
+        return self.get_json('/datasets/', 'Could not fetch history', etag)
+
+    def dataset_summary(self, dataset_id, etag=None):
+        return self.get_json(f'/datasets/{dataset_id}/', 'Failed to load dataset', etag,
+                             params={'summary': 1})
+
+    def compare(self, dataset_ids):
+        params = {'ids': ','.join(str(i) for i in dataset_ids)}
+        return self.json_or_raise(self.request('GET', '/datasets/compare/', params=params),
+                                  'Comparison failed')
+
+    def rows(self, dataset_id, offset, limit):
+        params = {'offset': offset, 'limit': limit, 'layout': 'columns'}
+        page = self.json_or_raise(self.request('GET', f'/datasets/{dataset_id}/rows/', params=params),
+                                  'Failed to load rows')
+        return page['columns'], page['results']
+
+    # Page through every row of a dataset into builder (a ColumnBuilder)
+    def all_rows(self, dataset_id, builder, total, page_size=10000, progress=None, is_cancelled=None):
+        offset = 0
+        while offset < total:
+            if is_cancelled and is_cancelled():
+                raise Cancelled()
+            if not builder.append(*self.rows(dataset_id, offset, page_size)):
+                break
+            offset += page_size
+            if progress:
+                progress(min(offset, total), total)
+        return builder
+
+    def upload(self, path, progress=None, is_cancelled=None, params=None):
+        body = MultipartFile(path, progress=progress, is_cancelled=is_cancelled)
+        try:
+            response = self.request('POST', '/datasets/upload/', data=body, params=params,
+                                    headers={'Content-Type': body.content_type})
+        finally:
+            body.close()
+        return self.json_or_raise(response, 'Upload failed')
+
+    # Several CSVs and/or .zip/.tar.gz archives of them in one request.
+    # Returns the combined result: uploaded and failed counts, plus one
+    # entry per CSV with its id and summary or its error.
+    def upload_batch(self, paths, progress=None, is_cancelled=None):
+        body = MultipartFile(paths, field='files', progress=progress, is_cancelled=is_cancelled)
+        try:
+            response = self.request('POST', '/datasets/upload_batch/', data=body,
+                                    headers={'Content-Type': body.content_type})
+        finally:
+            body.close()
+        if response.status_code == 400:
+            try:
+                results = response.json().get('results')
+            except ValueError:
+                results = None
+            if results:
+                # Every file failed: report them all rather than a bare 400
+                raise ApiError('; '.join(f"{r['filename']}: {r['error']}" for r in results), 400)
+        return self.json_or_raise(response, 'Upload failed')
+
+    # Upload with ?async=1, then long-poll the ingest job until the server has
+    # parsed the file. Progress covers both halves: sending, then processing.
+    # Returns the same {'id', 'summary'} as a streamed upload (no rows).
+    def upload_async(self, path, progress=None, is_cancelled=None, wait=2):
+        size = os.path.getsize(path)
+        sent = (lambda done, total: progress(done, 2 * total)) if progress else None
+        job = self.upload(path, sent, is_cancelled, params={'async': 1})
+        return self.follow_job(job, size, progress, is_cancelled, wait)
+
+    # Long-poll an ingest job to the end; progress covers the second half
+    def follow_job(self, job, size, progress=None, is_cancelled=None, wait=2):
+        while job['status'] not in ('done', 'failed'):
+            if is_cancelled and is_cancelled():
+                raise Cancelled()
+            params = {'wait': wait, 'rows': job['rows_done']}
+            job = self.json_or_raise(self.request('GET', f"/jobs/{job['id']}/", params=params),
+                                     'Lost track of the upload')
+            if progress and job['bytes_total']:
+                progress(size + job['bytes_done'] * size // job['bytes_total'], 2 * size)
+        if job['status'] == 'failed':
+            raise ApiError(job['error'] or 'Upload failed')
+        return {'id': job['dataset'], 'summary': job['summary']}
+
+    # Resumable upload: open a session, PUT the file in chunk_size byte
+    # ranges, then finalize with its sha256 and follow the job. A dropped
+    # connection resumes from the server's received offset (up to retries
+    # times in a row, backing off), and sessions are remembered per file,
+    # so uploading the same unchanged file again continues where it stopped.
+    def upload_resumable(self, path, progress=None, is_cancelled=None, chunk_size=UPLOAD_CHUNK_BYTES,
+                         retries=5, wait=2):
+        stat = os.stat(path)
+        size = stat.st_size
+        key = (os.path.abspath(path), size, stat.st_mtime_ns)
+        session = self.resume_session(key)
+        if session is None:
+            session = self.json_or_raise(
+                self.request('POST', '/uploads/', json={'filename': os.path.basename(path), 'size': size}),
+                'Upload failed')
+            self.sessions[key] = session['id']
+        url = f"/uploads/{session['id']}/"
+        received = session['received']
+        
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            # Hash what the server already has, then each block as it is accepted
+            hashed = 0
+            while hashed < received:
+                block = f.read(min(UPLOAD_CHUNK_BYTES, received - hashed))
+                sha256.update(block)
+                hashed += len(block)
+            failures = 0
+            while received < size:
+                if is_cancelled and is_cancelled():
+                    self.sessions.pop(key, None)
+                    self.request('DELETE', url)
+                    raise Cancelled()
+                f.seek(received)
+                block = f.read(chunk_size)
+                headers = {'Content-Range': f'bytes {received}-{received + len(block) - 1}/{size}',
+                           'Content-Type': 'application/octet-stream'}
+                try:
+                    response = self.request('PUT', url, data=block, headers=headers)
+                    if response.status_code == 409 and 'received' in response.json():
+                        accepted = response.json()['received']
+                    else:
+                        accepted = self.json_or_raise(response, 'Upload failed')['received']
+                except Offline:
+                    failures += 1
+                    if failures > retries:
+                        raise
+                    time.sleep(min(2 ** failures, 30))
+                    try:
+                        accepted = self.json_or_raise(self.request('GET', url), 'Upload failed')['received']
+                    except Offline:
+                        continue
+                else:
+                    failures = 0
+                if received == hashed and accepted > hashed:
+                    sha256.update(block[:accepted - hashed])
+                    hashed = accepted
+                received = accepted
+                if progress:
+                    progress(received, 2 * size)
+        
+        # Offsets jumped around (another client resumed the same session?):
+        # let the server's own hash stand unchecked rather than send a wrong one
+        digest = sha256.hexdigest() if hashed == size else ''
+        job = self.json_or_raise(self.request('POST', f'{url}finalize/', json={'sha256': digest}),
+                                 'Upload failed')
+        self.sessions.pop(key, None)
+        return self.follow_job(job, size, progress, is_cancelled, wait)
+
+    # The open session for key, if the server still has it
+    def resume_session(self, key):
+        session_id = self.sessions.get(key)
+        if session_id is None:
+            return None
+        response = self.request('GET', f'/uploads/{session_id}/')
+        if response.status_code != 200:
+            self.sessions.pop(key, None)
+            return None
+        session = response.json()
+        if session['finalized'] or session['status'] in ('done', 'failed'):
+            self.sessions.pop(key, None)
+            return None
+        return session
+
+    # GET path until the server stops answering 202 Accepted (e.g. a report
+    # still rendering), sleeping for its Retry-After between attempts
+    def wait_for(self, path, is_cancelled=None, max_wait=120, **kwargs):
+        deadline = time.monotonic() + max_wait
+        while True:
+            response = self.request('GET', path, **kwargs)
+            if response.status_code != 202:
+                return response
+            response.close()
+            delay = float(response.headers.get('Retry-After') or 1)
+            if time.monotonic() + delay > deadline:
+                raise ApiError('Timed out waiting for the server', 202)
+            wake = time.monotonic() + delay
+            while time.monotonic() < wake:
+                if is_cancelled and is_cancelled():
+                    raise Cancelled()
+                time.sleep(min(0.1, max(wake - time.monotonic(), 0)))
+
+    # Stream a GET response into target, via a .part file so a cancelled or
+    # failed download never leaves a truncated file behind
+    def download(self, path, target, progress=None, is_cancelled=None, block_size=64 * 1024):
+        with self.wait_for(path, is_cancelled, stream=True) as response:
+            if response.status_code != 200:
+                raise ApiError(f'Download failed ({response.status_code})', response.status_code)
+            total = int(response.headers.get('Content-Length') or 0)
+            done = 0
+            partial = target + '.part'
+            try:
+                with open(partial, 'wb') as f:
+                    for block in response.iter_content(block_size):
+                        if is_cancelled and is_cancelled():
+                            raise Cancelled()
+                        f.write(block)
+                        done += len(block)
+                        if progress:
+                            progress(done, total)
+                os.replace(partial, target)
+            except BaseException:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+        return target
+
+
+# ============================================
+# frontend-desktop/dataset_cache.py
+# ============================================
+import hashlib
+import hmac
 import json
-import pandas as pd
+import os
+import tempfile
+import numpy as np
+
+DEFAULT_CACHE_MB = 512
+FORMAT_VERSION = 1
+OFFLINE_LOGIN_FILE = 'offline_login.json'
+PBKDF2_ITERATIONS = 200000
+
+
+def default_cache_dir():
+    return os.environ.get('EQUIPMENT_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'equipment-visualizer')
+
+
+# Cached text column: UTF-8 bytes plus offsets, decoded one cell at a time
+# as the table paints it
+class StringColumn:
+    def __init__(self, offsets, data, valid):
+        self.offsets = offsets
+        self.data = data.tobytes()
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if not self.valid[row]:
+            return None
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+
+
+# Cached numeric column; NaN marks a missing value. Integer columns are
+# stored as floats too, so integral remembers to hand back ints.
+class NumberColumn:
+    def __init__(self, values, integral=False):
+        self.values = values
+        self.integral = integral
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, row):
+        value = self.values[row]
+        if value != value:
+            return None
+        return int(value) if self.integral else float(value)
+
+
+def _encode(values):
+    encoded = [b'' if value is None else str(value).encode('utf-8') for value in values]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    valid = np.array([value is not None for value in values], dtype=bool)
+    return lengths, b''.join(encoded), valid
+
+
+# Collects pages of column lists (as the rows endpoint returns them with
+# layout=columns) into compact arrays as they arrive, so filling the cache
+# never holds a whole dataset as Python objects
+class ColumnBuilder:
+    def __init__(self):
+        self.columns = []
+        self.parts = {}
+        self.count = 0
+
+    def append(self, columns, arrays):
+        if not self.columns:
+            self.columns = list(columns)
+            self.parts = {col: [] for col in self.columns}
+        size = len(arrays[self.columns[0]]) if self.columns else 0
+        for col in self.columns:
+            values = arrays.get(col) or [None] * size
+            if all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+                   for value in values):
+                integral = all(value is None or isinstance(value, int) for value in values)
+                numbers = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+                self.parts[col].append(('n', numbers, integral))
+            else:
+                self.parts[col].append(('s', values, None))
+        self.count += size
+        return size
+
+    def arrays(self):
+        result = {}
+        for i, col in enumerate(self.columns):
+            parts = self.parts[col]
+            if all(kind == 'n' for kind, _, _ in parts):
+                result[f'n{i}'] = np.concatenate([values for _, values, _ in parts]) if parts else np.zeros(0)
+                result[f'n{i}_integral'] = np.array(all(integral for _, _, integral in parts))
+                continue
+            lengths, blobs, valid = [], [], []
+            for kind, values, integral in parts:
+                if kind == 'n':
+                    values = [None if value != value else int(value) if integral else float(value)
+                              for value in values.tolist()]
+                part_lengths, blob, part_valid = _encode(values)
+                lengths.append(part_lengths)
+                blobs.append(blob)
+                valid.append(part_valid)
+            lengths = np.concatenate(lengths)
+            offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            result[f's{i}_offsets'] = offsets
+            result[f's{i}_data'] = np.frombuffer(b''.join(blobs), dtype=np.uint8)
+            result[f's{i}_valid'] = np.concatenate(valid)
+        return result
+
+
+# Per-account, on-disk copy of dataset summaries, their rows and the
+# history list. Each dataset is {id}.json (summary and the server's ETag)
+# plus {id}.npz (its columns, uncompressed so reopening is a plain read).
+# Files are touched on use; the least recently used are evicted once the
+# cache is over max_bytes.
+class DatasetCache:
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def for_account(cls, base_url, username, root=None, max_bytes=None):
+        key = hashlib.sha1(f'{base_url}\n{username}'.encode('utf-8')).hexdigest()[:16]
+        max_bytes = max_bytes or int(os.environ.get('EQUIPMENT_CACHE_MB', DEFAULT_CACHE_MB)) * 1024 * 1024
+        return cls(os.path.join(root or default_cache_dir(), key), max_bytes)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write(self, name, write):
+        # Write then rename, so a crash never leaves a half-written entry
+        fd, partial = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(partial, self.path(name))
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+    def _read_json(self, name):
+        try:
+            with open(self.path(name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data if data.get('version') == FORMAT_VERSION else None
+
+    def _write_json(self, name, data):
+        self._write(name, lambda f: f.write(json.dumps(dict(data, version=FORMAT_VERSION)).encode('utf-8')))
+
+    def _touch(self, *names):
+        for name in names:
+            try:
+                os.utime(self.path(name))
+            except OSError:
+                pass
+
+    def history(self):
+        return self._read_json('history.json')
+
+    def save_history(self, datasets, etag):
+        self._write_json('history.json', {'etag': etag, 'datasets': datasets})
+
+    # {'etag', 'dataset', 'columns'} for a cached dataset, or None
+    def meta(self, dataset_id):
+        return self._read_json(f'{dataset_id}.json')
+
+    def save_meta(self, dataset_id, etag, dataset):
+        previous = self.meta(dataset_id)
+        if previous is None or previous['etag'] != etag:
+            self.discard_rows(dataset_id)
+        self._write_json(f'{dataset_id}.json', {'etag': etag, 'dataset': dataset, 'columns': None})
+        self.evict()
+
+    # (columns, {column: StringColumn | NumberColumn}) if the rows for the
+    # cached etag are on disk, else None
+    def rows(self, dataset_id):
+        meta = self.meta(dataset_id)
+        if meta is None or not meta.get('columns'):
+            return None
+        try:
+            with np.load(self.path(f'{dataset_id}.npz')) as stored:
+                arrays = {}
+                for i, col in enumerate(meta['columns']):
+                    if f'n{i}' in stored:
+                        arrays[col] = NumberColumn(stored[f'n{i}'], bool(stored[f'n{i}_integral']))
+                    else:
+                        arrays[col] = StringColumn(stored[f's{i}_offsets'], stored[f's{i}_data'],
+                                                   stored[f's{i}_valid'])
+        except (OSError, ValueError, KeyError):
+            return None
+        self._touch(f'{dataset_id}.json', f'{dataset_id}.npz')
+        return meta['columns'], arrays
+
+    # Store rows fetched for etag; skipped if the summary moved on meanwhile
+    def save_rows(self, dataset_id, etag, builder):
+        meta = self.meta(dataset_id)
+        if meta is None or meta['etag'] != etag:
+            return False
+        self._write(f'{dataset_id}.npz', lambda f: np.savez(f, **builder.arrays()))
+        meta['columns'] = builder.columns
+        self._write_json(f'{dataset_id}.json', meta)
+        self.evict()
+        return self.rows(dataset_id) is not None
+
+    def discard_rows(self, dataset_id):
+        try:
+            os.remove(self.path(f'{dataset_id}.npz'))
+        except FileNotFoundError:
+            pass
+
+    def discard(self, dataset_id):
+        self.discard_rows(dataset_id)
+        try:
+            os.remove(self.path(f'{dataset_id}.json'))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(('.json', '.npz')) and name != 'history.json':
+                try:
+                    stat = os.stat(self.path(name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            dataset_id = name.rsplit('.', 1)[0]
+            # Drop the bulky rows first; summaries are tiny
+            if name.endswith('.npz'):
+                self.discard_rows(dataset_id)
+                meta = self.meta(dataset_id)
+                if meta is not None and meta.get('columns'):
+                    meta['columns'] = None
+                    self._write_json(f'{dataset_id}.json', meta)
+                total -= size
+
+
+def _password_hash(password, salt):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, PBKDF2_ITERATIONS).hex()
+
+
+# Offline sign-in is only for the last account that signed in online, with
+# the same password: a salted PBKDF2 hash of it is kept beside the caches,
+# replacing the previous account's
+def remember_login(base_url, username, password, root=None):
+    root = root or default_cache_dir()
+    os.makedirs(root, exist_ok=True)
+    salt = os.urandom(16)
+    record = {'version': FORMAT_VERSION, 'base_url': base_url, 'username': username,
+              'salt': salt.hex(), 'hash': _password_hash(password, salt)}
+    # mkstemp creates the file readable by its owner only
+    fd, partial = tempfile.mkstemp(dir=root, suffix='.part')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(record, f)
+        os.replace(partial, os.path.join(root, OFFLINE_LOGIN_FILE))
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def check_offline_login(base_url, username, password, root=None):
+    try:
+        with open(os.path.join(root or default_cache_dir(), OFFLINE_LOGIN_FILE)) as f:
+            record = json.load(f)
+        if record.get('version') != FORMAT_VERSION:
+            return False
+        if record['base_url'] != base_url or record['username'] != username:
+            return False
+        expected = record['hash']
+        salt = bytes.fromhex(record['salt'])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return False
+    return hmac.compare_digest(_password_hash(password, salt), expected)
+
+
+# ============================================
+# frontend-desktop/workers.py
+# ============================================
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from api_client import Cancelled
+
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    progress = pyqtSignal('qint64', 'qint64')
+
+
+# Runs fn(*args, **kwargs) on a QThreadPool thread and reports back through
+# signals, which Qt delivers on the GUI thread. With with_progress=True, fn
+# also receives progress(done, total) and is_cancelled() keyword arguments.
+class Worker(QRunnable):
+    def __init__(self, fn, *args, with_progress=False, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancelled = False
+        if with_progress:
+            self.kwargs['progress'] = self.signals.progress.emit
+            self.kwargs['is_cancelled'] = self.is_cancelled
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Cancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        if self._cancelled:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(result)
+
+
+# ============================================
+# frontend-desktop/main.py
+# ============================================
+import os
+import sys
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QLineEdit, 
-                             QTableWidget, QTableWidgetItem, QFileDialog,
+                             QTableView, QFileDialog,
                              QMessageBox, QListWidget, QTabWidget, QGroupBox,
-                             QGridLayout)
-from PyQt5.QtCore import Qt
+                             QGridLayout, QProgressBar, QAbstractItemView)
+from PyQt5.QtCore import Qt, QThreadPool
 from PyQt5.QtGui import QFont
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+from api_client import ApiClient, Offline
+from dataset_cache import ColumnBuilder, DatasetCache, check_offline_login, remember_login
+from table_model import DatasetTableModel
+from workers import Worker
 
 
 API_URL = 'http://localhost:8000/api'
+# Files above this size are uploaded with ?async=1 (see ApiClient.upload_async)
+ASYNC_UPLOAD_BYTES = 5 * 1024 * 1024
+# ...and above this one in resumable pieces (see ApiClient.upload_resumable)
+RESUMABLE_UPLOAD_BYTES = 64 * 1024 * 1024
+# Build every tab and chart canvas up front, as before lazy startup (for
+# comparing startup times, see benchmarks/bench_startup.py)
+EAGER_STARTUP = os.environ.get('EQUIPMENT_EAGER_STARTUP') == '1'
+
+
+# matplotlib and its Qt backend take longer to import than the rest of the
+# app together, so they load on first use, or in the background after login
+# (see MainWindow.prewarm)
+def load_matplotlib():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+    return Figure, FigureCanvasQTAgg
+
+
+# Worker thread: import matplotlib and draw one throwaway chart off screen,
+# so fonts and text layout are cached before the first real plot
+def warm_matplotlib():
+    Figure, _ = load_matplotlib()
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figure = Figure(figsize=(4, 3))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    ax.bar(['Flowrate', 'Pressure'], [1, 2])
+    ax.set_title('warm-up', fontsize=14, fontweight='bold')
+    figure.canvas.draw()
 
 
 class LoginWindow(QWidget):
@@ -49,10 +901,10 @@ class LoginWindow(QWidget):
         self.password_input.setMinimumHeight(40)
         layout.addWidget(self.password_input)
         
-        login_btn = QPushButton('Login')
-        login_btn.setMinimumHeight(40)
-        login_btn.clicked.connect(self.login)
-        layout.addWidget(login_btn)
+        self.login_btn = QPushButton('Login')
+        self.login_btn.setMinimumHeight(40)
+        self.login_btn.clicked.connect(self.login)
+        layout.addWidget(self.login_btn)
         
         self.error_label = QLabel('')
         self.error_label.setStyleSheet('color: red;')
@@ -66,29 +918,56 @@ class LoginWindow(QWidget):
         username = self.username_input.text()
         password = self.password_input.text()
         
+        self.login_btn.setEnabled(False)
+        self.error_label.setText('')
+        self.parent.run_task(self.sign_in, username, password,
+                             on_done=lambda token: self.logged_in(token, username),
+                             on_error=self.login_failed)
+    
+    # Worker thread: with the server unreachable, the last account to sign in
+    # online can work offline (token None) on what it has cached locally,
+    # given the same password
+    def sign_in(self, username, password):
         try:
-            response = requests.post(f'{API_URL}/login/', 
-                                    json={'username': username, 'password': password})
-            if response.status_code == 200:
-                token = response.json()['token']
-                self.parent.set_token(token, username)
-                self.close()
-            else:
-                self.error_label.setText('Invalid credentials')
-        except Exception as e:
-            self.error_label.setText(f'Error: {str(e)}')
+            token = self.parent.api.login(username, password)
+        except Offline:
+            if not check_offline_login(API_URL, username, password):
+                raise
+            if DatasetCache.for_account(API_URL, username).history() is None:
+                raise
+            return None
+        remember_login(API_URL, username, password)
+        return token
+    
+    def logged_in(self, token, username):
+        self.login_btn.setEnabled(True)
+        self.parent.set_token(token, username)
+        self.close()
+    
+    def login_failed(self, message):
+        self.login_btn.setEnabled(True)
+        self.error_label.setText(message if message == 'Invalid credentials' else f'Error: {message}')
 
 
+# The Figure and its canvas are only created when first needed
 class ChartWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.figure = Figure(figsize=(8, 6))
-        self.canvas = FigureCanvas(self.figure)
-        layout = QVBoxLayout()
-        layout.addWidget(self.canvas)
-        self.setLayout(layout)
+        self.figure = None
+        self.canvas = None
+        self.setLayout(QVBoxLayout())
+        if EAGER_STARTUP:
+            self.ensure_canvas()
+    
+    def ensure_canvas(self):
+        if self.figure is None:
+            Figure, FigureCanvas = load_matplotlib()
+            self.figure = Figure(figsize=(8, 6))
+            self.canvas = FigureCanvas(self.figure)
+            self.layout().addWidget(self.canvas)
     
     def plot_bar_chart(self, data):
+        self.ensure_canvas()
         self.figure.clear()
         ax = self.figure.add_subplot(111)
         labels = ['Flowrate', 'Pressure', 'Temperature']
@@ -100,6 +979,7 @@ class ChartWidget(QWidget):
         self.canvas.draw()
     
     def plot_pie_chart(self, distribution):
+        self.ensure_canvas()
         self.figure.clear()
         ax = self.figure.add_subplot(111)
         labels = list(distribution.keys())
@@ -108,6 +988,49 @@ class ChartWidget(QWidget):
         ax.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors[:len(labels)])
         ax.set_title('Equipment Type Distribution', fontsize=14, fontweight='bold')
         self.canvas.draw()
+    
+    # Means (with standard deviation whiskers) per dataset, side by side, from
+    # the server's compare response; no rows are needed
+    def plot_comparison(self, comparison):
+        self.ensure_canvas()
+        self.figure.clear()
+        ax = self.figure.add_subplot(111)
+        labels = ['Flowrate', 'Pressure', 'Temperature']
+        datasets = comparison['datasets']
+        width = 0.8 / len(datasets)
+        for i, ds in enumerate(datasets):
+            columns = [ds['columns'].get(label, {}) for label in labels]
+            positions = [x + (i - (len(datasets) - 1) / 2) * width for x in range(len(labels))]
+            ax.bar(positions, [c.get('mean') or 0 for c in columns], width,
+                   yerr=[c.get('std') or 0 for c in columns], capsize=3,
+                   label=f"#{ds['id']} {ds['filename']}")
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels)
+        ax.set_title('Average Parameters by Dataset', fontsize=14, fontweight='bold')
+        ax.set_ylabel('Value')
+        ax.legend(fontsize=8)
+        self.canvas.draw()
+
+
+# A tab page built the first time it is shown (or ensure()d), so startup
+# only pays for the tab on screen
+class LazyTab(QWidget):
+    def __init__(self, build, parent=None):
+        super().__init__(parent)
+        self.build = build
+        self.built = False
+        self.setLayout(QVBoxLayout())
+        if EAGER_STARTUP:
+            self.ensure()
+    
+    def ensure(self):
+        if not self.built:
+            self.built = True
+            self.build(self.layout())
+    
+    def showEvent(self, event):
+        self.ensure()
+        super().showEvent(event)
 
 
 class MainWindow(QMainWindow):
@@ -118,6 +1041,17 @@ class MainWindow(QMainWindow):
         self.current_data = None
         self.current_summary = None
         self.current_dataset_id = None
+        self.requested_dataset_id = None
+        self.api = ApiClient(API_URL)
+        self.cache = None
+        self.filling = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(4)
+        self.workers = set()
+        self.transfer = None
+        self.history = []
+        self.warming = None
+        self.table_model = DatasetTableModel(self)
         self.init_ui()
         self.show_login()
     
@@ -209,32 +1143,126 @@ class MainWindow(QMainWindow):
         
         self.tabs.addTab(upload_tab, 'Upload & Analyze')
         
-        # Data Table Tab
-        table_tab = QWidget()
-        table_layout = QVBoxLayout(table_tab)
-        
-        self.data_table = QTableWidget()
-        table_layout.addWidget(self.data_table)
+        # Data Table and History tabs are built when first opened
+        self.table_tab = LazyTab(self.build_table_tab)
+        self.tabs.addTab(self.table_tab, 'Data Table')
+        self.history_tab = LazyTab(self.build_history_tab)
+        self.tabs.addTab(self.history_tab, 'History')
         
-        self.tabs.addTab(table_tab, 'Data Table')
+        main_layout.addWidget(self.tabs)
         
-        # History Tab
-        history_tab = QWidget()
-        history_layout = QVBoxLayout(history_tab)
+        # Upload/download progress
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(300)
+        self.progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.cancel_btn = QPushButton('Cancel')
+        self.cancel_btn.clicked.connect(self.cancel_transfer)
+        self.cancel_btn.hide()
+        self.statusBar().addPermanentWidget(self.cancel_btn)
         
+        self.selected_files = []
+    
+    def build_table_tab(self, table_layout):
+        self.data_table = QTableView()
+        self.data_table.setModel(self.table_model)
+        table_layout.addWidget(self.data_table)
+    
+    def build_history_tab(self, history_layout):
         history_label = QLabel('Recent Uploads (Last 5)')
         history_label.setFont(QFont('Arial', 12, QFont.Bold))
         history_layout.addWidget(history_label)
         
         self.history_list = QListWidget()
+        self.history_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.history_list.itemDoubleClicked.connect(self.load_dataset)
         history_layout.addWidget(self.history_list)
         
-        self.tabs.addTab(history_tab, 'History')
+        compare_btn = QPushButton('Compare Selected')
+        compare_btn.clicked.connect(self.compare_selected)
+        history_layout.addWidget(compare_btn)
         
-        main_layout.addWidget(self.tabs)
+        self.compare_chart = ChartWidget()
+        history_layout.addWidget(self.compare_chart)
+        self.fill_history()
+    
+    # After login: load matplotlib on a worker thread, then create the
+    # Upload tab's canvases, so the first dataset shown draws straight away
+    def prewarm(self):
+        if self.warming is not None or self.bar_chart.figure is not None:
+            return
+        
+        def ready(_):
+            self.bar_chart.ensure_canvas()
+            self.pie_chart.ensure_canvas()
+        
+        self.warming = self.run_task(warm_matplotlib, on_done=ready,
+                                     on_error=lambda message: self.statusBar().showMessage(
+                                         f'Error loading charts: {message}', 5000))
+    
+    def run_task(self, fn, *args, on_done=None, on_error=None, on_progress=None,
+                 on_cancel=None, **kwargs):
+        # Runs fn on the thread pool; callbacks are invoked on the GUI thread
+        worker = Worker(fn, *args, with_progress=on_progress is not None, **kwargs)
+        self.workers.add(worker)
+        
+        def forget(*_):
+            self.workers.discard(worker)
         
-        self.selected_file = None
+        if on_done:
+            worker.signals.finished.connect(on_done)
+        if on_error:
+            worker.signals.failed.connect(on_error)
+        if on_progress:
+            worker.signals.progress.connect(on_progress)
+        if on_cancel:
+            worker.signals.cancelled.connect(on_cancel)
+        for signal in (worker.signals.finished, worker.signals.failed, worker.signals.cancelled):
+            signal.connect(forget)
+        self.pool.start(worker)
+        return worker
+    
+    def start_transfer(self, label, fn, *args, on_done=None, on_error=None):
+        if self.transfer is not None:
+            QMessageBox.warning(self, 'Warning', 'Another transfer is still running')
+            return
+        
+        def finish():
+            self.transfer = None
+            self.progress_bar.hide()
+            self.cancel_btn.hide()
+            self.statusBar().clearMessage()
+        
+        def done(result):
+            finish()
+            if on_done:
+                on_done(result)
+        
+        def failed(message):
+            finish()
+            if on_error:
+                on_error(message)
+        
+        def cancelled():
+            finish()
+            self.statusBar().showMessage(f'{label} cancelled', 3000)
+        
+        self.statusBar().showMessage(label)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.cancel_btn.show()
+        self.transfer = self.run_task(fn, *args, on_done=done, on_error=failed,
+                                      on_progress=self.show_progress, on_cancel=cancelled)
+    
+    def show_progress(self, done, total):
+        if total:
+            # QProgressBar is int-based, so track per mille rather than bytes
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(done * 1000 / total))
+    
+    def cancel_transfer(self):
+        if self.transfer is not None:
+            self.transfer.cancel()
     
     def show_login(self):
         self.login_window = LoginWindow(self)
@@ -243,39 +1271,85 @@ class MainWindow(QMainWindow):
     def set_token(self, token, username):
         self.token = token
         self.username = username
-        self.user_label.setText(f'Welcome, {username}!')
+        self.api.set_token(token)
+        self.cache = DatasetCache.for_account(API_URL, username)
+        self.user_label.setText(f'Welcome, {username}!' if token else f'Welcome, {username}! (offline)')
         self.fetch_history()
+        self.prewarm()
     
     def browse_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, 'Select CSV File', '', 'CSV Files (*.csv)')
-        if file_path:
-            self.selected_file = file_path
-            self.file_label.setText(file_path.split('/')[-1])
+        file_paths, _ = QFileDialog.getOpenFileNames(self, 'Select CSV Files or Archives', '',
+                                                     'Data Files (*.csv *.zip *.tar *.tar.gz *.tgz);;CSV Files (*.csv)')
+        if file_paths:
+            self.selected_files = file_paths
+            if len(file_paths) == 1:
+                self.file_label.setText(os.path.basename(file_paths[0]))
+            else:
+                self.file_label.setText(f'{len(file_paths)} files selected')
     
     def upload_file(self):
-        if not self.selected_file:
+        if not self.selected_files:
             QMessageBox.warning(self, 'Warning', 'Please select a file first')
             return
         
-        try:
-            with open(self.selected_file, 'rb') as f:
-                files = {'file': f}
-                headers = {'Authorization': f'Token {self.token}'}
-                response = requests.post(f'{API_URL}/datasets/upload/', 
-                                       files=files, headers=headers)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    self.current_data = result['data']
-                    self.current_summary = result['summary']
-                    self.current_dataset_id = result['id']
-                    self.update_display()
-                    self.fetch_history()
-                    QMessageBox.information(self, 'Success', 'File uploaded successfully!')
-                else:
-                    QMessageBox.critical(self, 'Error', response.json().get('error', 'Upload failed'))
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', str(e))
+        # Several files, or an archive, go up as one batch request
+        path = self.selected_files[0]
+        if len(self.selected_files) > 1 or not path.lower().endswith('.csv'):
+            self.start_transfer(f'Uploading {len(self.selected_files)} files...', self.api.upload_batch,
+                                self.selected_files,
+                                on_done=self.batch_finished,
+                                on_error=lambda message: QMessageBox.critical(self, 'Error', message))
+            return
+        
+        # Large files are parsed by a server-side job instead of inside the
+        # request, so they cannot hit a proxy timeout; very large ones go up
+        # in pieces, so a dropped connection only costs the current piece
+        upload = self.api.upload
+        size = os.path.getsize(path)
+        if size > RESUMABLE_UPLOAD_BYTES:
+            upload = self.api.upload_resumable
+        elif size > ASYNC_UPLOAD_BYTES:
+            upload = self.api.upload_async
+        self.start_transfer('Uploading...', upload, path,
+                            on_done=self.upload_finished,
+                            on_error=lambda message: QMessageBox.critical(self, 'Error', message))
+    
+    def upload_finished(self, result):
+        dataset_id = result['id']
+        self.current_data = result.get('data')
+        if self.current_data is None:
+            # Summary only: the Data Table pages rows from the server
+            self.requested_dataset_id = dataset_id
+            self.table_model.set_remote(result['summary']['total_count'],
+                                        lambda number, offset, limit: self.fetch_rows(dataset_id, number, offset, limit),
+                                        source=dataset_id)
+        self.current_summary = result['summary']
+        self.current_dataset_id = dataset_id
+        self.update_display()
+        self.fetch_history()
+        QMessageBox.information(self, 'Success', 'File uploaded successfully!')
+    
+    # Show the last dataset of the batch that is still in the history, then
+    # refresh the history once for the whole batch
+    def batch_finished(self, result):
+        shown = [r for r in result['results'] if r.get('retained')]
+        if shown:
+            dataset_id = shown[-1]['id']
+            self.current_data = None
+            self.requested_dataset_id = dataset_id
+            self.table_model.set_remote(shown[-1]['summary']['total_count'],
+                                        lambda number, offset, limit: self.fetch_rows(dataset_id, number, offset, limit),
+                                        source=dataset_id)
+            self.current_summary = shown[-1]['summary']
+            self.current_dataset_id = dataset_id
+            self.update_display()
+        self.fetch_history()
+        message = f"{result['uploaded']} file(s) uploaded"
+        failures = [f"{r['filename']}: {r['error']}" for r in result['results'] if 'error' in r]
+        if failures:
+            QMessageBox.warning(self, 'Upload', '\n'.join([message, f'{len(failures)} failed:'] + failures))
+        else:
+            QMessageBox.information(self, 'Success', message)
     
     def update_display(self):
         if not self.current_summary:
@@ -294,79 +1368,172 @@ class MainWindow(QMainWindow):
         
         # Update table
         if self.current_data:
-            df = pd.DataFrame(self.current_data)
-            self.data_table.setRowCount(len(df))
-            self.data_table.setColumnCount(len(df.columns))
-            self.data_table.setHorizontalHeaderLabels(df.columns)
-            
-            for i, row in df.iterrows():
-                for j, value in enumerate(row):
-                    self.data_table.setItem(i, j, QTableWidgetItem(str(value)))
+            self.table_model.set_records(self.current_data)
     
     def fetch_history(self):
+        # Show the cached list straight away, then revalidate it
+        cached = self.cache.history()
+        if cached:
+            self.show_history(cached['datasets'])
+        self.run_task(self.sync_history, self.cache, cached and cached['etag'],
+                      on_done=lambda datasets: datasets is not None and self.show_history(datasets),
+                      on_error=lambda message: print(f'Error fetching history: {message}'))
+    
+    # Worker thread: None when the cached history is still current (or the
+    # server is unreachable), else the fresh list
+    def sync_history(self, cache, etag):
         try:
-            headers = {'Authorization': f'Token {self.token}'}
-            response = requests.get(f'{API_URL}/datasets/', headers=headers)
-            if response.status_code == 200:
-                datasets = response.json()
-                self.history_list.clear()
-                for ds in datasets:
-                    item_text = f"{ds['filename']} - {ds['uploaded_at'][:19]} (Count: {ds['total_count']})"
-                    item = self.history_list.addItem(item_text)
-                    self.history_list.item(self.history_list.count() - 1).setData(Qt.UserRole, ds['id'])
-        except Exception as e:
-            print(f'Error fetching history: {e}')
+            datasets, etag = self.api.list_datasets(etag)
+        except Offline:
+            if etag is None:
+                raise
+            return None
+        if datasets is not None:
+            cache.save_history(datasets, etag)
+        return datasets
+    
+    def show_history(self, datasets):
+        self.history = datasets
+        if self.history_tab.built:
+            self.fill_history()
+    
+    def fill_history(self):
+        self.history_list.clear()
+        for ds in self.history:
+            item_text = f"{ds['filename']} - {ds['uploaded_at'][:19]} (Count: {ds['total_count']})"
+            item = self.history_list.addItem(item_text)
+            self.history_list.item(self.history_list.count() - 1).setData(Qt.UserRole, ds['id'])
+    
+    def compare_selected(self):
+        dataset_ids = [item.data(Qt.UserRole) for item in self.history_list.selectedItems()]
+        if len(dataset_ids) < 2:
+            QMessageBox.warning(self, 'Warning', 'Select at least two datasets to compare')
+            return
+        self.run_task(self.api.compare, dataset_ids,
+                      on_done=self.compare_chart.plot_comparison,
+                      on_error=lambda message: QMessageBox.critical(self, 'Error', message))
     
     def load_dataset(self, item):
         dataset_id = item.data(Qt.UserRole)
+        # Loads may overlap; only the most recently requested one is displayed
+        self.requested_dataset_id = dataset_id
+        self.run_task(self.open_dataset, self.cache, dataset_id,
+                      on_done=self.dataset_loaded,
+                      on_error=lambda message: QMessageBox.critical(self, 'Error', message))
+    
+    # Worker thread: revalidate the cached copy with If-None-Match. A 304
+    # (or no server at all) reuses the cached summary and rows; a 200
+    # replaces the cached summary and drops rows cached for the old ETag.
+    def open_dataset(self, cache, dataset_id):
+        meta = cache.meta(dataset_id)
         try:
-            headers = {'Authorization': f'Token {self.token}'}
-            response = requests.get(f'{API_URL}/datasets/{dataset_id}/', headers=headers)
-            if response.status_code == 200:
-                dataset = response.json()
-                self.current_data = json.loads(dataset['raw_data'])
-                self.current_summary = {
-                    'total_count': dataset['total_count'],
-                    'avg_flowrate': dataset['avg_flowrate'],
-                    'avg_pressure': dataset['avg_pressure'],
-                    'avg_temperature': dataset['avg_temperature'],
-                    'type_distribution': dataset['type_distribution']
-                }
-                self.current_dataset_id = dataset_id
-                self.update_display()
-                self.tabs.setCurrentIndex(0)
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', str(e))
+            dataset, etag = self.api.dataset_summary(dataset_id, meta and meta['etag'])
+        except Offline:
+            if meta is None:
+                raise
+            return {'dataset': meta['dataset'], 'rows': cache.rows(dataset_id), 'offline': True}
+        if dataset is None:
+            return {'dataset': meta['dataset'], 'rows': cache.rows(dataset_id), 'etag': etag}
+        if etag:
+            cache.save_meta(dataset_id, etag, dataset)
+        return {'dataset': dataset, 'rows': None, 'etag': etag}
+    
+    def dataset_loaded(self, result):
+        dataset = result['dataset']
+        dataset_id = dataset['id']
+        if dataset_id != self.requested_dataset_id:
+            return
+        self.current_data = None
+        if result['rows']:
+            self.table_model.set_columns(*result['rows'])
+        elif result.get('offline'):
+            self.table_model.clear()
+        else:
+            # The Data Table pulls row pages as they scroll into view while
+            # the whole dataset is copied into the local cache
+            self.table_model.set_remote(dataset['total_count'],
+                                        lambda number, offset, limit: self.fetch_rows(dataset_id, number, offset, limit),
+                                        source=dataset_id)
+            if result['etag']:
+                self.fill_cache(dataset_id, result['etag'], dataset['total_count'])
+        if result.get('offline'):
+            rows = 'cached rows' if result['rows'] else 'rows are not cached'
+            self.statusBar().showMessage(f'Offline: showing the cached copy ({rows})', 5000)
+        self.current_summary = {
+            'total_count': dataset['total_count'],
+            'avg_flowrate': dataset['avg_flowrate'],
+            'avg_pressure': dataset['avg_pressure'],
+            'avg_temperature': dataset['avg_temperature'],
+            'type_distribution': dataset['type_distribution']
+        }
+        self.current_dataset_id = dataset_id
+        self.update_display()
+        self.tabs.setCurrentIndex(0)
+    
+    def fetch_rows(self, dataset_id, number, offset, limit):
+        self.run_task(self.api.rows, dataset_id, offset, limit,
+                      on_done=lambda page: self.table_model.page_loaded(dataset_id, number, *page),
+                      on_error=lambda message: self.statusBar().showMessage(f'Error loading rows: {message}', 5000))
+    
+    def fill_cache(self, dataset_id, etag, total):
+        if (dataset_id, etag) in self.filling:
+            return
+        self.filling.add((dataset_id, etag))
+        cache = self.cache
+        
+        def fill(progress=None, is_cancelled=None):
+            builder = self.api.all_rows(dataset_id, ColumnBuilder(), total, progress=progress,
+                                        is_cancelled=is_cancelled)
+            return cache.save_rows(dataset_id, etag, builder)
+        
+        def forget(*_):
+            self.filling.discard((dataset_id, etag))
+        
+        def failed(message):
+            forget()
+            self.statusBar().showMessage(f'Error caching dataset {dataset_id}: {message}', 5000)
+        
+        self.run_task(fill, on_done=forget, on_error=failed, on_cancel=forget,
+                      on_progress=lambda done, total: self.statusBar().showMessage(
+                          f'Caching dataset {dataset_id}: {done}/{total} rows', 2000))
     
     def download_pdf(self):
         if not self.current_dataset_id:
             QMessageBox.warning(self, 'Warning', 'No dataset loaded')
             return
         
-        try:
-            url = f'{API_URL}/datasets/{self.current_dataset_id}/download_pdf/?token={self.token}'
-            response = requests.get(url)
-            if response.status_code == 200:
-                file_path, _ = QFileDialog.getSaveFileName(self, 'Save PDF', 
-                                                          f'report_{self.current_dataset_id}.pdf',
-                                                          'PDF Files (*.pdf)')
-                if file_path:
-                    with open(file_path, 'wb') as f:
-                        f.write(response.content)
-                    QMessageBox.information(self, 'Success', 'PDF downloaded successfully!')
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', str(e))
+        file_path, _ = QFileDialog.getSaveFileName(self, 'Save PDF', 
+                                                  f'report_{self.current_dataset_id}.pdf',
+                                                  'PDF Files (*.pdf)')
+        if not file_path:
+            return
+        self.start_transfer('Downloading PDF...', self.api.download,
+                            f'/datasets/{self.current_dataset_id}/download_pdf/?async=1', file_path,
+                            on_done=lambda _: QMessageBox.information(self, 'Success', 'PDF downloaded successfully!'),
+                            on_error=lambda message: QMessageBox.critical(self, 'Error', message))
     
     def logout(self):
+        self.cancel_transfer()
+        if self.token:
+            self.run_task(self.api.logout, self.token)
+        self.api.set_token(None)
+        self.cache = None
         self.token = None
         self.username = None
         self.current_data = None
         self.current_summary = None
         self.current_dataset_id = None
+        self.requested_dataset_id = None
         self.user_label.setText('')
-        self.history_list.clear()
-        self.data_table.setRowCount(0)
+        self.show_history([])
+        self.table_model.clear()
         self.show_login()
+    
+    def closeEvent(self, event):
+        for worker in list(self.workers):
+            worker.cancel()
+        self.pool.waitForDone(2000)
+        super().closeEvent(event)
 
 
 if __name__ == '__main__':
@@ -382,6 +1549,276 @@ if __name__ == '__main__':
 """
 PyQt5==5.15.10
 matplotlib==3.8.2
-pandas==2.1.3
+numpy==1.26.2
 requests==2.31.0
-"""
\ No newline at end of file
+"""
+
+# ============================================
+# frontend-desktop/benchmarks/bench_table.py
+# ============================================
+"""
+Time-to-first-paint and memory for the Data Table tab.
+
+Compares the old QTableWidget fill (one QTableWidgetItem per cell) with
+DatasetTableModel, both fed from memory and paged lazily. Run from the
+frontend-desktop directory:
+
+    python -m benchmarks.bench_table --sizes 10000 100000 1000000
+
+Each measurement runs in its own subprocess; set --skip-widget-above to
+avoid waiting minutes for the QTableWidget path on the largest sizes.
+The QTableWidget baseline reproduces the old DataFrame-based fill, so it
+needs pandas installed; the app itself does not.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+MODES = ['widget', 'model', 'lazy']
+TYPES = ['Reactor', 'Pump', 'Heat Exchanger', 'Column', 'Compressor']
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024 * 1024)
+
+
+# Same shape as the 'data' list returned by /api/datasets/upload/
+def make_records(rows, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(rows):
+        kind = TYPES[i % len(TYPES)]
+        records.append({
+            'Equipment Name': f'{kind}-{i}',
+            'Type': kind,
+            'Flowrate': round(rng.gauss(170, 35), 1),
+            'Pressure': round(rng.gauss(52, 12), 1),
+            'Temperature': round(rng.gauss(75, 22), 1),
+        })
+    return records
+
+
+def fill_widget(records):
+    # The pre-model update_display() path
+    import pandas as pd
+    from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem
+    table = QTableWidget()
+    df = pd.DataFrame(records)
+    table.setRowCount(len(df))
+    table.setColumnCount(len(df.columns))
+    table.setHorizontalHeaderLabels(df.columns)
+    for i, row in df.iterrows():
+        for j, value in enumerate(row):
+            table.setItem(i, j, QTableWidgetItem(str(value)))
+    return table
+
+
+def fill_model(records):
+    from PyQt5.QtWidgets import QTableView
+    from table_model import DatasetTableModel
+    view = QTableView()
+    model = DatasetTableModel(view)
+    model.set_records(records)
+    view.setModel(model)
+    return view
+
+
+def fill_lazy(records):
+    from PyQt5.QtWidgets import QTableView
+    from table_model import DatasetTableModel
+    columns = list(records[0].keys())
+
+    view = QTableView()
+    model = DatasetTableModel(view)
+
+    # Stands in for GET /api/datasets/{id}/rows/?layout=columns
+    def request_page(number, offset, limit):
+        page = records[offset:offset + limit]
+        model.page_loaded('bench', number, columns, {col: [row[col] for row in page] for col in columns})
+
+    model.set_remote(len(records), request_page, source='bench')
+    view.setModel(model)
+    return view
+
+
+def child(mode, rows):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    records = make_records(rows)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    view = {'widget': fill_widget, 'model': fill_model, 'lazy': fill_lazy}[mode](records)
+    view.resize(1200, 700)
+    view.show()
+    app.processEvents()
+    first_paint = time.perf_counter() - start
+
+    print(json.dumps({
+        'mode': mode,
+        'rows': rows,
+        'first_paint_s': first_paint,
+        'extra_rss_mb': peak_rss_mb() - baseline,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--skip-widget-above', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    if not args.json:
+        print(f"{'rows':>10} {'mode':>7} {'first paint s':>14} {'extra RSS MB':>13}")
+    for size in args.sizes:
+        for mode in args.modes:
+            if mode == 'widget' and args.skip_widget_above and size > args.skip_widget_above:
+                continue
+            out = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_table', '--child', mode, str(size)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(out)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{size:>10} {mode:>7} {result['first_paint_s']:>14.3f} {result['extra_rss_mb']:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
+
+
+# ============================================
+# frontend-desktop/benchmarks/bench_startup.py
+# ============================================
+"""
+Cold start of the desktop app: import time and time to the login window.
+
+Compares lazy startup (the default) with EQUIPMENT_EAGER_STARTUP=1, which
+builds every tab and chart canvas up front as the app used to. Run from the
+frontend-desktop directory:
+
+    python -m benchmarks.bench_startup --repeat 5
+
+Each run is a fresh interpreter. "login s" is measured from spawning it to
+the login window being painted; "first chart s" is the first bar chart
+drawn straight after, before any background pre-warm could help. With
+--importtime the heaviest imports of main.py (python -X importtime) are
+listed per mode.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODES = ['lazy', 'eager']
+SAMPLE = {'avg_flowrate': 170.1, 'avg_pressure': 52.0, 'avg_temperature': 75.0}
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != 'darwin' else peak / (1024 * 1024)
+
+
+def child(spawned_at):
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter()
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    window = main.MainWindow()
+    app.processEvents()
+    assert window.login_window.isVisible()
+    login_at = time.time()
+    shown = time.perf_counter()
+    window.bar_chart.plot_bar_chart(SAMPLE)
+    app.processEvents()
+    print(json.dumps({
+        'import_s': imported - start,
+        'window_s': shown - imported,
+        'login_s': login_at - spawned_at,
+        'first_chart_s': time.perf_counter() - shown,
+        'peak_rss_mb': peak_rss_mb(),
+    }))
+
+
+def environment(mode):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    env['EQUIPMENT_EAGER_STARTUP'] = '1' if mode == 'eager' else '0'
+    return env
+
+
+# (cumulative seconds, module) for the slowest imports at most depth levels
+# below main, from python -X importtime
+def import_times(mode, depth=1):
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], env=environment(mode),
+                         check=True, capture_output=True, text=True).stderr
+    times = []
+    for line in err.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        level = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if level <= depth:
+            times.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(times, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--repeat', type=int, default=5, help='median of this many cold starts')
+    parser.add_argument('--importtime', action='store_true', help='list the slowest imports per mode')
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--json', action='store_true', help='emit one JSON object per result')
+    parser.add_argument('--child', type=float, metavar='SPAWNED_AT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child)
+        return
+
+    if not args.json:
+        print(f"{'mode':>6} {'import s':>9} {'window s':>9} {'login s':>8} {'first chart s':>14} {'peak RSS MB':>12}")
+    for mode in args.modes:
+        runs = []
+        for _ in range(args.repeat):
+            out = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_startup', '--child', repr(time.time())],
+                env=environment(mode), check=True, capture_output=True, text=True,
+            ).stdout
+            runs.append(json.loads(out.strip().splitlines()[-1]))
+        result = {'mode': mode, **{key: statistics.median(run[key] for run in runs) for key in runs[0]}}
+        if args.importtime:
+            result['imports'] = [{'module': name, 'cumulative_s': seconds}
+                                 for seconds, name in import_times(mode)[:args.top]]
+        if args.json:
+            print(json.dumps(result))
+            continue
+        print(f"{mode:>6} {result['import_s']:>9.3f} {result['window_s']:>9.3f} {result['login_s']:>8.3f} "
+              f"{result['first_chart_s']:>14.3f} {result['peak_rss_mb']:>12.1f}")
+        for entry in result.get('imports', []):
+            print(f"{'':>6} {entry['cumulative_s']:>9.3f}  {entry['module']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,8 @@ import './App.css';
 ChartJS.register(CategoryScale, LinearScale, BarElement, Title, Tooltip, Legend, ArcElement);
 
 const API_URL = 'http://localhost:8000/api';
+// Files above this size are uploaded with ?async=1 and processed as a job
+const ASYNC_UPLOAD_BYTES = 5 * 1024 * 1024;
 
 function App() {
   const [token, setToken] = useState(localStorage.getItem('token'));
@@ -22,6 +24,7 @@ function App() {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const [currentDatasetId, setCurrentDatasetId] = useState(null);
+  const [progress, setProgress] = useState(null);
 
   useEffect(() => {
     if (token) {
@@ -43,6 +46,10 @@ function App() {
   };
 
   const logout = () => {
+    // Revoke the token server side; signing out here does not wait for it
+    axios.post(`${API_URL}/logout/`, null, {
+      headers: { Authorization: `Token ${token}` }
+    }).catch(() => {});
     setToken(null);
     localStorage.removeItem('token');
     setData([]);
@@ -78,23 +85,49 @@ function App() {
     formData.append('file', file);
 
     try {
-      const response = await axios.post(`${API_URL}/datasets/upload/`, formData, {
+      // Large files are parsed by a server-side job; poll it instead of
+      // holding the request open until parsing finishes
+      const asyncUpload = file.size > ASYNC_UPLOAD_BYTES;
+      const response = await axios.post(`${API_URL}/datasets/upload/${asyncUpload ? '?async=1' : ''}`, formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
           Authorization: `Token ${token}`
         }
       });
-      setData(response.data.data);
-      setSummary(response.data.summary);
-      setCurrentDatasetId(response.data.id);
+      if (asyncUpload) {
+        const job = await waitForJob(response.data);
+        if (job) await loadDataset(job.dataset);
+      } else {
+        setData(response.data.data);
+        setSummary(response.data.summary);
+        setCurrentDatasetId(response.data.id);
+      }
       fetchHistory();
     } catch (err) {
       setError(err.response?.data?.error || 'Upload failed');
     } finally {
+      setProgress(null);
       setLoading(false);
     }
   };
 
+  const waitForJob = async (job) => {
+    while (job.status !== 'done' && job.status !== 'failed') {
+      setProgress(job.bytes_total ? Math.round((100 * job.bytes_done) / job.bytes_total) : null);
+      const response = await axios.get(`${API_URL}/jobs/${job.id}/`, {
+        headers: { Authorization: `Token ${token}` },
+        params: { wait: 10, rows: job.rows_done }
+      });
+      job = response.data;
+    }
+    setProgress(null);
+    if (job.status === 'failed') {
+      setError(job.error || 'Upload failed');
+      return null;
+    }
+    return job;
+  };
+
   const loadDataset = async (id) => {
     try {
       const response = await axios.get(`${API_URL}/datasets/${id}/`, {
@@ -115,9 +148,35 @@ function App() {
     }
   };
 
-  const downloadPDF = () => {
+  const downloadPDF = async () => {
     if (!currentDatasetId) return;
-    window.open(`${API_URL}/datasets/${currentDatasetId}/download_pdf/?token=${token}`, '_blank');
+    setError('');
+    try {
+      // async=1: a 202 while the report renders on the server; retry shortly
+      let response;
+      for (let attempt = 0; attempt < 60; attempt++) {
+        response = await axios.get(`${API_URL}/datasets/${currentDatasetId}/download_pdf/`, {
+          headers: { Authorization: `Token ${token}` },
+          params: { async: 1 },
+          responseType: 'blob'
+        });
+        if (response.status !== 202) break;
+        const retryAfter = Number(response.headers['retry-after']) || 1;
+        await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+      }
+      if (response.status !== 200) {
+        setError('Report is taking too long, please try again');
+        return;
+      }
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = `equipment_report_${currentDatasetId}.pdf`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (err) {
+      setError('Failed to download report');
+    }
   };
 
   if (!token) {
@@ -180,7 +239,7 @@ function App() {
           <h2>Upload CSV File</h2>
           <input type="file" accept=".csv" onChange={handleFileChange} />
           <button onClick={uploadFile} disabled={loading}>
-            {loading ? 'Uploading...' : 'Upload & Analyze'}
+            {loading ? (progress !== null ? `Processing ${progress}%` : 'Uploading...') : 'Upload & Analyze'}
           </button>
           {error && <p className="error">{error}</p>}
         </div>